@@ -0,0 +1,64 @@
+"""Maintenance commands for the Sow2Grow backend.
+
+    python manage.py rebuild-analytics
+    python manage.py geocode-orchards [--all]
+    python manage.py payout-worker
+    python manage.py reconcile-pockets [--orchard ID ...]
+"""
+import argparse
+import asyncio
+
+import server
+
+
+async def rebuild_analytics():
+    days = await server.update_daily_analytics(rebuild=True)
+    rows = await server.rebuild_analytics_counters()
+    orchards = await server.rebuild_orchard_supporters()
+    print(f"Rolled up {days} days, rebuilt {rows} analytics counter rows and {orchards} orchard supporter sketches")
+
+
+async def geocode_orchards(overwrite: bool):
+    placed = await server.geocode_orchards(overwrite=overwrite)
+    print(f"Geocoded {placed} orchards")
+
+
+async def reconcile_pockets(orchard_ids):
+    repaired = await server.reconcile_orchard_pockets(orchard_ids)
+    print(f"Repaired pocket counters of {repaired} orchards")
+
+
+async def run_payout_worker():
+    """Standalone payout worker, for deployments that keep it out of the API processes"""
+    if server.PAYOUT_MODE == "batch":
+        await server.payout_scheduler.flush()
+        server.payout_scheduler.start()
+        await server.payout_scheduler._task
+    else:
+        server.payout_worker.start()
+        await asyncio.gather(*server.payout_worker._tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild-analytics", help="Recompute analytics rollups, counters and supporter sketches")
+    geocode = commands.add_parser("geocode-orchards", help="Backfill orchard geo points from their location")
+    geocode.add_argument("--all", action="store_true", help="Re-geocode orchards that already have a point")
+    commands.add_parser("payout-worker", help="Run the payout worker or batch scheduler")
+    reconcile = commands.add_parser("reconcile-pockets", help="Recompute orchard pocket counters and bitmaps from the pockets")
+    reconcile.add_argument("--orchard", action="append", dest="orchard_ids", help="Only this orchard; repeatable")
+    args = parser.parse_args()
+
+    if args.command == "rebuild-analytics":
+        asyncio.run(rebuild_analytics())
+    elif args.command == "geocode-orchards":
+        asyncio.run(geocode_orchards(args.all))
+    elif args.command == "payout-worker":
+        asyncio.run(run_payout_worker())
+    elif args.command == "reconcile-pockets":
+        asyncio.run(reconcile_pockets(args.orchard_ids))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,685 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Path as PathParam
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, Response, Path as PathParam
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi.routing import APIRoute
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo import IndexModel, ASCENDING, DESCENDING, GEOSPHERE, ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure, BulkWriteError, DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Awaitable, Tuple, Union, get_args, get_origin
 import uuid
 from datetime import datetime, timedelta
 import bcrypt
 import jwt
 from enum import Enum
+from abc import ABC, abstractmethod
 import asyncio
 from decimal import Decimal
 import json
+import csv
+import io
+import base64
+import time
+import math
+import random
+import socket
+import hashlib
+import functools
+import threading
+import contextvars
+import heapq
+import bisect
+import re
+import unicodedata
+import orjson
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# MongoDB connection pool. Each uvicorn worker has its own pool, so the server sees
+# up to workers x MONGO_MAX_POOL_SIZE connections from one host
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))  # Also the number of connections opened at startup
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '10000'))  # Fail instead of queueing forever for a connection
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '10000'))
+MONGO_READINESS_TIMEOUT_SECONDS = float(os.environ.get('MONGO_READINESS_TIMEOUT_SECONDS', '2'))
+
+# Request instrumentation: slow requests on these route prefixes log a timing breakdown
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '500'))
+SLOW_REQUEST_ROUTE_PREFIXES = tuple(os.environ.get('SLOW_REQUEST_ROUTE_PREFIXES', '/api/orchards,/api/bestowals').split(','))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # If set, /metrics requires this bearer token
+
+# Per-request Mongo profiler for dev/staging: records every operation and flags wasteful patterns
+MONGO_PROFILER = os.environ.get('MONGO_PROFILER', 'off').lower() == 'on'
+PROFILER_N_PLUS_ONE_THRESHOLD = int(os.environ.get('PROFILER_N_PLUS_ONE_THRESHOLD', '5'))
+PROFILER_MAX_EXAMPLES = int(os.environ.get('PROFILER_MAX_EXAMPLES', '10'))
+PROFILER_MAX_IN_FLIGHT = int(os.environ.get('PROFILER_MAX_IN_FLIGHT', '10000'))
+PROFILER_IN_FLIGHT_SECONDS = float(os.environ.get('PROFILER_IN_FLIGHT_SECONDS', '300'))  # Started events older than this are swept
+
+# ===== INSTRUMENTATION =====
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+def prometheus_labels(names: tuple, values: tuple) -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """Labelled metric rendered in the Prometheus text format; safe to update from driver threads"""
+    
+    kind = "untyped"
+    
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values: Dict[tuple, Any] = {}
+        self.lock = threading.Lock()
+        METRICS_REGISTRY.append(self)
+    
+    def samples(self) -> List[str]:
+        return [f"{self.name}{prometheus_labels(self.label_names, labels)} {value}" for labels, value in self.values.items()]
+    
+    def render(self) -> str:
+        with self.lock:
+            lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+    
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+class Gauge(Counter):
+    kind = "gauge"
+    
+    def set(self, labels: tuple, value: float):
+        with self.lock:
+            self.values[labels] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+    
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = buckets
+    
+    def observe(self, labels: tuple, value: float):
+        with self.lock:
+            series = self.values.get(labels)
+            if series is None:
+                series = self.values[labels] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+    
+    def samples(self) -> List[str]:
+        lines = []
+        bucket_names = self.label_names + ("le",)
+        for labels, series in self.values.items():
+            for bound, count in zip(self.buckets, series["buckets"]):
+                lines.append(f"{self.name}_bucket{prometheus_labels(bucket_names, labels + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{prometheus_labels(bucket_names, labels + ('+Inf',))} {series['count']}")
+            lines.append(f"{self.name}_sum{prometheus_labels(self.label_names, labels)} {series['sum']}")
+            lines.append(f"{self.name}_count{prometheus_labels(self.label_names, labels)} {series['count']}")
+        return lines
+
+METRICS_REGISTRY: List[Metric] = []
+http_requests_total = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_request_duration = Histogram("http_request_duration_seconds", "Time to response start", ("method", "route"))
+http_requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled", ("method",))
+http_request_db_duration = Histogram("http_request_db_seconds", "MongoDB time spent per request", ("route",))
+http_request_db_commands = Histogram("http_request_db_commands", "MongoDB commands issued per request", ("route",), COUNT_BUCKETS)
+mongo_commands_total = Counter("mongodb_commands_total", "MongoDB commands by name and outcome", ("command", "outcome"))
+mongo_command_duration = Histogram("mongodb_command_duration_seconds", "MongoDB command latency", ("command",))
+mongo_pool_connections = Gauge("mongodb_pool_connections", "Open connections per server", ("address",))
+mongo_pool_checked_out = Gauge("mongodb_pool_checked_out", "Connections currently checked out per server", ("address",))
+mongo_pool_waiting = Gauge("mongodb_pool_wait_queue", "Operations waiting for a connection per server", ("address",))
+mongo_pool_max_size = Gauge("mongodb_pool_max_size", "Configured maximum pool size per server", ("address",))
+mongo_pool_checkout_wait = Histogram("mongodb_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection", ("address",))
+mongo_pool_checkout_failures = Counter("mongodb_pool_checkout_failures_total", "Connection checkouts that failed, by reason", ("address", "reason"))
+mongo_pool_cleared = Counter("mongodb_pool_cleared_total", "Times a server's pool was cleared after an error", ("address",))
+
+class RequestTiming:
+    """Per-request timing marks, shared with driver threads through a context variable"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.route = "unmatched"
+        self.route_started = self.route_finished = None
+        self.endpoint_started = self.endpoint_finished = None
+        self.db_seconds = 0.0
+        self.db_commands = 0
+        self.operations: Optional[List[Dict[str, Any]]] = [] if MONGO_PROFILER else None
+        self.lock = threading.Lock()
+    
+    def add_command(self, seconds: float, operation: Optional[Dict[str, Any]] = None):
+        with self.lock:
+            self.db_seconds += seconds
+            self.db_commands += 1
+            if operation is not None and self.operations is not None:
+                self.operations.append(operation)
+    
+    def breakdown(self, finished: float) -> Dict[str, float]:
+        """Milliseconds spent in the database, in handler code, resolving dependencies and serializing"""
+        endpoint = (self.endpoint_finished - self.endpoint_started) if self.endpoint_finished else 0.0
+        dependencies = (self.endpoint_started - self.route_started) if self.endpoint_started and self.route_started else 0.0
+        serialization = (self.route_finished - self.endpoint_finished) if self.route_finished and self.endpoint_finished else 0.0
+        return {
+            "total": (finished - self.started) * 1000,
+            "db": self.db_seconds * 1000,
+            "handler": max(endpoint - self.db_seconds, 0.0) * 1000,
+            "dependencies": dependencies * 1000,
+            "serialization": serialization * 1000
+        }
+
+current_request_timing: contextvars.ContextVar[Optional[RequestTiming]] = contextvars.ContextVar("current_request_timing", default=None)
+
+# Commands the profiler records, with where each keeps its filter
+PROFILED_COMMANDS = {
+    "find": "filter", "count": "query", "distinct": "query", "findAndModify": "query",
+    "aggregate": "pipeline", "update": "updates", "delete": "deletes", "insert": None
+}
+READ_COMMANDS = {"find", "count", "distinct", "aggregate"}
+WRITE_COMMANDS = {"update", "delete", "findAndModify", "insert"}
+
+def query_shape(value: Any) -> Any:
+    """Replace literal values with '?' while keeping field names and operators"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [query_shape(item) for item in value] if any(isinstance(item, dict) for item in value) else "?"
+    return "?"
+
+def command_filter(command_name: str, command: Dict[str, Any]) -> Any:
+    field = PROFILED_COMMANDS[command_name]
+    if field is None:
+        return None
+    value = command.get(field)
+    if command_name in ("update", "delete"):
+        filters = [statement.get("q", {}) for statement in value or []]
+        return filters[0] if len(filters) == 1 else filters
+    if command_name == "aggregate":
+        return [stage for stage in value or [] if "$match" in stage or "$geoNear" in stage][:1]
+    return value or {}
+
+def profile_operation(event, seconds: float, reply: Dict[str, Any]) -> Dict[str, Any]:
+    command = event.command
+    filter_value = command_filter(event.command_name, command)
+    if "cursor" in reply:
+        returned = len(reply["cursor"].get("firstBatch", []))
+    else:
+        returned = reply.get("n", reply.get("lastErrorObject", {}).get("n", 0))
+    return {
+        "command": event.command_name,
+        "collection": command.get(event.command_name) if isinstance(command.get(event.command_name), str) else None,
+        "shape": json.dumps(query_shape(filter_value), sort_keys=True),
+        "filter_key": json.dumps(filter_value, sort_keys=True, default=str),
+        "explainable": {key: value for key, value in command.items() if not key.startswith("$") and key not in ("lsid", "txnNumber", "autocommit", "startTransaction")},
+        "duration_ms": seconds * 1000,
+        "returned": returned
+    }
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Feeds command counts and latency into the metrics and the current request's timing.
+    
+    Motor runs pymongo on executor threads with the caller's context copied, so
+    the request's RequestTiming is visible here. With MONGO_PROFILER on, the
+    started event is kept until the command finishes so the operation can be
+    recorded with its filter. Started events whose command never reports back
+    (e.g. a dropped connection) are swept once they are too old or too many.
+    """
+    
+    def __init__(self):
+        self.in_flight: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (monotonic start, started event)
+        self.swept = 0
+        self.lock = threading.Lock()
+    
+    def started(self, event):
+        if MONGO_PROFILER and event.command_name in PROFILED_COMMANDS and current_request_timing.get() is not None:
+            now = time.monotonic()
+            with self.lock:
+                self.in_flight[(event.connection_id, event.request_id)] = (now, event)
+                # Insertion order is start order, so stale entries are always at the front
+                while self.in_flight:
+                    key, (started_at, _) = next(iter(self.in_flight.items()))
+                    if len(self.in_flight) <= PROFILER_MAX_IN_FLIGHT and now - started_at <= PROFILER_IN_FLIGHT_SECONDS:
+                        break
+                    del self.in_flight[key]
+                    self.swept += 1
+    
+    def pop_started(self, event) -> Any:
+        with self.lock:
+            entry = self.in_flight.pop((event.connection_id, event.request_id), None)
+        return entry[1] if entry is not None else None
+    
+    def _finished(self, event, outcome: str):
+        seconds = event.duration_micros / 1_000_000
+        mongo_commands_total.inc((event.command_name, outcome))
+        mongo_command_duration.observe((event.command_name,), seconds)
+        timing = current_request_timing.get()
+        started = self.pop_started(event) if MONGO_PROFILER else None
+        if timing is not None:
+            operation = None
+            if started is not None:
+                try:
+                    operation = profile_operation(started, seconds, getattr(event, "reply", None) or {})
+                except Exception as e:
+                    logging.debug(f"Could not profile {event.command_name}: {e}")
+            timing.add_command(seconds, operation)
+    
+    def succeeded(self, event):
+        self._finished(event, "success")
+    
+    def failed(self, event):
+        self._finished(event, "failure")
+
+def pool_address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+class MongoPoolListener(monitoring.ConnectionPoolListener):
+    """Feeds connection pool size, checkouts and checkout waits into the metrics.
+    
+    pymongo checks a connection out on the executor thread running the
+    operation, so the wait start is kept per thread.
+    """
+    
+    def __init__(self):
+        self.checkout = threading.local()
+    
+    def pool_created(self, event):
+        mongo_pool_max_size.set((pool_address(event),), event.options.get("maxPoolSize", MONGO_MAX_POOL_SIZE))
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        mongo_pool_cleared.inc((pool_address(event),))
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        mongo_pool_connections.inc((pool_address(event),))
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        mongo_pool_connections.inc((pool_address(event),), -1)
+    
+    def connection_check_out_started(self, event):
+        self.checkout.started = time.perf_counter()
+        mongo_pool_waiting.inc((pool_address(event),))
+    
+    def _waited(self, address: str):
+        mongo_pool_waiting.inc((address,), -1)
+        started = getattr(self.checkout, "started", None)
+        if started is not None:
+            mongo_pool_checkout_wait.observe((address,), time.perf_counter() - started)
+            self.checkout.started = None
+    
+    def connection_check_out_failed(self, event):
+        address = pool_address(event)
+        self._waited(address)
+        mongo_pool_checkout_failures.inc((address, event.reason))
+    
+    def connection_checked_out(self, event):
+        address = pool_address(event)
+        self._waited(address)
+        mongo_pool_checked_out.inc((address,))
+    
+    def connection_checked_in(self, event):
+        mongo_pool_checked_out.inc((pool_address(event),), -1)
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Current pool size and utilization per server, from the pool metrics"""
+    stats = {}
+    for (address,), connections in list(mongo_pool_connections.values.items()):
+        in_use = mongo_pool_checked_out.values.get((address,), 0)
+        max_size = mongo_pool_max_size.values.get((address,), MONGO_MAX_POOL_SIZE)
+        stats[address] = {
+            "connections": connections,
+            "in_use": in_use,
+            "waiting": mongo_pool_waiting.values.get((address,), 0),
+            "max_size": max_size,
+            "utilization": round(in_use / max_size, 3) if max_size else None
+        }
+    return stats
+
+class MongoProfiler:
+    """Aggregates each request's Mongo operations into a per-endpoint report.
+    
+    A request is flagged when it reads the same filter twice, re-reads a
+    document it just wrote, or issues one query shape N or more times (N+1).
+    Docs examined come from running explain once per new query shape in the
+    background, outside the request.
+    """
+    
+    def __init__(self, n_plus_one_threshold: int, max_examples: int):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.max_examples = max_examples
+        self.endpoints: Dict[str, Dict[str, Any]] = {}
+        self.explained: Dict[tuple, Optional[Dict[str, Any]]] = {}
+        self.explain_queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def detect(self, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        findings = []
+        reads_seen: Dict[tuple, int] = {}
+        written: set = set()
+        shape_counts: Dict[tuple, int] = {}
+        for index, operation in enumerate(operations):
+            key = (operation["collection"], operation["filter_key"])
+            if operation["command"] in READ_COMMANDS:
+                if key in written:
+                    findings.append({"type": "reread_after_write", "operation": index, "collection": key[0], "shape": operation["shape"]})
+                elif key in reads_seen:
+                    findings.append({"type": "repeated_filter", "operation": index, "collection": key[0], "shape": operation["shape"]})
+                reads_seen[key] = index
+                shape = (operation["command"], operation["collection"], operation["shape"])
+                shape_counts[shape] = shape_counts.get(shape, 0) + 1
+            elif operation["command"] in WRITE_COMMANDS:
+                written.add(key)
+        for (command, collection, shape), count in shape_counts.items():
+            if count >= self.n_plus_one_threshold:
+                findings.append({"type": "n_plus_one", "count": count, "collection": collection, "shape": shape})
+        return findings
+    
+    def record(self, endpoint: str, operations: List[Dict[str, Any]], db_seconds: float):
+        report = self.endpoints.setdefault(endpoint, {
+            "requests": 0, "round_trips": deque(maxlen=1000), "db_ms": 0.0,
+            "operations": {}, "findings": {}, "examples": deque(maxlen=self.max_examples)
+        })
+        report["requests"] += 1
+        report["round_trips"].append(len(operations))
+        report["db_ms"] += db_seconds * 1000
+        
+        for operation in operations:
+            key = (operation["command"], operation["collection"], operation["shape"])
+            stats = report["operations"].setdefault(key, {"count": 0, "total_ms": 0.0, "returned": 0})
+            stats["count"] += 1
+            stats["total_ms"] += operation["duration_ms"]
+            stats["returned"] += operation["returned"] or 0
+            if key not in self.explained and operation["command"] != "insert" and self.explain_queue is not None:
+                self.explained[key] = None
+                try:
+                    self.explain_queue.put_nowait((key, operation["explainable"]))
+                except asyncio.QueueFull:
+                    del self.explained[key]
+        
+        findings = self.detect(operations)
+        for finding in findings:
+            report["findings"][finding["type"]] = report["findings"].get(finding["type"], 0) + 1
+        if findings:
+            report["examples"].append({
+                "at": datetime.utcnow(),
+                "findings": findings,
+                "operations": [
+                    {field: operation[field] for field in ("command", "collection", "shape", "duration_ms", "returned")}
+                    for operation in operations
+                ]
+            })
+            logging.warning(f"Mongo profiler: {endpoint} issued {len(operations)} operations with "
+                            f"{', '.join(sorted({finding['type'] for finding in findings}))}")
+    
+    def report(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint, report in sorted(self.endpoints.items(), key=lambda item: -item[1]["requests"]):
+            round_trips = sorted(report["round_trips"])
+            endpoints[endpoint] = {
+                "requests": report["requests"],
+                "round_trips": {
+                    "avg": sum(round_trips) / len(round_trips),
+                    "p95": round_trips[min(int(len(round_trips) * 0.95), len(round_trips) - 1)],
+                    "max": round_trips[-1]
+                },
+                "db_ms_avg": report["db_ms"] / report["requests"],
+                "operations": [
+                    {
+                        "command": command,
+                        "collection": collection,
+                        "shape": shape,
+                        "per_request": stats["count"] / report["requests"],
+                        "avg_ms": stats["total_ms"] / stats["count"],
+                        "avg_returned": stats["returned"] / stats["count"],
+                        "explain": self.explained.get((command, collection, shape))
+                    }
+                    for (command, collection, shape), stats in report["operations"].items()
+                ],
+                "findings": report["findings"],
+                "examples": list(report["examples"])
+            }
+        return endpoints
+    
+    def reset(self):
+        self.endpoints = {}
+    
+    async def _explain(self, key: tuple, command: Dict[str, Any]):
+        result = await db.command({"explain": command, "verbosity": "executionStats"})
+        
+        def first(value: Any, name: str) -> Any:
+            if isinstance(value, dict):
+                if name in value:
+                    return value[name]
+                value = list(value.values())
+            if isinstance(value, list):
+                for item in value:
+                    found = first(item, name)
+                    if found is not None:
+                        return found
+            return None
+        
+        winning_plan = first(result, "winningPlan") or {}
+        self.explained[key] = {
+            "docs_examined": first(result, "totalDocsExamined"),
+            "keys_examined": first(result, "totalKeysExamined"),
+            "stage": first(winning_plan, "stage")
+        }
+    
+    async def _run(self):
+        while True:
+            key, command = await self.explain_queue.get()
+            try:
+                await self._explain(key, command)
+            except Exception as e:
+                self.explained[key] = {"error": str(e)}
+    
+    def start(self):
+        if MONGO_PROFILER and self._task is None:
+            self.explain_queue = asyncio.Queue(1000)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+mongo_profiler = MongoProfiler(PROFILER_N_PLUS_ONE_THRESHOLD, PROFILER_MAX_EXAMPLES)
+
+def timed_endpoint(endpoint: Callable) -> Callable:
+    """Record when the endpoint body starts and finishes for the request breakdown"""
+    if getattr(endpoint, "_timed", False) or not asyncio.iscoroutinefunction(endpoint):
+        return endpoint
+    
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        timing = current_request_timing.get()
+        if timing is not None:
+            timing.endpoint_started = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if timing is not None:
+                timing.endpoint_finished = time.perf_counter()
+    
+    wrapper._timed = True
+    return wrapper
+
+class TimedRoute(APIRoute):
+    """APIRoute that labels the request with its route template and marks handler phases"""
+    
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+    
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        
+        async def timed_handler(request: Request) -> Response:
+            timing = current_request_timing.get()
+            if timing is not None:
+                timing.route = self.path
+                timing.route_started = time.perf_counter()
+            response = await handler(request)
+            if timing is not None:
+                timing.route_finished = time.perf_counter()
+            return response
+        
+        return timed_handler
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    event_listeners=[MongoCommandListener(), MongoPoolListener()]
+)
 db = client[os.environ['DB_NAME']]
 
+class DatabaseLifecycle:
+    """Startup warm-up and liveness/readiness state for the Mongo client"""
+    
+    def __init__(self, warm_connections: int, readiness_timeout: float):
+        self.warm_connections = warm_connections
+        self.readiness_timeout = readiness_timeout
+        self.warmed = 0
+        self.warm_up_error: Optional[str] = None
+    
+    async def warm_up(self) -> int:
+        """Check connectivity and open the minimum pool size up front with concurrent pings"""
+        results = await asyncio.gather(
+            *(db.command("ping") for _ in range(max(self.warm_connections, 1))),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        self.warmed = len(results) - len(errors)
+        self.warm_up_error = str(errors[0]) if errors else None
+        return self.warmed
+    
+    async def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        """Whether this worker should receive traffic: Mongo answers a ping in time"""
+        report: Dict[str, Any] = {
+            "warmed_connections": self.warmed,
+            "warm_up_error": self.warm_up_error,
+            "pools": pool_stats()
+        }
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(db.command("ping"), self.readiness_timeout)
+            report["mongo"] = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+        except Exception as e:
+            report["mongo"] = {"ok": False, "error": str(e) or type(e).__name__}
+        return report["mongo"]["ok"], report
+
+db_lifecycle = DatabaseLifecycle(MONGO_MIN_POOL_SIZE, MONGO_READINESS_TIMEOUT_SECONDS)
+
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-here')
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_DELTA = timedelta(days=7)
 
+# Index management: "create" builds missing indexes at startup, "check" only
+# reports missing/unused indexes, "off" skips both
+DB_INDEX_MODE = os.environ.get('DB_INDEX_MODE', 'create')
+
+# Password hashing runs in a bounded thread pool so bcrypt never blocks the event loop
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', str(PASSWORD_HASH_WORKERS * 8)))
+
+# Orchard detail cache: local LRU in every worker, optionally backed by a shared store
+ORCHARD_CACHE_SIZE = int(os.environ.get('ORCHARD_CACHE_SIZE', '2000'))
+ORCHARD_CACHE_TTL_SECONDS = float(os.environ.get('ORCHARD_CACHE_TTL_SECONDS', '30'))
+# "" for none, or "memory" for the in-process stand-in used in tests
+ORCHARD_CACHE_SHARED_BACKEND = os.environ.get('ORCHARD_CACHE_SHARED_BACKEND', '')
+
+# Orchard listing and detail responses skip model re-validation and render with orjson
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', 'false').lower() == 'true'
+
+# Orchard views are buffered in memory and flushed in bulk. A crash loses at most
+# the views recorded since the last flush: VIEW_FLUSH_INTERVAL_SECONDS worth of
+# traffic, and never more than VIEW_FLUSH_MAX_PENDING views per worker.
+VIEW_FLUSH_INTERVAL_SECONDS = float(os.environ.get('VIEW_FLUSH_INTERVAL_SECONDS', '5'))
+VIEW_FLUSH_MAX_PENDING = int(os.environ.get('VIEW_FLUSH_MAX_PENDING', '10000'))
+VIEW_DEDUP_SECONDS = float(os.environ.get('VIEW_DEDUP_SECONDS', '0'))  # 0 disables per-viewer dedup
+
+# Idempotency-Key support for /payments/*: stored responses expire after the TTL, and
+# a claim left "in progress" by a crashed worker can be taken over after the lock timeout
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', str(24 * 3600)))
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', '60'))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', '10000'))
+
+# Admin exports stream from a cursor; this bounds rows held in memory per chunk
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '500'))
+
+# Payout job queue
+PAYOUT_LEASE_SECONDS = int(os.environ.get('PAYOUT_LEASE_SECONDS', '60'))
+PAYOUT_POLL_SECONDS = float(os.environ.get('PAYOUT_POLL_SECONDS', '1'))
+PAYOUT_BACKOFF_BASE_SECONDS = float(os.environ.get('PAYOUT_BACKOFF_BASE_SECONDS', '5'))
+PAYOUT_BACKOFF_MAX_SECONDS = float(os.environ.get('PAYOUT_BACKOFF_MAX_SECONDS', '3600'))
+PAYOUT_PROVIDER_CONCURRENCY = json.loads(os.environ.get('PAYOUT_PROVIDER_CONCURRENCY', '{"paypal": 4}'))
+PAYOUT_WORKER_IN_APP = os.environ.get('PAYOUT_WORKER_IN_APP', 'false').lower() == 'true'
+PAYOUT_MODE = os.environ.get('PAYOUT_MODE', 'batch')  # batch: per-grower batches on a cadence, single: one call per orchard
+PAYOUT_BATCH_INTERVAL_SECONDS = float(os.environ.get('PAYOUT_BATCH_INTERVAL_SECONDS', '3600'))
+PAYOUT_BATCH_MAX_ITEMS = int(os.environ.get('PAYOUT_BATCH_MAX_ITEMS', '15000'))  # PayPal Payouts API limit
+
+# Domain events emitted by the write endpoints and folded into analytics counters
+EVENT_QUEUE_SIZE = int(os.environ.get('EVENT_QUEUE_SIZE', '10000'))
+ANALYTICS_FLUSH_INTERVAL_SECONDS = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL_SECONDS', '10'))
+ANALYTICS_RECONCILE_INTERVAL_SECONDS = float(os.environ.get('ANALYTICS_RECONCILE_INTERVAL_SECONDS', '3600'))  # rollups and counters recomputed from raw data
+
+# Materialized leaderboards, refreshed from in-memory scores
+LEADERBOARD_SIZE = int(os.environ.get('LEADERBOARD_SIZE', '50'))
+LEADERBOARD_REFRESH_SECONDS = float(os.environ.get('LEADERBOARD_REFRESH_SECONDS', '30'))
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', '24'))
+TRENDING_VIEW_WEIGHT = float(os.environ.get('TRENDING_VIEW_WEIGHT', '1'))
+TRENDING_BESTOWAL_WEIGHT = float(os.environ.get('TRENDING_BESTOWAL_WEIGHT', '10'))
+
+# In-process BM25 search index
+SEARCH_BM25_K1 = float(os.environ.get('SEARCH_BM25_K1', '1.2'))
+SEARCH_BM25_B = float(os.environ.get('SEARCH_BM25_B', '0.75'))
+# Match/facet bitmaps take one bit per indexed orchard; only this many are kept
+SEARCH_BITMAP_CACHE_SIZE = int(os.environ.get('SEARCH_BITMAP_CACHE_SIZE', '1024'))
+
+# Offline gazetteer: the bundled CSV, or a GeoNames cities*.txt dump
+GAZETTEER_PATH = Path(os.environ.get('GAZETTEER_PATH', str(ROOT_DIR / 'gazetteer.csv')))
+HLL_PRECISION = 14  # 2^14 one-byte registers, ~0.8% standard error
+
+# Authenticated-user cache
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '60'))
+
 # Create the main app
 app = FastAPI(
     title="Sow2Grow Farm Mall API",
@@ -39,7 +688,7 @@ app = FastAPI(
 )
 
 # Create API router with /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=TimedRoute)
 
 # Security
 security = HTTPBearer()
@@ -76,6 +725,36 @@ class GrowthStage(str, Enum):
     GROWING = "growing"
     MATURE = "mature"
 
+class OrchardSort(str, Enum):
+    NEWEST = "created_at"
+    COMPLETION = "completion_rate"
+    VIEWS = "views"
+
+class LeaderboardKind(str, Enum):
+    TRENDING = "trending"
+    NEARLY_COMPLETE = "nearly_complete"
+    MOST_VIEWED = "most_viewed"
+
+class OrchardView(str, Enum):
+    CARD = "card"
+    FULL = "full"
+
+class PayoutJobStatus(str, Enum):
+    PENDING = "pending"
+    LEASED = "leased"
+    HELD = "held"  # Waiting on the grower's payout settings
+    SUCCEEDED = "succeeded"
+    DEAD = "dead"
+
+class ExportCollection(str, Enum):
+    PAYMENTS = "payments"
+    POCKETS = "pockets"
+    ORCHARDS = "orchards"
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
 class GiftCategory(str, Enum):
     ART = "The Gift of Art"
     ACCESSORIES = "The Gift of Accessories"
@@ -182,9 +861,12 @@ class Orchard(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     verified: bool = False
     views: int = 0
-    supporters: int = 0
+    supporters: int = 0  # Distinct bestowers, estimated by HyperLogLog
+    unique_viewers: int = 0
     completion_rate: float = 0.0
     payout_processed: bool = False
+    payout_status: Optional[str] = None  # Mirrors the payout job once the orchard is completed
+    geo: Optional[Dict[str, Any]] = None  # GeoJSON Point [lng, lat] resolved from `location`
 
 class OrchardCreateRequest(BaseModel):
     title: str
@@ -235,11 +917,31 @@ class Payment(BaseModel):
     status: PaymentStatus = PaymentStatus.PENDING
     payment_id: Optional[str] = None  # External payment ID
     order_id: Optional[str] = None  # PayPal order ID
+    idempotency_key: Optional[str] = None  # Scoped Idempotency-Key of the request that created it
     description: str
     metadata: Dict[str, Any] = {}
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class PayoutJob(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    provider: str = "paypal"
+    orchard_id: str
+    user_id: str  # The grower being paid
+    amount: float
+    currency: str = "USD"
+    status: PayoutJobStatus = PayoutJobStatus.PENDING
+    attempts: int = 0
+    max_attempts: int = 8
+    run_at: datetime = Field(default_factory=datetime.utcnow)
+    lease_expires_at: Optional[datetime] = None
+    leased_by: Optional[str] = None
+    last_error: Optional[str] = None
+    provider_reference: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = None
+
 class PaymentCreateRequest(BaseModel):
     orchard_id: Optional[str] = None
     payment_type: str
@@ -264,6 +966,8 @@ class Analytics(BaseModel):
     unique_bestowers: int = 0
     total_views: int = 0
     success_rate: float = 0.0
+    total_paid: float = 0.0
+    average_completion_days: Optional[float] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 # ===== RESPONSE MODELS =====
@@ -275,6 +979,9 @@ class APIResponse(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     request_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
 
+class PaginatedAPIResponse(APIResponse):
+    next_cursor: Optional[str] = None
+
 class LoginResponse(BaseModel):
     user: Dict[str, Any]
     access_token: str
@@ -282,17 +989,51 @@ class LoginResponse(BaseModel):
 
 class PocketSelectionRequest(BaseModel):
     orchard_id: str
-    pocket_numbers: List[int]
+    pocket_numbers: List[int] = []
+    quantity: Optional[int] = Field(default=None, gt=0)  # Pick the next free pockets instead
+
+class BasketBestowRequest(BaseModel):
+    items: List[PocketSelectionRequest] = Field(min_length=1, max_length=50)
+    atomic: bool = False  # All-or-nothing inside a Mongo transaction
 
 # ===== UTILITY FUNCTIONS =====
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
 def verify_password(password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a hash was made with a different bcrypt cost than configured"""
+    try:
+        return int(hashed_password.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_slots = asyncio.Semaphore(PASSWORD_HASH_QUEUE_LIMIT)
+
+async def run_password_job(func, *args):
+    """Run bcrypt work in the password pool, shedding load once the queue is full"""
+    if password_slots.locked():
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry",
+            headers={"Retry-After": "1"}
+        )
+    async with password_slots:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await run_password_job(hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop"""
+    return await run_password_job(verify_password, password, hashed_password)
+
 def create_access_token(data: dict) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -311,6 +1052,404 @@ def verify_token(token: str) -> dict:
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# ===== CACHES =====
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after a fixed TTL"""
+    
+    def __init__(self, name: str, max_size: int, ttl_seconds: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def peek(self, key: str) -> Any:
+        """The live value for key, without touching the stats or the LRU order"""
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None and entry[0] >= time.monotonic() else None
+    
+    def invalidate(self, key: str):
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+class InvalidationChannel:
+    """Broadcasts cache invalidations to every worker.
+    
+    Subclasses back this with a shared transport (e.g. Redis pub/sub); the base
+    class delivers messages in-process only, which is enough for a single worker
+    and for tests.
+    """
+    
+    def __init__(self):
+        self._subscribers: Dict[str, List[Any]] = {}
+    
+    def subscribe(self, cache_name: str, callback):
+        self._subscribers.setdefault(cache_name, []).append(callback)
+    
+    async def publish(self, cache_name: str, key: str):
+        self.deliver(cache_name, key)
+    
+    def deliver(self, cache_name: str, key: str):
+        """Apply an invalidation received from the transport"""
+        for callback in self._subscribers.get(cache_name, []):
+            callback(key)
+
+CACHE_REGISTRY: Dict[str, TTLCache] = {}
+invalidation_channel = InvalidationChannel()
+
+def register_cache(cache: TTLCache) -> TTLCache:
+    """Expose a cache's stats and subscribe it to cross-worker invalidations"""
+    CACHE_REGISTRY[cache.name] = cache
+    invalidation_channel.subscribe(cache.name, cache.invalidate)
+    return cache
+
+async def invalidate_cached(cache: TTLCache, key: str):
+    """Drop a key from this worker's cache and every other worker's"""
+    cache.invalidate(key)
+    await invalidation_channel.publish(cache.name, key)
+
+user_cache = register_cache(TTLCache("users", USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS))
+
+# ===== BACKGROUND FLUSHERS =====
+class PeriodicFlusher(ABC):
+    """Base for in-memory buffers that are written to the database on an interval and at shutdown"""
+    
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+    
+    @abstractmethod
+    async def flush(self):
+        """Write everything buffered so far"""
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.flush()
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+# ===== VIEW COUNTER =====
+class ViewCounter(PeriodicFlusher):
+    """Aggregates orchard views in memory and writes them with one bulk_write per flush"""
+    
+    def __init__(self, interval_seconds: float, max_pending: int, dedup_seconds: float):
+        super().__init__(interval_seconds)
+        self.max_pending = max_pending
+        self.pending: Dict[str, int] = {}
+        self.pending_total = 0
+        self.flushed_total = 0
+        self.deduplicated_total = 0
+        self.dropped_total = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self.recent_viewers = TTLCache("view_dedup", max_pending, dedup_seconds) if dedup_seconds > 0 else None
+    
+    def record(self, orchard_id: str, viewer_key: Optional[str] = None) -> bool:
+        """Count a view unless the same viewer was seen within the dedup window"""
+        if self.recent_viewers is not None and viewer_key:
+            dedup_key = f"{orchard_id}:{viewer_key}"
+            if self.recent_viewers.get(dedup_key):
+                self.deduplicated_total += 1
+                return False
+            self.recent_viewers.set(dedup_key, True)
+        
+        self.pending[orchard_id] = self.pending.get(orchard_id, 0) + 1
+        self.pending_total += 1
+        if self.pending_total >= self.max_pending and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        return True
+    
+    def pending_for(self, orchard_id: str) -> int:
+        return self.pending.get(orchard_id, 0)
+    
+    async def flush(self):
+        """Write buffered increments; on failure they are kept for the next flush, up to max_pending"""
+        async with self._flush_lock:
+            if not self.pending:
+                return
+            batch, self.pending, self.pending_total = self.pending, {}, 0
+            try:
+                await db.orchards.bulk_write(
+                    [UpdateOne({"id": orchard_id}, {"$inc": {"views": count}}) for orchard_id, count in batch.items()],
+                    ordered=False
+                )
+                self.flushed_total += sum(batch.values())
+            except Exception as e:
+                logging.error(f"View counter flush error: {e}")
+                room = max(self.max_pending - self.pending_total, 0)
+                for orchard_id, count in batch.items():
+                    kept = min(count, room)
+                    if kept:
+                        self.pending[orchard_id] = self.pending.get(orchard_id, 0) + kept
+                        self.pending_total += kept
+                        room -= kept
+                    self.dropped_total += count - kept
+
+view_counter = ViewCounter(VIEW_FLUSH_INTERVAL_SECONDS, VIEW_FLUSH_MAX_PENDING, VIEW_DEDUP_SECONDS)
+
+# ===== RESPONSE SERIALIZATION =====
+# orjson and the stdlib agree on floats in [1e-4, 1e16); outside that range orjson
+# writes `1e16` / `1.5e-7` / `0.00001` where json.dumps writes `1e+16` / `1.5e-07` / `1e-05`.
+# Matches inside string values only cost a fallback render.
+ORJSON_FLOAT_MISMATCH = re.compile(rb'[:,\[]-?(?:\d+(?:\.\d+)?e|0\.0000)')
+
+class FastJSONResponse(Response):
+    """JSON response rendered by orjson, byte-for-byte the same as JSONResponse.
+    
+    Bodies holding floats that orjson formats differently, or values it cannot
+    encode (e.g. ints past 64 bits), are rendered by the stdlib encoder instead.
+    """
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        try:
+            body = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            body = None
+        if body is None or ORJSON_FLOAT_MISMATCH.search(body):
+            return stdlib_json_body(content)
+        return body
+
+def stdlib_json_body(content: Any) -> bytes:
+    """What JSONResponse renders for content"""
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+def api_envelope(data: Any, message: str, **extra) -> Dict[str, Any]:
+    """The APIResponse envelope as a plain dict, in the key order FastAPI would emit"""
+    return {
+        "success": True,
+        "data": data,
+        "message": message,
+        "error": None,
+        "timestamp": datetime.utcnow(),
+        "request_id": str(uuid.uuid4()),
+        **extra
+    }
+
+def fast_api_response(data: Any, message: str, headers: Optional[Dict[str, str]] = None, **extra) -> FastJSONResponse:
+    return FastJSONResponse(api_envelope(data, message, **extra), headers=headers)
+
+class DocumentEncoder:
+    """Turns a stored document into the dict `Model(**doc).dict()` would give, without validation.
+    
+    The field list, defaults and numeric coercions are worked out once per
+    model; documents are trusted to already match the model's types.
+    """
+    
+    def __init__(self, model: type):
+        self.model = model
+        self.fields: List[tuple] = []
+        for name, info in model.model_fields.items():
+            factory = info.default_factory
+            if factory is None and isinstance(info.default, (list, dict)):
+                factory = info.default.copy
+            cast = None
+            types = get_args(info.annotation) if get_origin(info.annotation) is Union else (info.annotation,)
+            if float in types:
+                cast = float
+            elif int in types:
+                cast = int
+            self.fields.append((name, info.is_required(), info.default, factory, cast))
+    
+    def encode(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        data = {}
+        for name, required, default, factory, cast in self.fields:
+            if name in doc:
+                value = doc[name]
+                if cast is not None and value is not None:
+                    value = cast(value)
+            elif required:
+                raise KeyError(f"{self.model.__name__} document {doc.get('id')} is missing {name}")
+            else:
+                value = factory() if factory is not None else default
+            data[name] = value
+        return data
+
+ORCHARD_ENCODER = DocumentEncoder(Orchard)
+POCKET_ENCODER = DocumentEncoder(Pocket)
+
+def encode_orchard(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Full orchard payload with its completion rate, through the fast encoder"""
+    data = ORCHARD_ENCODER.encode(doc)
+    if data["total_pockets"] > 0:
+        data["completion_rate"] = (data["filled_pockets"] / data["total_pockets"]) * 100
+    return data
+
+# ===== ORCHARD DETAIL CACHE =====
+def json_default(value: Any) -> Any:
+    """JSON encoder fallback matching FastAPI's datetime output"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check: `*`, a comma separated list, and weak comparison of W/ tags"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+class SharedCacheBackend(ABC):
+    """Cache store shared by all workers (e.g. Redis or memcached)"""
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """The stored value, or None if missing or expired"""
+    
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl_seconds: float):
+        """Store a value that expires after ttl_seconds"""
+    
+    @abstractmethod
+    async def delete(self, key: str):
+        """Remove a key if present"""
+
+class InProcessCacheBackend(SharedCacheBackend):
+    """Dict-backed SharedCacheBackend for tests and single-worker runs; nothing is shared across processes"""
+    
+    def __init__(self):
+        self._entries: Dict[str, tuple] = {}
+    
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return entry[1]
+    
+    async def set(self, key: str, value: str, ttl_seconds: float):
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+    
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+class OrchardDetailCache:
+    """Read-through cache of orchard detail payloads with their ETags.
+    
+    A fill records the invalidation generation it started at and is dropped if
+    the key was invalidated meanwhile, so a slow read cannot put back a payload
+    that an update has already replaced.
+    """
+    
+    def __init__(self, local: TTLCache, shared: Optional[SharedCacheBackend] = None):
+        self.local = local
+        self.shared = shared
+        self.generation = 0
+        # Generation at which each key was last invalidated, kept as long as an entry could live
+        self.invalidated = TTLCache(f"{local.name}_invalidated", local.max_size, local.ttl_seconds)
+        invalidation_channel.subscribe(local.name, self.mark_invalidated)
+    
+    def mark_invalidated(self, key: str):
+        self.generation += 1
+        self.invalidated.set(key, self.generation)
+    
+    @staticmethod
+    def keys(orchard_id: str) -> List[str]:
+        return [orchard_id, f"{orchard_id}:pockets"]
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            raw = await self.shared.get(key)
+            if raw is not None:
+                entry = json.loads(raw)
+                self.local.set(key, entry)
+        return entry
+    
+    async def set(self, key: str, data: Dict[str, Any], generation: int) -> Dict[str, Any]:
+        """Build the entry for data read at `generation` and cache it unless the key was invalidated since"""
+        body = json.dumps(data, sort_keys=True, default=json_default)
+        # Weak: the served view count moves with buffered views between refills
+        entry = {"etag": f'W/"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"', "data": data}
+        invalidated = self.invalidated.peek(key)
+        if invalidated is not None and invalidated > generation:
+            return entry
+        self.local.set(key, entry)
+        if self.shared is not None:
+            await self.shared.set(key, json.dumps(entry, default=json_default), self.local.ttl_seconds)
+        return entry
+    
+    async def invalidate(self, orchard_id: str):
+        for key in self.keys(orchard_id):
+            self.mark_invalidated(key)
+            await invalidate_cached(self.local, key)
+            if self.shared is not None:
+                await self.shared.delete(key)
+
+orchard_detail_cache = OrchardDetailCache(
+    register_cache(TTLCache("orchard_detail", ORCHARD_CACHE_SIZE, ORCHARD_CACHE_TTL_SECONDS)),
+    InProcessCacheBackend() if ORCHARD_CACHE_SHARED_BACKEND == "memory" else None
+)
+
+async def load_user(user_id: str) -> Optional[User]:
+    """Get a user by id through the user cache"""
+    user = user_cache.get(user_id)
+    if user is None:
+        user_doc = await db.users.find_one({"id": user_id})
+        if not user_doc:
+            return None
+        user = User(**user_doc)
+        user_cache.set(user_id, user)
+    return user
+
 # ===== AUTHENTICATION MIDDLEWARE =====
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user from JWT token"""
@@ -321,12 +1460,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
-    # Get user from database
-    user_doc = await db.users.find_one({"id": user_id})
-    if not user_doc:
+    # Get user from cache or database
+    user = await load_user(user_id)
+    if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return User(**user_doc)
+    return user
 
 async def get_current_user_optional(authorization: str = Header(None)):
     """Get current user from JWT token (optional)"""
@@ -341,45 +1480,1997 @@ async def get_current_user_optional(authorization: str = Header(None)):
         if not user_id:
             return None
         
-        user_doc = await db.users.find_one({"id": user_id})
-        if not user_doc:
-            return None
-        
-        return User(**user_doc)
+        return await load_user(user_id)
     except:
         return None
 
-# ===== API ENDPOINTS =====
+# ===== EVENT BUS =====
+class EventBus:
+    """In-process pub/sub for domain events emitted by the write endpoints.
+    
+    Handlers run on a background task so emitting never adds latency to a request.
+    Events are lost if the queue is full or the process dies before they are handled.
+    """
+    
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.handlers: Dict[str, List[Any]] = {}
+        self.dropped = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    def subscribe(self, event_type: str, handler):
+        self.handlers.setdefault(event_type, []).append(handler)
+    
+    def emit(self, event_type: str, **payload):
+        payload.setdefault("at", datetime.utcnow())
+        try:
+            self.queue.put_nowait((event_type, payload))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logging.warning(f"Event queue full, dropped {event_type}")
+    
+    async def _dispatch(self, event_type: str, payload: Dict[str, Any]):
+        for handler in self.handlers.get(event_type, []):
+            try:
+                await handler(payload)
+            except Exception as e:
+                logging.error(f"Event handler error for {event_type}: {e}")
+    
+    async def _run(self):
+        while True:
+            event = await self.queue.get()
+            if event is None:
+                return
+            await self._dispatch(*event)
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        """Let the consumer finish every event queued so far, then end it"""
+        if self._task is not None:
+            await self.queue.put(None)
+            await self._task
+            self._task = None
 
-# Root endpoint
-@api_router.get("/")
-async def root():
-    """Root endpoint for API health check"""
-    return APIResponse(
-        success=True,
-        data={"message": "Welcome to Sow2Grow Farm Mall API"},
-        message="API is running successfully"
-    )
+event_bus = EventBus(EVENT_QUEUE_SIZE)
 
-# Authentication endpoints
-@api_router.post("/auth/register", response_model=APIResponse)
-async def register_user(request: UserCreateRequest):
-    """Register a new user"""
-    try:
-        # Check if user already exists
-        existing_user = await db.users.find_one({"email": request.email})
-        if existing_user:
-            raise HTTPException(status_code=400, detail="Email already registered")
+# ===== HYPERLOGLOG =====
+class HyperLogLog:
+    """Mergeable distinct-count sketch with one byte per register"""
+    
+    def __init__(self, registers: Optional[bytes] = None, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+    
+    def add(self, value: str):
+        hashed = int.from_bytes(hashlib.sha1(value.encode("utf-8")).digest()[:8], "big")
+        index = hashed >> (64 - self.precision)
+        remainder_bits = 64 - self.precision
+        remainder = hashed & ((1 << remainder_bits) - 1)
+        rank = remainder_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+    
+    @staticmethod
+    def _sigma(x: float) -> float:
+        if x == 1.0:
+            return math.inf
+        y, z = 1.0, x
+        while True:
+            x *= x
+            previous = z
+            z += x * y
+            y += y
+            if z == previous:
+                return z
+    
+    @staticmethod
+    def _tau(x: float) -> float:
+        if x == 0.0 or x == 1.0:
+            return 0.0
+        y, z = 1.0, 1.0 - x
+        while True:
+            x = math.sqrt(x)
+            previous = z
+            y *= 0.5
+            z -= (1 - x) ** 2 * y
+            if z == previous:
+                return z / 3
+    
+    def count(self) -> int:
+        """Ertl's improved estimator: no bias tables and no switch-over bump between small and large counts"""
+        if not any(self.registers):
+            return 0
+        max_rank = 64 - self.precision + 1
+        histogram = [self.registers.count(rank) for rank in range(max_rank + 1)]
+        z = self.size * self._tau(1 - histogram[max_rank] / self.size)
+        for rank in range(max_rank - 1, 0, -1):
+            z = 0.5 * (z + histogram[rank])
+        z += self.size * self._sigma(histogram[0] / self.size)
+        return int(round(self.size * self.size / (2 * math.log(2) * z)))
+    
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+SKETCH_MERGE_RETRIES = 5
+
+async def merge_sketches(collection, key: Dict[str, Any], values: Dict[str, set], inc: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """Add values to the named HyperLogLogs stored on the document at `key`.
+    
+    Each sketch `name` is kept as `<name>_sketch` with its estimate in `unique_<name>`.
+    Registers cannot be merged by an update operator, so this is a read-modify-write
+    guarded by a version number and retried on conflict. Returns the new estimates.
+    """
+    projection = {f"{name}_sketch": 1 for name in values}
+    projection["version"] = 1
+    for _ in range(SKETCH_MERGE_RETRIES):
+        doc = await collection.find_one(key, projection)
+        updates, counts = {}, {}
+        for name, members in values.items():
+            sketch = HyperLogLog(doc.get(f"{name}_sketch") if doc else None)
+            for member in members:
+                sketch.add(member)
+            counts[name] = sketch.count()
+            updates[f"{name}_sketch"] = sketch.to_bytes()
+            updates[f"unique_{name}"] = counts[name]
         
-        # Create new user
-        user = User(
-            email=request.email,
-            password_hash=hash_password(request.password),
-            first_name=request.first_name,
-            last_name=request.last_name,
-            location=request.location,
-            phone=request.phone
-        )
+        version = doc.get("version") if doc else None
+        try:
+            result = await collection.update_one(
+                {**key, "version": version if version is not None else {"$exists": False}},
+                {"$inc": {**(inc or {}), "version": 1}, "$set": updates},
+                upsert=doc is None
+            )
+        except OperationFailure as e:
+            if e.code != DUPLICATE_KEY_ERROR:
+                raise
+            continue
+        if result.matched_count or result.upserted_id is not None:
+            return counts
+    raise RuntimeError(f"Could not merge sketches into {collection.name} {key}")
+
+def merge_pending(pending: Dict[Any, Dict[str, Any]], key: Any, counters: Dict[str, float], values: Dict[str, set]):
+    """Accumulate counters and distinct values for one buffered row"""
+    row = pending.setdefault(key, {"counters": {}, "values": {}})
+    for name, value in counters.items():
+        row["counters"][name] = row["counters"].get(name, 0) + value
+    for name, members in values.items():
+        row["values"].setdefault(name, set()).update(members)
+
+# ===== ANALYTICS COUNTERS =====
+class AnalyticsAggregator(PeriodicFlusher):
+    """Folds domain events into per-category, per-day counters in `analytics_daily`.
+    
+    These live counters sit on top of the `analytics` rollups, which stay the
+    source of truth for reports; AnalyticsReconciler periodically recomputes
+    both from the raw collections. Each row also carries HyperLogLogs of bestowers and viewers so unique counts
+    can be merged across days and categories. Counters are buffered in memory
+    and flushed every ANALYTICS_FLUSH_INTERVAL_SECONDS.
+    
+    Events that can be replayed from the raw collections and happened before
+    `replayed_before` are ignored: a rebuild has already counted them.
+    """
+    
+    def __init__(self, interval_seconds: float, collection_name: str = "analytics_daily"):
+        super().__init__(interval_seconds)
+        self.collection_name = collection_name
+        self.pending: Dict[tuple, Dict[str, Any]] = {}
+        self.replayed_before: Optional[datetime] = None
+    
+    def fold(self, at: datetime, category: Optional[str], counters: Dict[str, float], **distinct: str):
+        """Add counters and distinct members to the category row and the overall (category=None) row"""
+        day = start_of_day(at)
+        values = {name: {member} for name, member in distinct.items() if member}
+        for row_category in {category, None}:
+            merge_pending(self.pending, (day, row_category), counters, values)
+    
+    def replayed(self, event: Dict[str, Any]) -> bool:
+        return self.replayed_before is not None and event["at"] < self.replayed_before
+    
+    def drop_replayable(self):
+        """Forget buffered counters a rebuild recomputes, keeping only views"""
+        for row in self.pending.values():
+            row["counters"] = {name: value for name, value in row["counters"].items() if name == "total_views"}
+            row["values"] = {name: members for name, members in row["values"].items() if name == "viewers"}
+    
+    async def on_orchard_created(self, event: Dict[str, Any]):
+        if not self.replayed(event):
+            self.fold(event["at"], event["category"], {"new_orchards": 1, "total_seed_value": event["seed_value"]})
+    
+    async def on_orchard_completed(self, event: Dict[str, Any]):
+        if not self.replayed(event):
+            self.fold(event["at"], event["category"], {"completed_orchards": 1, "completion_days": event["completion_days"]})
+    
+    async def on_orchard_deleted(self, event: Dict[str, Any]):
+        if not self.replayed(event):
+            completed = 1 if event["status"] == OrchardStatus.COMPLETED.value else 0
+            self.fold(event["at"], event["category"], {"deleted_orchards": 1, "deleted_completed_orchards": completed})
+    
+    async def on_orchard_viewed(self, event: Dict[str, Any]):
+        # Views are not stored anywhere else, so they are never replayed
+        self.fold(event["at"], event["category"], {"total_views": 1}, viewers=event.get("viewer_key"))
+    
+    async def on_pockets_bestowed(self, event: Dict[str, Any]):
+        if not self.replayed(event):
+            self.fold(event["at"], event["category"], {
+                "total_bestowals": 1,
+                "total_pockets": event["pockets"],
+                "total_bestowed": event["amount"]
+            }, bestowers=event["user_id"])
+    
+    async def on_payment_completed(self, event: Dict[str, Any]):
+        if self.replayed(event):
+            return
+        category = None
+        if event.get("orchard_id"):
+            orchard_doc = await db.orchards.find_one({"id": event["orchard_id"]}, {"category": 1})
+            category = orchard_doc.get("category") if orchard_doc else None
+        self.fold(event["at"], category, {"total_payments": 1, "total_paid": event["amount"]})
+    
+    async def write_pending(self):
+        """Write the buffered rows; callers hold the flush lock"""
+        collection = db[self.collection_name]
+        batch, self.pending = self.pending, {}
+        for (day, category), row in batch.items():
+            key = {"date": day, "category": category}
+            try:
+                if row["values"]:
+                    await merge_sketches(collection, key, row["values"], row["counters"])
+                else:
+                    await collection.update_one(key, {"$inc": row["counters"]}, upsert=True)
+            except Exception as e:
+                logging.error(f"Analytics counter flush error: {e}")
+                merge_pending(self.pending, (day, category), row["counters"], row["values"])
+    
+    async def flush(self):
+        async with self._flush_lock:
+            await self.write_pending()
+
+# ===== ORCHARD SKETCHES =====
+class OrchardSketchCounter(PeriodicFlusher):
+    """Maintains per-orchard HyperLogLogs of supporters and viewers in `orchard_sketches`.
+    
+    Distinct ids are buffered per orchard and merged on flush, after which the
+    estimates are copied onto the orchard as `supporters` and `unique_viewers`, so
+    a grower who bestows twice is counted once. Supporters missed through events
+    dropped by the bus are recovered by `rebuild-analytics`, which recomputes the
+    sketches from the pockets.
+    """
+    
+    def __init__(self, interval_seconds: float):
+        super().__init__(interval_seconds)
+        self.pending: Dict[str, Dict[str, Any]] = {}
+    
+    async def on_pockets_bestowed(self, event: Dict[str, Any]):
+        merge_pending(self.pending, event["orchard_id"], {}, {"supporters": {event["user_id"]}})
+    
+    async def on_orchard_viewed(self, event: Dict[str, Any]):
+        if event.get("viewer_key"):
+            merge_pending(self.pending, event["orchard_id"], {}, {"viewers": {event["viewer_key"]}})
+    
+    async def flush(self):
+        async with self._flush_lock:
+            batch, self.pending = self.pending, {}
+            for orchard_id, row in batch.items():
+                try:
+                    counts = await merge_sketches(db.orchard_sketches, {"orchard_id": orchard_id}, row["values"])
+                    update = {}
+                    if "supporters" in counts:
+                        update["supporters"] = counts["supporters"]
+                    if "viewers" in counts:
+                        update["unique_viewers"] = counts["viewers"]
+                    await db.orchards.update_one({"id": orchard_id}, {"$set": update})
+                    if "supporters" in update:
+                        await orchard_detail_cache.invalidate(orchard_id)
+                except Exception as e:
+                    logging.error(f"Orchard sketch flush error: {e}")
+                    merge_pending(self.pending, orchard_id, {}, row["values"])
+
+async def unique_counts(collection, filter_query: Dict[str, Any], names: List[str]) -> Dict[str, int]:
+    """Union the named sketches of every matching document, e.g. across days or categories"""
+    unions = {name: HyperLogLog() for name in names}
+    async for doc in collection.find(filter_query, {f"{name}_sketch": 1 for name in names}):
+        for name in names:
+            if doc.get(f"{name}_sketch"):
+                unions[name].merge(HyperLogLog(doc[f"{name}_sketch"]))
+    return {name: union.count() for name, union in unions.items()}
+
+analytics_aggregator = AnalyticsAggregator(ANALYTICS_FLUSH_INTERVAL_SECONDS)
+event_bus.subscribe("orchard.created", analytics_aggregator.on_orchard_created)
+event_bus.subscribe("orchard.completed", analytics_aggregator.on_orchard_completed)
+event_bus.subscribe("orchard.deleted", analytics_aggregator.on_orchard_deleted)
+event_bus.subscribe("orchard.viewed", analytics_aggregator.on_orchard_viewed)
+event_bus.subscribe("pockets.bestowed", analytics_aggregator.on_pockets_bestowed)
+event_bus.subscribe("payment.completed", analytics_aggregator.on_payment_completed)
+
+orchard_sketch_counter = OrchardSketchCounter(ANALYTICS_FLUSH_INTERVAL_SECONDS)
+event_bus.subscribe("orchard.viewed", orchard_sketch_counter.on_orchard_viewed)
+event_bus.subscribe("pockets.bestowed", orchard_sketch_counter.on_pockets_bestowed)
+
+async def rebuild_analytics_counters() -> int:
+    """Recompute `analytics_daily` from the raw collections, e.g. after a backfill.
+    
+    Rows are built in a scratch collection and swapped in while the live
+    aggregator's flushes are paused. Everything written before the cutoff comes
+    from the raw collections, so the live aggregator drops what it buffered and
+    ignores replayable events from before it. Views cannot be replayed and are
+    carried over from the current rows.
+    """
+    day_of = lambda field: {"$dateToString": {"format": "%Y-%m-%d", "date": field}}
+    live = analytics_aggregator
+    cutoff = datetime.utcnow()
+    live.replayed_before = cutoff
+    live.drop_replayable()
+    
+    scratch_name = "analytics_daily_rebuild"
+    aggregator = AnalyticsAggregator(ANALYTICS_FLUSH_INTERVAL_SECONDS, scratch_name)
+    async with live._flush_lock:
+        async for group in db.orchards.aggregate([
+            {"$match": {"created_at": {"$lt": cutoff}}},
+            {"$group": {
+                "_id": {"day": day_of("$created_at"), "category": "$category"},
+                "new_orchards": {"$sum": 1},
+                "total_seed_value": {"$sum": "$seed_value"}
+            }}
+        ]):
+            aggregator.fold(datetime.fromisoformat(group["_id"]["day"]), group["_id"]["category"], {
+                "new_orchards": group["new_orchards"], "total_seed_value": group["total_seed_value"]
+            })
+        
+        async for group in db.orchards.aggregate([
+            {"$match": {"status": OrchardStatus.COMPLETED.value, "updated_at": {"$lt": cutoff}}},
+            {"$group": {
+                "_id": {"day": day_of("$updated_at"), "category": "$category"},
+                "count": {"$sum": 1},
+                "days": {"$sum": {"$divide": [{"$subtract": ["$updated_at", "$created_at"]}, 86400000]}}
+            }}
+        ]):
+            aggregator.fold(datetime.fromisoformat(group["_id"]["day"]), group["_id"]["category"],
+                            {"completed_orchards": group["count"], "completion_days": group["days"]})
+        
+        # Pockets of one bestowal share orchard, user and created_at
+        async for group in db.pockets.aggregate([
+            {"$match": {"created_at": {"$lt": cutoff}}},
+            {"$group": {
+                "_id": {"orchard_id": "$orchard_id", "user_id": "$user_id", "created_at": "$created_at"},
+                "pockets": {"$sum": 1},
+                "amount": {"$sum": "$amount"}
+            }},
+            {"$lookup": {"from": "orchards", "localField": "_id.orchard_id", "foreignField": "id", "as": "orchard"}},
+            {"$unwind": "$orchard"},
+            {"$project": {"user_id": "$_id.user_id", "at": "$_id.created_at", "category": "$orchard.category",
+                          "pockets": 1, "amount": 1}}
+        ], allowDiskUse=True):
+            aggregator.fold(group["at"], group["category"], {
+                "total_bestowals": 1, "total_pockets": group["pockets"], "total_bestowed": group["amount"]
+            }, bestowers=group["user_id"])
+        
+        async for group in db.payments.aggregate([
+            {"$match": {"status": PaymentStatus.COMPLETED.value, "updated_at": {"$lt": cutoff}}},
+            {"$lookup": {"from": "orchards", "localField": "orchard_id", "foreignField": "id", "as": "orchard"}},
+            {"$group": {
+                # Payments complete (and emit their event) when last updated
+                "_id": {"day": day_of("$updated_at"), "category": {"$arrayElemAt": ["$orchard.category", 0]}},
+                "count": {"$sum": 1},
+                "amount": {"$sum": "$amount"}
+            }}
+        ]):
+            aggregator.fold(datetime.fromisoformat(group["_id"]["day"]), group["_id"]["category"],
+                            {"total_payments": group["count"], "total_paid": group["amount"]})
+        
+        scratch = db[scratch_name]
+        await scratch.drop()
+        await scratch.create_indexes(INDEX_REGISTRY["analytics_daily"])
+        await aggregator.write_pending()
+        
+        async for row in db.analytics_daily.find(
+            {"$or": [{"total_views": {"$gt": 0}}, {"viewers_sketch": {"$exists": True}}]},
+            {"date": 1, "category": 1, "total_views": 1, "viewers_sketch": 1}
+        ):
+            key = {"date": row["date"], "category": row["category"]}
+            update: Dict[str, Any] = {"$inc": {"total_views": row.get("total_views", 0)}}
+            if row.get("viewers_sketch"):
+                update["$set"] = {"viewers_sketch": row["viewers_sketch"], "unique_viewers": HyperLogLog(row["viewers_sketch"]).count()}
+            await scratch.update_one(key, update, upsert=True)
+        await scratch.rename("analytics_daily", dropTarget=True)
+    return await db.analytics_daily.count_documents({})
+
+async def rebuild_orchard_supporters() -> int:
+    """Recompute every orchard's supporter sketch from its pockets (viewers cannot be replayed)"""
+    rebuilt = 0
+    async for group in db.pockets.aggregate([
+        {"$group": {"_id": "$orchard_id", "supporters": {"$addToSet": "$user_id"}}}
+    ], allowDiskUse=True):
+        sketch = HyperLogLog()
+        for user_id in group["supporters"]:
+            sketch.add(user_id)
+        supporters = sketch.count()
+        await db.orchard_sketches.update_one(
+            {"orchard_id": group["_id"]},
+            {"$set": {"supporters_sketch": sketch.to_bytes(), "unique_supporters": supporters}, "$inc": {"version": 1}},
+            upsert=True
+        )
+        await db.orchards.update_one({"id": group["_id"]}, {"$set": {"supporters": supporters}})
+        rebuilt += 1
+    return rebuilt
+
+# ===== POCKET OCCUPANCY BITMAP =====
+# Each orchard document carries `pocket_bitmap`, a list of 32-bit words where bit
+# (n - 1) is set once pocket n is taken. Words are updated with `$bit`, so marking
+# pockets is atomic; the pockets collection remains the source of truth.
+POCKET_WORD_BITS = 32
+POCKET_WORD_MASK = (1 << POCKET_WORD_BITS) - 1
+
+def empty_pocket_bitmap(total_pockets: int) -> List[int]:
+    """Bitmap with no pockets taken"""
+    return [0] * ((total_pockets + POCKET_WORD_BITS - 1) // POCKET_WORD_BITS)
+
+def pocket_bitmap_masks(pocket_numbers: List[int]) -> Dict[int, int]:
+    """Group pocket numbers into per-word bit masks"""
+    masks = {}
+    for pocket_number in pocket_numbers:
+        word, bit = divmod(pocket_number - 1, POCKET_WORD_BITS)
+        masks[word] = masks.get(word, 0) | (1 << bit)
+    return masks
+
+def taken_pockets(bitmap: List[int], pocket_numbers: List[int]) -> List[int]:
+    """Return the requested pocket numbers whose bit is already set"""
+    taken = []
+    for pocket_number in pocket_numbers:
+        word, bit = divmod(pocket_number - 1, POCKET_WORD_BITS)
+        if word < len(bitmap) and bitmap[word] >> bit & 1:
+            taken.append(pocket_number)
+    return taken
+
+def next_free_pockets(bitmap: List[int], total_pockets: int, count: int) -> List[int]:
+    """Return the lowest `count` free pocket numbers, skipping full words"""
+    free = []
+    for word_index, word in enumerate(bitmap):
+        if word == POCKET_WORD_MASK:
+            continue
+        for bit in range(POCKET_WORD_BITS):
+            pocket_number = word_index * POCKET_WORD_BITS + bit + 1
+            if pocket_number > total_pockets:
+                return free
+            if not word >> bit & 1:
+                free.append(pocket_number)
+                if len(free) == count:
+                    return free
+    return free
+
+def encode_pocket_bitmap(bitmap: List[int], total_pockets: int) -> str:
+    """Base64 of the bitmap bytes: pocket n is bit (n - 1) % 8 of byte (n - 1) // 8"""
+    raw = b"".join(word.to_bytes(POCKET_WORD_BITS // 8, "little") for word in bitmap)
+    return base64.b64encode(raw[:(total_pockets + 7) // 8]).decode("ascii")
+
+async def ensure_pocket_bitmaps(orchard_docs: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Return each orchard's bitmap, building missing ones from the pockets collection in one read"""
+    bitmaps = {doc["id"]: doc["pocket_bitmap"] for doc in orchard_docs if doc.get("pocket_bitmap") is not None}
+    missing = {doc["id"]: empty_pocket_bitmap(doc["total_pockets"]) for doc in orchard_docs if doc["id"] not in bitmaps}
+    if not missing:
+        return bitmaps
+    
+    async for pocket in db.pockets.find({"orchard_id": {"$in": list(missing)}}, {"orchard_id": 1, "pocket_number": 1}):
+        bitmap = missing[pocket["orchard_id"]]
+        word, bit = divmod(pocket["pocket_number"] - 1, POCKET_WORD_BITS)
+        if word < len(bitmap):
+            bitmap[word] |= 1 << bit
+    
+    # Only the first backfill wins; later $bit updates are applied on top of it
+    await db.orchards.bulk_write([
+        UpdateOne({"id": orchard_id, "pocket_bitmap": {"$exists": False}}, {"$set": {"pocket_bitmap": bitmap}})
+        for orchard_id, bitmap in missing.items()
+    ], ordered=False)
+    return {**bitmaps, **missing}
+
+async def ensure_pocket_bitmap(orchard_doc: Dict[str, Any]) -> List[int]:
+    """Return the orchard's bitmap, building it once from the pockets collection if missing"""
+    return (await ensure_pocket_bitmaps([orchard_doc]))[orchard_doc["id"]]
+
+async def mark_pockets_taken(orchard_id: str, pocket_numbers: List[int]):
+    """Set the bits of newly claimed pockets"""
+    masks = pocket_bitmap_masks(pocket_numbers)
+    await db.orchards.update_one(
+        {"id": orchard_id},
+        {"$bit": {f"pocket_bitmap.{word}": {"or": mask} for word, mask in masks.items()}}
+    )
+
+async def release_pockets(orchard_id: str, pockets: List[Dict[str, Any]]):
+    """Undo a claim whose counter updates did not complete: drop the pocket documents and clear their bits.
+    
+    The unique pocket index means nobody else holds these pocket numbers, so
+    clearing their bits is safe. Failures are logged; `reconcile-pockets` repairs
+    whatever is left.
+    """
+    try:
+        await db.pockets.delete_many({"id": {"$in": [pocket["id"] for pocket in pockets]}})
+        masks = pocket_bitmap_masks([pocket["pocket_number"] for pocket in pockets])
+        await db.orchards.update_one(
+            {"id": orchard_id},
+            {"$bit": {f"pocket_bitmap.{word}": {"and": POCKET_WORD_MASK ^ mask} for word, mask in masks.items()}}
+        )
+    except Exception as e:
+        logging.error(f"Could not release pockets of orchard {orchard_id}, run manage.py reconcile-pockets: {e}")
+
+async def reconcile_orchard_pockets(orchard_ids: Optional[List[str]] = None) -> int:
+    """Recompute filled_pockets, completion_rate and pocket_bitmap from the pockets collection.
+    
+    Repairs counters left behind by a bestowal that failed between its writes.
+    A bestowal in flight while this runs can be counted twice, so run it when
+    the orchards are quiet. Returns the number of orchards whose counters changed.
+    """
+    query = {"id": {"$in": orchard_ids}} if orchard_ids is not None else {}
+    repaired = 0
+    async for orchard in db.orchards.find(query, {"_id": 0, "id": 1, "total_pockets": 1, "filled_pockets": 1, "pocket_bitmap": 1}):
+        bitmap = empty_pocket_bitmap(orchard["total_pockets"])
+        filled = 0
+        async for pocket in db.pockets.find({"orchard_id": orchard["id"]}, {"_id": 0, "pocket_number": 1}):
+            word, bit = divmod(pocket["pocket_number"] - 1, POCKET_WORD_BITS)
+            if word < len(bitmap):
+                bitmap[word] |= 1 << bit
+            filled += 1
+        if filled == orchard.get("filled_pockets") and bitmap == orchard.get("pocket_bitmap"):
+            continue
+        total = orchard["total_pockets"]
+        await db.orchards.update_one({"id": orchard["id"]}, {"$set": {
+            "filled_pockets": filled,
+            "completion_rate": (filled / total) * 100 if total > 0 else 0.0,
+            "pocket_bitmap": bitmap,
+            "updated_at": datetime.utcnow()
+        }})
+        await orchard_detail_cache.invalidate(orchard["id"])
+        repaired += 1
+    return repaired
+
+# ===== POCKET RESERVATION =====
+DUPLICATE_KEY_ERROR = 11000
+POCKET_SELECTION_ATTEMPTS = 3
+
+def pocket_selection_error(orchard: Orchard, pocket_numbers: List[int]) -> Optional[str]:
+    """Validate requested pocket numbers against the orchard, returning an error message"""
+    invalid_pockets = [pn for pn in pocket_numbers if pn < 1 or pn > orchard.total_pockets]
+    if invalid_pockets:
+        return f"Pockets {invalid_pockets} do not exist"
+    if len(set(pocket_numbers)) != len(pocket_numbers):
+        return "Pocket numbers must be unique"
+    return None
+
+def build_pockets(orchard: Orchard, pocket_numbers: List[int], user: User, now: datetime) -> List[Dict[str, Any]]:
+    """Pocket documents for one bestowal; they share a timestamp so they can be grouped back together"""
+    return [
+        Pocket(
+            orchard_id=orchard.id,
+            pocket_number=pocket_number,
+            user_id=user.id,
+            amount=orchard.pocket_price,
+            bestower_name=f"{user.first_name} {user.last_name[0]}.",
+            created_at=now,
+            updated_at=now
+        ).dict()
+        for pocket_number in pocket_numbers
+    ]
+
+async def reserve_pockets(orchard: Orchard, pocket_numbers: List[int], user: User) -> tuple:
+    """Claim pockets in one round trip, relying on the unique (orchard_id, pocket_number) index.
+    
+    Returns (pocket_docs, conflicting_pocket_numbers). When any pocket is already
+    taken the pockets claimed by this call are released again, so a reservation
+    is all-or-nothing.
+    """
+    pockets = build_pockets(orchard, pocket_numbers, user, datetime.utcnow())
+    
+    try:
+        await db.pockets.insert_many(pockets, ordered=False)
+    except BulkWriteError as e:
+        failed_indexes = duplicate_pocket_indexes(e)
+        conflicts = sorted(pockets[i]["pocket_number"] for i in failed_indexes)
+        claimed_ids = [p["id"] for i, p in enumerate(pockets) if i not in failed_indexes]
+        if claimed_ids:
+            await db.pockets.delete_many({"id": {"$in": claimed_ids}})
+        return [], conflicts
+    
+    return pockets, []
+
+def filled_pockets_pipeline(count: int) -> List[Dict[str, Any]]:
+    """Update pipeline for one bestowal: adds to filled_pockets and recomputes completion_rate.
+    
+    `supporters` is not touched here; the orchard sketches count each bestower once.
+    """
+    return [
+        {"$set": {
+            "filled_pockets": {"$add": ["$filled_pockets", count]},
+            "updated_at": datetime.utcnow()
+        }},
+        {"$set": {
+            "completion_rate": {
+                "$cond": [
+                    {"$gt": ["$total_pockets", 0]},
+                    {"$multiply": [{"$divide": ["$filled_pockets", "$total_pockets"]}, 100]},
+                    0.0
+                ]
+            }
+        }}
+    ]
+
+async def increment_filled_pockets(orchard_id: str, count: int) -> Optional[Dict[str, Any]]:
+    """Atomically add to filled_pockets and recompute completion_rate"""
+    return await db.orchards.find_one_and_update(
+        {"id": orchard_id},
+        filled_pockets_pipeline(count),
+        return_document=ReturnDocument.AFTER
+    )
+
+def duplicate_pocket_indexes(error: BulkWriteError) -> set:
+    """Indexes of the inserted documents rejected by the unique pocket index"""
+    write_errors = error.details.get("writeErrors", [])
+    if any(write_error["code"] != DUPLICATE_KEY_ERROR for write_error in write_errors):
+        raise error
+    return {write_error["index"] for write_error in write_errors}
+
+def pocket_counter_updates(orchard_id: str, pocket_numbers: List[int]) -> List[UpdateOne]:
+    """Bulk operations applying a bestowal to the orchard's counters and bitmap"""
+    masks = pocket_bitmap_masks(pocket_numbers)
+    return [
+        UpdateOne({"id": orchard_id}, filled_pockets_pipeline(len(pocket_numbers))),
+        UpdateOne({"id": orchard_id}, {"$bit": {f"pocket_bitmap.{word}": {"or": mask} for word, mask in masks.items()}})
+    ]
+
+async def commit_basket(selections: List[tuple], user: User, atomic: bool) -> tuple:
+    """Insert the pockets of many orchards at once and update all their counters in one bulk_write.
+    
+    `selections` holds (orchard, pocket_numbers) pairs that already passed validation.
+    Returns (committed pockets per orchard id, conflicting pocket numbers per orchard id).
+    With `atomic` everything runs in one transaction and any conflict commits nothing.
+    """
+    now = datetime.utcnow()
+    pockets_by_orchard = {
+        orchard.id: build_pockets(orchard, pocket_numbers, user, now)
+        for orchard, pocket_numbers in selections
+    }
+    all_pockets = [pocket for pockets in pockets_by_orchard.values() for pocket in pockets]
+    
+    def conflicts_for(failed_indexes: set) -> Dict[str, List[int]]:
+        conflicts: Dict[str, List[int]] = {}
+        for index in sorted(failed_indexes):
+            pocket = all_pockets[index]
+            conflicts.setdefault(pocket["orchard_id"], []).append(pocket["pocket_number"])
+        return conflicts
+    
+    if atomic:
+        try:
+            async with await client.start_session() as session:
+                async with session.start_transaction():
+                    try:
+                        await db.pockets.insert_many(all_pockets, session=session)
+                    except BulkWriteError as e:
+                        await session.abort_transaction()
+                        return {}, conflicts_for(duplicate_pocket_indexes(e))
+                    await db.orchards.bulk_write(
+                        [op for orchard_id, pockets in pockets_by_orchard.items()
+                         for op in pocket_counter_updates(orchard_id, [p["pocket_number"] for p in pockets])],
+                        session=session
+                    )
+        except OperationFailure as e:
+            if e.code != 20:  # IllegalOperation: a standalone mongod has no transactions
+                raise
+            raise HTTPException(
+                status_code=400,
+                detail="Atomic baskets need MongoDB running as a replica set; retry with atomic=false"
+            )
+        return pockets_by_orchard, {}
+    
+    conflicts: Dict[str, List[int]] = {}
+    try:
+        await db.pockets.insert_many(all_pockets, ordered=False)
+    except BulkWriteError as e:
+        failed_indexes = duplicate_pocket_indexes(e)
+        conflicts = conflicts_for(failed_indexes)
+        # Orchards with any conflict are all-or-nothing: release what they did claim
+        released_ids = [
+            pocket["id"] for i, pocket in enumerate(all_pockets)
+            if pocket["orchard_id"] in conflicts and i not in failed_indexes
+        ]
+        if released_ids:
+            await db.pockets.delete_many({"id": {"$in": released_ids}})
+    
+    committed = {orchard_id: pockets for orchard_id, pockets in pockets_by_orchard.items() if orchard_id not in conflicts}
+    if committed:
+        try:
+            await db.orchards.bulk_write(
+                [op for orchard_id, pockets in committed.items()
+                 for op in pocket_counter_updates(orchard_id, [p["pocket_number"] for p in pockets])],
+                ordered=False
+            )
+        except Exception as e:
+            # Each orchard has a counter update then a bitmap update; release the
+            # pockets of orchards whose counter update is not known to have applied
+            if isinstance(e, BulkWriteError):
+                failed = {error["index"] // 2 for error in e.details.get("writeErrors", []) if error["index"] % 2 == 0}
+            else:
+                failed = set(range(len(committed)))
+            for position, (orchard_id, pockets) in enumerate(committed.items()):
+                if position in failed:
+                    await release_pockets(orchard_id, pockets)
+            raise
+    return committed, conflicts
+
+# ===== IDEMPOTENCY =====
+idempotency_cache = register_cache(TTLCache("idempotency", IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL_SECONDS))
+idempotency_inflight: Dict[str, asyncio.Future] = {}
+
+async def claim_idempotency_key(scoped_key: str, fingerprint: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Claim a key in the idempotency collection.
+    
+    Returns the stored response if it already completed, and whether the claim
+    was taken over from a worker that may have crashed part-way through.
+    """
+    now = datetime.utcnow()
+    try:
+        await db.idempotency_keys.insert_one({
+            "_id": scoped_key,
+            "fingerprint": fingerprint,
+            "status": "in_progress",
+            "locked_at": now,
+            "created_at": now
+        })
+        return None, False
+    except DuplicateKeyError:
+        pass
+    
+    existing = await db.idempotency_keys.find_one({"_id": scoped_key})
+    if existing is None:
+        # Expired between the insert and the read; claim it again
+        return await claim_idempotency_key(scoped_key, fingerprint)
+    if existing["fingerprint"] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was reused with a different request")
+    if existing["status"] == "completed":
+        return existing["response"], False
+    
+    # Take over a claim abandoned by a crashed worker
+    taken_over = await db.idempotency_keys.find_one_and_update(
+        {"_id": scoped_key, "status": "in_progress", "locked_at": {"$lt": now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)}},
+        {"$set": {"locked_at": now}}
+    )
+    if taken_over is None:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+    return None, True
+
+async def run_idempotent(
+    idempotency_key: Optional[str],
+    scope: str,
+    payload: Dict[str, Any],
+    process: Callable[[Optional[str]], Awaitable[APIResponse]],
+    recover: Optional[Callable[[str], Awaitable[Optional[APIResponse]]]] = None
+) -> APIResponse:
+    """Run `process` at most once per Idempotency-Key and replay its response for retries.
+    
+    `process` receives the scoped key to record alongside whatever it creates.
+    When a claim is taken over from a crashed worker, `recover` looks that up
+    first and its response is used instead of running `process` again.
+    """
+    if not idempotency_key:
+        return await process(None)
+    if len(idempotency_key) > 255:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+    
+    scoped_key = f"{scope}:{idempotency_key}"
+    fingerprint = hashlib.sha256(json.dumps(payload, sort_keys=True, default=json_default).encode("utf-8")).hexdigest()
+    
+    # Fast path: completed in this worker, or identical request currently running here
+    cached = idempotency_cache.get(scoped_key)
+    if cached is not None:
+        if cached["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was reused with a different request")
+        return APIResponse(**cached["response"])
+    if scoped_key in idempotency_inflight:
+        return APIResponse(**await asyncio.shield(idempotency_inflight[scoped_key]))
+    
+    future = asyncio.get_running_loop().create_future()
+    idempotency_inflight[scoped_key] = future
+    try:
+        stored, taken_over = await claim_idempotency_key(scoped_key, fingerprint)
+        if stored is None:
+            response = await recover(scoped_key) if taken_over and recover else None
+            if response is None:
+                try:
+                    response = await process(scoped_key)
+                except BaseException:
+                    await db.idempotency_keys.delete_one({"_id": scoped_key, "status": "in_progress"})
+                    raise
+            stored = response.dict()
+            try:
+                await db.idempotency_keys.update_one(
+                    {"_id": scoped_key},
+                    {"$set": {"status": "completed", "response": stored}}
+                )
+            except Exception as e:
+                # The work is done; a retry after the lock timeout recovers it instead of redoing it
+                logging.warning(f"Could not record completion of idempotency key {scoped_key}: {e}")
+        idempotency_cache.set(scoped_key, {"fingerprint": fingerprint, "response": stored})
+        future.set_result(stored)
+        return APIResponse(**stored)
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved when nobody else is waiting
+        raise
+    finally:
+        idempotency_inflight.pop(scoped_key, None)
+
+# ===== PAYOUT QUEUE =====
+class PayoutError(Exception):
+    """Raised by payout providers; retryable errors are retried with backoff, others dead-letter the job"""
+    
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+NO_PAYPAL_ACCOUNT = "Grower has no PayPal account"
+
+class PayPalPayoutStub:
+    """Local stand-in for the PayPal Payouts API with configurable latency and failure rate"""
+    
+    def __init__(self, latency_seconds: float = 0.2, failure_rate: float = 0.0,
+                 fee_per_item: float = 0.25, fee_rate: float = 0.02, fee_cap: float = 20.0):
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self.fee_per_item = fee_per_item
+        self.fee_rate = fee_rate
+        self.fee_cap = fee_cap
+        self.calls = 0
+        self.items = 0
+        self.fees = 0.0
+        self.sent_items: Dict[str, str] = {}  # sender_item_id / sender_batch_id -> payout reference
+    
+    def item_fee(self, amount: float) -> float:
+        return self.fee_per_item + min(amount * self.fee_rate, self.fee_cap)
+    
+    async def _call(self, amounts: List[float]) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency_seconds)
+        if random.random() < self.failure_rate:
+            raise PayoutError("PayPal stub: simulated transient failure")
+        self.items += len(amounts)
+        self.fees += sum(self.item_fee(amount) for amount in amounts)
+        return f"stub_payout_{uuid.uuid4().hex[:12]}"
+    
+    async def send_payout(self, job: PayoutJob, account: PayPalAccount) -> str:
+        """Pay one job; job.id is the sender_item_id, so a retried job is paid once"""
+        if job.id not in self.sent_items:
+            self.sent_items[job.id] = await self._call([job.amount])
+        return self.sent_items[job.id]
+    
+    async def send_batch(self, sender_batch_id: str, items: List[Dict[str, Any]]) -> str:
+        """One Payouts API request covering many receivers; a repeated sender_batch_id is paid once"""
+        if sender_batch_id not in self.sent_items:
+            self.sent_items[sender_batch_id] = await self._call([item["amount"] for item in items])
+        return self.sent_items[sender_batch_id]
+
+PAYOUT_PROVIDERS: Dict[str, Any] = {
+    "paypal": PayPalPayoutStub(
+        latency_seconds=float(os.environ.get('PAYPAL_STUB_LATENCY_SECONDS', '0.2')),
+        failure_rate=float(os.environ.get('PAYPAL_STUB_FAILURE_RATE', '0'))
+    )
+}
+
+def payout_backoff(attempts: int) -> timedelta:
+    """Exponential backoff with full jitter"""
+    ceiling = min(PAYOUT_BACKOFF_MAX_SECONDS, PAYOUT_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+class PayoutQueueMetrics:
+    """Throughput and latency samples for the payout worker in this process"""
+    
+    def __init__(self, window: int = 1000):
+        self.counters = {"leased": 0, "succeeded": 0, "retried": 0, "held": 0, "dead": 0}
+        self.queue_latency = deque(maxlen=window)  # run_at -> lease
+        self.process_latency = deque(maxlen=window)  # lease -> finished
+        self.completions = deque(maxlen=window)  # monotonic finish times
+    
+    @staticmethod
+    def percentile(samples, q: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+    
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        recent = [t for t in self.completions if now - t <= 60]
+        return {
+            **self.counters,
+            "throughput_per_minute": len(recent),
+            "queue_latency_p50": self.percentile(self.queue_latency, 0.5),
+            "queue_latency_p95": self.percentile(self.queue_latency, 0.95),
+            "process_latency_p50": self.percentile(self.process_latency, 0.5),
+            "process_latency_p95": self.percentile(self.process_latency, 0.95)
+        }
+
+async def set_orchard_payout_status(orchard_ids: List[str], status: str):
+    await db.orchards.update_many(
+        {"id": {"$in": orchard_ids}},
+        {"$set": {
+            "payout_status": status,
+            "payout_processed": status == PayoutJobStatus.SUCCEEDED.value
+        }}
+    )
+    for orchard_id in orchard_ids:
+        await orchard_detail_cache.invalidate(orchard_id)
+
+async def enqueue_payout(orchard: Orchard) -> Optional[PayoutJob]:
+    """Queue the payout of a completed orchard; returns None if one is already queued"""
+    job = PayoutJob(
+        orchard_id=orchard.id,
+        user_id=orchard.user_id,
+        amount=orchard.filled_pockets * orchard.pocket_price
+    )
+    try:
+        await db.payout_jobs.insert_one(job.dict())
+    except DuplicateKeyError:
+        return None
+    return job
+
+async def requeue_payouts_for_account(account: PayPalAccount) -> int:
+    """Queue a grower's held jobs again once their account settings let them pay out.
+    
+    The worker only reads the account when it leases a job, so without this a
+    held job never runs again. Jobs dead-lettered for want of an account are
+    requeued too. Errors are logged: the account change itself has succeeded.
+    """
+    clauses: List[Dict[str, Any]] = [{"status": PayoutJobStatus.DEAD.value, "last_error": NO_PAYPAL_ACCOUNT}]
+    if account.auto_payouts:
+        clauses.append({"status": PayoutJobStatus.HELD.value, "amount": {"$gte": account.minimum_payout}})
+    filter_query = {"user_id": account.user_id, "$or": clauses}
+    try:
+        orchard_ids = await db.payout_jobs.distinct("orchard_id", filter_query)
+        if not orchard_ids:
+            return 0
+        now = datetime.utcnow()
+        result = await db.payout_jobs.update_many(filter_query, {"$set": {
+            "status": PayoutJobStatus.PENDING.value,
+            "run_at": now,
+            "last_error": None,
+            "updated_at": now
+        }})
+        await set_orchard_payout_status(orchard_ids, PayoutJobStatus.PENDING.value)
+        return result.modified_count
+    except Exception as e:
+        logging.error(f"Requeueing payouts for {account.user_id} failed: {e}")
+        return 0
+
+class PayoutWorker:
+    """Leases payout jobs from Mongo and runs them against the providers.
+    
+    A job is leased with find_one_and_update, so any number of workers can poll
+    the same collection. Leases that expire (crashed worker) are picked up again.
+    Concurrency is capped per provider within each worker process.
+    """
+    
+    def __init__(self, providers: Dict[str, Any], concurrency: Dict[str, int]):
+        self.providers = providers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = {provider: concurrency.get(provider, 1) for provider in providers}
+        self.slots = {provider: asyncio.Semaphore(limit) for provider, limit in self.concurrency.items()}
+        self.metrics = PayoutQueueMetrics()
+        self._tasks: List[asyncio.Task] = []
+    
+    async def lease(self, provider: str) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await db.payout_jobs.find_one_and_update(
+            {"provider": provider, "$or": [
+                {"status": PayoutJobStatus.PENDING.value, "run_at": {"$lte": now}},
+                {"status": PayoutJobStatus.LEASED.value, "lease_expires_at": {"$lt": now}}
+            ]},
+            {
+                "$set": {
+                    "status": PayoutJobStatus.LEASED.value,
+                    "leased_by": self.worker_id,
+                    "lease_expires_at": now + timedelta(seconds=PAYOUT_LEASE_SECONDS),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def finish(self, job: PayoutJob, update: Dict[str, Any]) -> bool:
+        """Write the outcome, only if this worker still holds the lease"""
+        update["updated_at"] = datetime.utcnow()
+        result = await db.payout_jobs.update_one(
+            {
+                "id": job.id,
+                "leased_by": self.worker_id,
+                "lease_expires_at": job.lease_expires_at,
+                "status": PayoutJobStatus.LEASED.value
+            },
+            {"$set": update}
+        )
+        if result.modified_count == 0:
+            logging.warning(f"Payout job {job.id} lease lost before finishing; leaving it to the new holder")
+            return False
+        await set_orchard_payout_status([job.orchard_id], update["status"])
+        return True
+    
+    async def run_job(self, job: PayoutJob):
+        started = time.monotonic()
+        self.metrics.counters["leased"] += 1
+        self.metrics.queue_latency.append((datetime.utcnow() - job.run_at).total_seconds())
+        try:
+            account_doc = await db.paypal_accounts.find_one({"user_id": job.user_id})
+            if not account_doc:
+                raise PayoutError(NO_PAYPAL_ACCOUNT, retryable=False)
+            account = PayPalAccount(**account_doc)
+            if not account.auto_payouts or job.amount < account.minimum_payout:
+                self.metrics.counters["held"] += 1
+                await self.finish(job, {"status": PayoutJobStatus.HELD.value, "last_error": None})
+                return
+            
+            reference = await asyncio.wait_for(
+                self.providers[job.provider].send_payout(job, account),
+                timeout=PAYOUT_LEASE_SECONDS / 2
+            )
+            self.metrics.counters["succeeded"] += 1
+            await self.finish(job, {
+                "status": PayoutJobStatus.SUCCEEDED.value,
+                "provider_reference": reference,
+                "completed_at": datetime.utcnow(),
+                "last_error": None
+            })
+        except Exception as e:
+            retryable = isinstance(e, asyncio.TimeoutError) or getattr(e, "retryable", True)
+            if retryable and job.attempts < job.max_attempts:
+                self.metrics.counters["retried"] += 1
+                await self.finish(job, {
+                    "status": PayoutJobStatus.PENDING.value,
+                    "run_at": datetime.utcnow() + payout_backoff(job.attempts),
+                    "last_error": str(e)
+                })
+            else:
+                self.metrics.counters["dead"] += 1
+                logging.error(f"Payout job {job.id} dead-lettered: {e}")
+                await self.finish(job, {"status": PayoutJobStatus.DEAD.value, "last_error": str(e)})
+        finally:
+            self.metrics.process_latency.append(time.monotonic() - started)
+            self.metrics.completions.append(time.monotonic())
+    
+    async def _run_slot(self, provider: str, slot: asyncio.Semaphore):
+        while True:
+            async with slot:
+                try:
+                    job_doc = await self.lease(provider)
+                except Exception as e:
+                    logging.error(f"Payout lease error: {e}")
+                    job_doc = None
+                if job_doc:
+                    await self.run_job(PayoutJob(**job_doc))
+                    continue
+            await asyncio.sleep(PAYOUT_POLL_SECONDS)
+    
+    def start(self):
+        if not self._tasks:
+            loop = asyncio.get_running_loop()
+            for provider, slot in self.slots.items():
+                for _ in range(self.concurrency[provider]):
+                    self._tasks.append(loop.create_task(self._run_slot(provider, slot)))
+    
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+payout_worker = PayoutWorker(PAYOUT_PROVIDERS, PAYOUT_PROVIDER_CONCURRENCY)
+
+def plan_payout_batches(
+    totals: Dict[str, float],
+    accounts: Dict[str, Dict[str, Any]],
+    max_items: int
+) -> Tuple[List[List[Dict[str, Any]]], List[str]]:
+    """Split per-grower totals into provider batches; growers below their minimum or without auto payouts are held.
+    
+    Every grower in `totals` must have an entry in `accounts`.
+    """
+    items, held = [], []
+    for user_id, amount in totals.items():
+        account = accounts[user_id]
+        if not account.get("auto_payouts", True) or amount < account.get("minimum_payout", 50.0):
+            held.append(user_id)
+            continue
+        items.append({
+            "user_id": user_id,
+            "receiver": account["email"],
+            "amount": round(amount, 2),
+            "currency": account.get("currency", "USD")
+        })
+    return [items[i:i + max_items] for i in range(0, len(items), max_items)], held
+
+def payout_batch_id(job_ids: List[str]) -> str:
+    """sender_batch_id for a set of jobs, so retrying the same jobs cannot pay them twice"""
+    return hashlib.sha256(",".join(sorted(job_ids)).encode("utf-8")).hexdigest()[:32]
+
+class PayoutBatchScheduler(PeriodicFlusher):
+    """Accumulates queued orchard payouts per grower and pays them out in provider batches.
+    
+    Each tick sums the due pending/held jobs per grower, dead-letters the jobs of
+    growers without a PayPal account, holds growers who are below minimum_payout
+    or have auto_payouts off, and sends everyone else in as few Payouts API calls
+    as the provider's batch limit allows.
+    """
+    
+    def __init__(self, provider: str, interval_seconds: float, max_items: int):
+        super().__init__(interval_seconds)
+        self.provider = provider
+        self.max_items = max_items
+        self.counters = {"ticks": 0, "batches": 0, "growers_paid": 0, "jobs_paid": 0, "jobs_held": 0, "batches_failed": 0, "dead": 0}
+    
+    async def claim(self, lease_id: str, user_ids: List[str], now: datetime) -> List[Dict[str, Any]]:
+        """Lease the growers' due jobs under lease_id and return the ones this batch now owns"""
+        await db.payout_jobs.update_many(
+            {**self.due_filter(now), "user_id": {"$in": user_ids}},
+            {
+                "$set": {
+                    "status": PayoutJobStatus.LEASED.value,
+                    "leased_by": lease_id,
+                    "lease_expires_at": now + timedelta(seconds=PAYOUT_LEASE_SECONDS),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            }
+        )
+        return await db.payout_jobs.find({"leased_by": lease_id, "status": PayoutJobStatus.LEASED.value}, {"_id": 0}).to_list(None)
+    
+    def due_filter(self, now: datetime) -> Dict[str, Any]:
+        return {"provider": self.provider, "$or": [
+            {"status": {"$in": [PayoutJobStatus.PENDING.value, PayoutJobStatus.HELD.value]}, "run_at": {"$lte": now}},
+            {"status": PayoutJobStatus.LEASED.value, "lease_expires_at": {"$lt": now}}
+        ]}
+    
+    async def dead_letter(self, user_ids: List[str], now: datetime, reason: str):
+        """Dead-letter the growers' due jobs; they can be retried from the admin payout queue"""
+        filter_query = {**self.due_filter(now), "user_id": {"$in": user_ids}}
+        orchard_ids = await db.payout_jobs.distinct("orchard_id", filter_query)
+        result = await db.payout_jobs.update_many(
+            filter_query,
+            {"$set": {"status": PayoutJobStatus.DEAD.value, "last_error": reason, "updated_at": now}}
+        )
+        self.counters["dead"] += result.modified_count
+        await set_orchard_payout_status(orchard_ids, PayoutJobStatus.DEAD.value)
+        logging.error(f"Dead-lettered {result.modified_count} payout jobs of {len(user_ids)} growers: {reason}")
+    
+    async def send(self, lease_id: str, jobs: List[Dict[str, Any]], accounts: Dict[str, Dict[str, Any]]):
+        totals: Dict[str, float] = {}
+        for job in jobs:
+            totals[job["user_id"]] = totals.get(job["user_id"], 0.0) + job["amount"]
+        items = [
+            {"user_id": user_id, "receiver": accounts[user_id]["email"], "amount": round(amount, 2),
+             "currency": accounts[user_id].get("currency", "USD")}
+            for user_id, amount in totals.items()
+        ]
+        job_ids = [job["id"] for job in jobs]
+        batch_id = payout_batch_id(job_ids)
+        orchard_ids = [job["orchard_id"] for job in jobs]
+        
+        try:
+            reference = await asyncio.wait_for(
+                PAYOUT_PROVIDERS[self.provider].send_batch(batch_id, items),
+                timeout=PAYOUT_LEASE_SECONDS / 2
+            )
+        except Exception as e:
+            self.counters["batches_failed"] += 1
+            logging.error(f"Payout batch {batch_id} failed: {e}")
+            retryable = isinstance(e, asyncio.TimeoutError) or getattr(e, "retryable", True)
+            now = datetime.utcnow()
+            exhausted = [job for job in jobs if not retryable or job["attempts"] >= job["max_attempts"]]
+            if exhausted:
+                self.counters["dead"] += len(exhausted)
+                await db.payout_jobs.update_many(
+                    {"id": {"$in": [job["id"] for job in exhausted]}, "leased_by": lease_id},
+                    {"$set": {"status": PayoutJobStatus.DEAD.value, "last_error": str(e), "updated_at": now}}
+                )
+                await set_orchard_payout_status([job["orchard_id"] for job in exhausted], PayoutJobStatus.DEAD.value)
+            await db.payout_jobs.update_many(
+                {"id": {"$in": job_ids}, "leased_by": lease_id, "status": PayoutJobStatus.LEASED.value},
+                {"$set": {
+                    "status": PayoutJobStatus.PENDING.value,
+                    "run_at": now + payout_backoff(max(job["attempts"] for job in jobs)),
+                    "last_error": str(e),
+                    "updated_at": now
+                }}
+            )
+            return
+        
+        now = datetime.utcnow()
+        await db.payout_jobs.update_many(
+            {"id": {"$in": job_ids}, "leased_by": lease_id},
+            {"$set": {
+                "status": PayoutJobStatus.SUCCEEDED.value,
+                "provider_reference": reference,
+                "completed_at": now,
+                "last_error": None,
+                "updated_at": now
+            }}
+        )
+        await set_orchard_payout_status(orchard_ids, PayoutJobStatus.SUCCEEDED.value)
+        self.counters["batches"] += 1
+        self.counters["growers_paid"] += len(items)
+        self.counters["jobs_paid"] += len(jobs)
+    
+    async def flush(self):
+        async with self._flush_lock:
+            try:
+                self.counters["ticks"] += 1
+                now = datetime.utcnow()
+                totals = {
+                    group["_id"]: group["amount"]
+                    async for group in db.payout_jobs.aggregate([
+                        {"$match": self.due_filter(now)},
+                        {"$group": {"_id": "$user_id", "amount": {"$sum": "$amount"}}}
+                    ])
+                }
+                if not totals:
+                    return
+                accounts = {
+                    account["user_id"]: account
+                    async for account in db.paypal_accounts.find({"user_id": {"$in": list(totals)}}, {"_id": 0})
+                }
+                missing = [user_id for user_id in totals if user_id not in accounts]
+                if missing:
+                    await self.dead_letter(missing, now, NO_PAYPAL_ACCOUNT)
+                    totals = {user_id: amount for user_id, amount in totals.items() if user_id in accounts}
+                batches, held = plan_payout_batches(totals, accounts, self.max_items)
+                
+                if held:
+                    result = await db.payout_jobs.update_many(
+                        {**self.due_filter(now), "user_id": {"$in": held}, "status": PayoutJobStatus.PENDING.value},
+                        {"$set": {"status": PayoutJobStatus.HELD.value, "updated_at": now}}
+                    )
+                    self.counters["jobs_held"] += result.modified_count
+                    held_orchards = await db.payout_jobs.distinct("orchard_id", {"user_id": {"$in": held}, "status": PayoutJobStatus.HELD.value})
+                    await set_orchard_payout_status(held_orchards, PayoutJobStatus.HELD.value)
+                
+                for batch in batches:
+                    lease_id = str(uuid.uuid4())
+                    jobs = await self.claim(lease_id, [item["user_id"] for item in batch], now)
+                    if jobs:
+                        await self.send(lease_id, jobs, accounts)
+            except Exception as e:
+                logging.error(f"Payout batch scheduler error: {e}")
+
+payout_scheduler = PayoutBatchScheduler("paypal", PAYOUT_BATCH_INTERVAL_SECONDS, PAYOUT_BATCH_MAX_ITEMS)
+
+# ===== LISTING PROJECTIONS =====
+# Fields the mall grid needs to render an orchard card
+ORCHARD_CARD_FIELDS = [
+    "id", "title", "category", "location", "status", "seed_value", "pocket_price",
+    "total_pockets", "filled_pockets", "completion_rate", "supporters", "views", "created_at"
+]
+
+def parse_orchard_fields(fields: Optional[str], view: OrchardView) -> Optional[List[str]]:
+    """Resolve `fields=`/`view=` into the list of fields to return, or None for everything"""
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in Orchard.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown orchard fields {unknown}")
+        return ["id"] + [field for field in requested if field != "id"]
+    if view == OrchardView.CARD:
+        return ORCHARD_CARD_FIELDS
+    return None
+
+def serialize_orchard_slim(doc: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Copy projected fields straight from the document, skipping model validation"""
+    data = {field: doc.get(field) for field in fields}
+    if "completion_rate" in data and doc.get("total_pockets"):
+        data["completion_rate"] = (doc.get("filled_pockets", 0) / doc["total_pockets"]) * 100
+    return data
+
+# ===== PAGINATION =====
+def encode_cursor(sort: OrchardSort, doc: Dict[str, Any]) -> str:
+    """Build an opaque cursor pointing just past `doc` in the given sort order"""
+    value = doc.get(sort.value)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort.value, "v": value, "id": doc["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str, sort: OrchardSort) -> Dict[str, Any]:
+    """Turn a cursor back into a keyset filter for the given sort order"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if payload["s"] != sort.value:
+            raise ValueError("cursor was issued for a different sort")
+        value = payload["v"]
+        if sort == OrchardSort.NEWEST:
+            value = datetime.fromisoformat(value)
+        last_id = payload["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+    
+    return {"$or": [
+        {sort.value: {"$lt": value}},
+        {sort.value: value, "id": {"$lt": last_id}}
+    ]}
+
+# ===== LEADERBOARDS =====
+class OrchardLeaderboards(PeriodicFlusher):
+    """Top-k active orchards per board and category, maintained from domain events.
+    
+    Scores live in memory per orchard and are updated in O(1) per event. Each
+    event notes the boards it touches; a refresh merges the touched orchards
+    into those boards' top-k lists, since views and bestowals only ever raise a
+    score, and re-ranks a board from scratch only when an orchard changed,
+    left it, or stopped qualifying. Each process keeps its own scores, seeded
+    by `rebuild()` at startup.
+    
+    Trending is an exponentially decayed sum of views and bestowals. Weights are
+    stored relative to `epoch` (weight * 2^(age / half_life)) so existing scores
+    never need decaying; the displayed score is scaled back down to now.
+    """
+    
+    FIELDS = {"id": 1, "category": 1, "status": 1, "views": 1, "filled_pockets": 1, "total_pockets": 1}
+    
+    def __init__(self, interval_seconds: float, size: int, half_life_hours: float):
+        super().__init__(interval_seconds)
+        self.size = size
+        self.half_life_seconds = half_life_hours * 3600
+        self.epoch = datetime.utcnow()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.rankings: Dict[tuple, List[tuple]] = {}  # (kind, category) -> [(rank key, orchard id)], best first
+        self.cards: Dict[str, Dict[str, Any]] = {}  # Card fields of every orchard on a board
+        self.touched: Dict[tuple, set] = {}  # Boards whose listed orchards' scores only went up
+        self.stale: set = set(self.board_keys())  # Boards to re-rank from scratch
+        self.refreshed_at: Optional[datetime] = None
+    
+    @staticmethod
+    def board_keys(category: Optional[str] = None, kinds=tuple(LeaderboardKind)) -> List[tuple]:
+        """Every board, or the boards an orchard in `category` appears on"""
+        categories = [None, category] if category else [None] + [value.value for value in GiftCategory]
+        return [(kind.value, board_category) for kind in kinds for board_category in categories]
+    
+    def touch(self, orchard_id: str, entry: Dict[str, Any], kinds):
+        for key in self.board_keys(entry["category"], kinds):
+            self.touched.setdefault(key, set()).add(orchard_id)
+    
+    def growth(self, at: datetime) -> float:
+        return 2.0 ** ((at - self.epoch).total_seconds() / self.half_life_seconds)
+    
+    def track(self, doc: Dict[str, Any], trending: float = 0.0) -> Optional[Dict[str, Any]]:
+        if doc.get("status", OrchardStatus.ACTIVE.value) != OrchardStatus.ACTIVE.value:
+            self.entries.pop(doc["id"], None)
+            return None
+        entry = {
+            "category": doc["category"],
+            "views": doc.get("views", 0),
+            "filled_pockets": doc.get("filled_pockets", 0),
+            "total_pockets": doc.get("total_pockets", 0),
+            "trending": trending
+        }
+        self.entries[doc["id"]] = entry
+        return entry
+    
+    async def load(self, orchard_id: str) -> Optional[Dict[str, Any]]:
+        """(Re)read an orchard's rank inputs, keeping its trending score"""
+        previous = self.entries.get(orchard_id)
+        doc = await db.orchards.find_one({"id": orchard_id}, {"_id": 0, **self.FIELDS})
+        entry = self.track(doc, previous["trending"] if previous else 0.0) if doc else None
+        if not doc:
+            self.entries.pop(orchard_id, None)
+        for changed in (previous, entry):
+            if changed:
+                self.stale.update(self.board_keys(changed["category"]))
+        return entry
+    
+    async def on_orchard_changed(self, event: Dict[str, Any]):
+        await self.load(event["orchard_id"])
+    
+    async def on_orchard_removed(self, event: Dict[str, Any]):
+        entry = self.entries.pop(event["orchard_id"], None)
+        if entry:
+            self.stale.update(
+                key for key in self.board_keys(entry["category"])
+                if any(orchard_id == event["orchard_id"] for _, orchard_id in self.rankings.get(key, []))
+            )
+    
+    async def on_orchard_viewed(self, event: Dict[str, Any]):
+        if event.get("status", OrchardStatus.ACTIVE.value) != OrchardStatus.ACTIVE.value:
+            return
+        entry = self.entries.get(event["orchard_id"]) or await self.load(event["orchard_id"])
+        if entry:
+            entry["views"] += 1
+            entry["trending"] += TRENDING_VIEW_WEIGHT * self.growth(event["at"])
+            self.touch(event["orchard_id"], entry, (LeaderboardKind.MOST_VIEWED, LeaderboardKind.TRENDING))
+    
+    async def on_pockets_bestowed(self, event: Dict[str, Any]):
+        entry = self.entries.get(event["orchard_id"]) or await self.load(event["orchard_id"])
+        if entry:
+            entry["filled_pockets"] += event["pockets"]
+            entry["trending"] += TRENDING_BESTOWAL_WEIGHT * self.growth(event["at"])
+            self.touch(event["orchard_id"], entry, (LeaderboardKind.NEARLY_COMPLETE, LeaderboardKind.TRENDING))
+    
+    def rank_key(self, kind: str, entry: Dict[str, Any]) -> float:
+        """Orders a board; trending keys stay relative to the epoch so they never go stale"""
+        if kind == LeaderboardKind.TRENDING.value:
+            return entry["trending"]
+        if kind == LeaderboardKind.MOST_VIEWED.value:
+            return entry["views"]
+        if not entry["total_pockets"] or entry["filled_pockets"] >= entry["total_pockets"]:
+            return -1.0  # Not fundable, never listed as nearly complete
+        return entry["filled_pockets"] / entry["total_pockets"] * 100
+    
+    def score(self, kind: str, key: float, now: datetime) -> float:
+        return key / self.growth(now) if kind == LeaderboardKind.TRENDING.value else key
+    
+    def rank(self, kind: str, category: Optional[str]) -> List[tuple]:
+        candidates = (
+            (self.rank_key(kind, entry), orchard_id)
+            for orchard_id, entry in self.entries.items()
+            if category is None or entry["category"] == category
+        )
+        return [(key, orchard_id) for key, orchard_id in heapq.nlargest(self.size, candidates) if key > 0]
+    
+    def merge(self, board: tuple, orchard_ids: set) -> Optional[List[tuple]]:
+        """Fold raised scores into a board's top-k; None if it has to be re-ranked instead"""
+        kind, _ = board
+        keys = {orchard_id: key for key, orchard_id in self.rankings.get(board, [])}
+        for orchard_id in orchard_ids:
+            entry = self.entries.get(orchard_id)
+            key = self.rank_key(kind, entry) if entry else -1.0
+            if key > 0:
+                keys[orchard_id] = key
+            elif orchard_id in keys:
+                return None  # It drops off, and whatever comes next is not on the board
+        return heapq.nlargest(self.size, ((key, orchard_id) for orchard_id, key in keys.items()))
+    
+    def rebase(self, now: datetime):
+        """Move the epoch forward before the growth factors overflow a float"""
+        factor = self.growth(now)
+        for entry in self.entries.values():
+            entry["trending"] /= factor
+        self.epoch = now
+        self.stale.update(self.board_keys(kinds=(LeaderboardKind.TRENDING,)))
+    
+    def top(self, kind: LeaderboardKind, category: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return [
+            {**self.cards[orchard_id], "score": round(self.score(kind.value, key, now), 4)}
+            for key, orchard_id in self.rankings.get((kind.value, category), [])[:limit]
+            if orchard_id in self.cards
+        ]
+    
+    async def flush(self):
+        async with self._flush_lock:
+            if not self.touched and not self.stale:
+                return
+            touched, self.touched = self.touched, {}
+            stale, self.stale = self.stale, set()
+            try:
+                now = datetime.utcnow()
+                if (now - self.epoch).total_seconds() > 256 * self.half_life_seconds:
+                    self.rebase(now)
+                    stale |= self.stale
+                    self.stale = set()
+                rankings = {}
+                for board, orchard_ids in touched.items():
+                    if board not in stale:
+                        merged = self.merge(board, orchard_ids)
+                        if merged is None:
+                            stale.add(board)
+                        else:
+                            rankings[board] = merged
+                for board in stale:
+                    rankings[board] = self.rank(*board)
+                
+                # Re-read cards for orchards whose numbers moved and for newcomers
+                changed = set().union(*touched.values()) if touched else set()
+                needed = {
+                    orchard_id for ranking in rankings.values() for _, orchard_id in ranking
+                    if orchard_id in changed or orchard_id not in self.cards
+                }
+                if needed:
+                    async for doc in db.orchards.find(
+                        {"id": {"$in": list(needed)}}, {"_id": 0, **{field: 1 for field in ORCHARD_CARD_FIELDS}}
+                    ):
+                        self.cards[doc["id"]] = serialize_orchard_slim(doc, ORCHARD_CARD_FIELDS)
+                self.rankings.update(rankings)
+                listed = {orchard_id for ranking in self.rankings.values() for _, orchard_id in ranking}
+                self.cards = {orchard_id: card for orchard_id, card in self.cards.items() if orchard_id in listed}
+                self.refreshed_at = now
+            except Exception as e:
+                self.stale |= stale | set(touched)
+                logging.error(f"Leaderboard refresh error: {e}")
+    
+    async def rebuild(self) -> int:
+        """Reload every active orchard and replay recent bestowals into the trending scores"""
+        now = datetime.utcnow()
+        rebuilt = OrchardLeaderboards(self.interval_seconds, self.size, self.half_life_seconds / 3600)
+        rebuilt.epoch = now
+        async for doc in db.orchards.find({"status": OrchardStatus.ACTIVE.value}, {"_id": 0, **self.FIELDS}):
+            rebuilt.track(doc)
+        
+        # Pockets from one bestowal share created_at; older bestowals have decayed below 1%
+        window_start = now - timedelta(seconds=7 * self.half_life_seconds)
+        async for group in db.pockets.aggregate([
+            {"$match": {"created_at": {"$gte": window_start}}},
+            {"$group": {"_id": {"orchard_id": "$orchard_id", "user_id": "$user_id", "at": "$created_at"}}}
+        ]):
+            entry = rebuilt.entries.get(group["_id"]["orchard_id"])
+            if entry:
+                entry["trending"] += TRENDING_BESTOWAL_WEIGHT * rebuilt.growth(group["_id"]["at"])
+        
+        async with self._flush_lock:
+            self.epoch, self.entries = rebuilt.epoch, rebuilt.entries
+            self.stale = set(self.board_keys())
+        await self.flush()
+        return len(self.entries)
+
+orchard_leaderboards = OrchardLeaderboards(LEADERBOARD_REFRESH_SECONDS, LEADERBOARD_SIZE, TRENDING_HALF_LIFE_HOURS)
+event_bus.subscribe("orchard.created", orchard_leaderboards.on_orchard_changed)
+event_bus.subscribe("orchard.updated", orchard_leaderboards.on_orchard_changed)
+event_bus.subscribe("orchard.completed", orchard_leaderboards.on_orchard_removed)
+event_bus.subscribe("orchard.deleted", orchard_leaderboards.on_orchard_removed)
+event_bus.subscribe("orchard.viewed", orchard_leaderboards.on_orchard_viewed)
+event_bus.subscribe("pockets.bestowed", orchard_leaderboards.on_pockets_bestowed)
+
+# ===== SEARCH =====
+# Searchable orchard fields and how much a term occurrence in each one counts
+SEARCH_FIELD_WEIGHTS = {
+    "title": 3.0,
+    "features": 2.0,
+    "location": 2.0,
+    "description": 1.0,
+    "why_needed": 1.0,
+    "community_impact": 1.0,
+}
+SEARCH_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "our", "that", "the", "this", "to", "we", "will", "with"
+}
+SEARCH_TOKEN = re.compile(r"[a-z0-9]+")
+
+def search_terms(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords and with a trailing plural 's' folded"""
+    terms = []
+    for token in SEARCH_TOKEN.findall(text.lower()):
+        if token in SEARCH_STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+class OrchardSearchIndex:
+    """Inverted index over orchard text with BM25 ranking and category/status facets.
+    
+    Postings hold term frequencies and scores use the average document length
+    at query time. Each posting list is also kept ordered by its BM25 weight
+    under a reference average length, and the top results are found with
+    Fagin's threshold algorithm, which stops reading once no unseen document
+    can beat the current page; the threshold is scaled by how far the average
+    has drifted from the reference, and the lists are re-weighted once it
+    drifts too far. Match counts and facets come from integer bitmaps over
+    dense document slots, kept in a bounded LRU. The index is per process: it
+    is built at startup and kept current from the orchard events.
+    """
+    
+    FIELDS = {"_id": 0, "id": 1, "category": 1, "status": 1, **{field: 1 for field in SEARCH_FIELD_WEIGHTS}}
+    REWEIGHT_DRIFT = 1.25  # Re-order posting lists once avgdl moves this far from the reference
+    
+    def __init__(self, k1: float, b: float, bitmap_cache_size: int = SEARCH_BITMAP_CACHE_SIZE):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, float]] = {}  # term -> slot -> frequency
+        self.ranked: Dict[str, List[tuple]] = {}  # term -> [(-reference weight, slot)], sorted lazily
+        self.unsorted: set = set()
+        self.bulk_loading = False  # Only record postings; rebuild() orders them all at the end
+        # ("term" | "category" | "status", value) -> bitmap, built lazily
+        self.bitmaps = TTLCache("search_bitmaps", bitmap_cache_size, float("inf"))
+        self.slots: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        self.free_slots: List[int] = []
+        self.docs: Dict[int, Dict[str, Any]] = {}
+        self.total_length = 0.0
+        self.reference_length = 0.0  # avgdl the ranked lists are ordered by
+        self.changed_during_rebuild: Optional[set] = None
+    
+    def average_length(self) -> float:
+        return self.total_length / len(self.docs) if self.docs else 0.0
+    
+    def weight(self, frequency: float, length: float, average_length: float) -> float:
+        norm = self.k1 * (1 - self.b + self.b * length / average_length) if average_length else self.k1
+        return frequency * (self.k1 + 1) / (frequency + norm)
+    
+    def _members(self, key: tuple):
+        kind, value = key
+        if kind == "term":
+            return self.postings.get(value, {})
+        return (slot for slot, doc in self.docs.items() if doc[kind] == value)
+    
+    def bitmap(self, key: tuple) -> int:
+        bits = self.bitmaps.get(key)
+        if bits is None:
+            buffer = bytearray((len(self.ids) + 7) // 8)
+            for slot in self._members(key):
+                buffer[slot >> 3] |= 1 << (slot & 7)
+            bits = int.from_bytes(buffer, "little")
+            self.bitmaps.set(key, bits)
+        return bits
+    
+    def _flip(self, key: tuple, slot: int, on: bool):
+        # Only bitmaps that are cached need patching; the rest are built on demand
+        bits = self.bitmaps.peek(key)
+        if bits is not None:
+            self.bitmaps.set(key, bits | (1 << slot) if on else bits & ~(1 << slot))
+    
+    def _ranked(self, term: str) -> List[tuple]:
+        if term in self.unsorted:
+            self.ranked[term].sort()
+            self.unsorted.discard(term)
+        return self.ranked[term]
+    
+    def _reweight(self):
+        """Re-order every posting list under the current average length"""
+        self.reference_length = self.average_length()
+        for term, frequencies in self.postings.items():
+            self.ranked[term] = [
+                (-self.weight(frequency, self.docs[slot]["length"], self.reference_length), slot)
+                for slot, frequency in frequencies.items()
+            ]
+            self.unsorted.add(term)
+    
+    def add(self, doc: Dict[str, Any]):
+        self.remove(doc["id"])
+        frequencies: Dict[str, float] = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            value = doc.get(field) or ""
+            if isinstance(value, list):
+                value = " ".join(value)
+            for term in search_terms(value):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+        
+        slot = self.free_slots.pop() if self.free_slots else len(self.ids)
+        if slot == len(self.ids):
+            self.ids.append(doc["id"])
+        else:
+            self.ids[slot] = doc["id"]
+        self.slots[doc["id"]] = slot
+        
+        length = sum(frequencies.values())
+        self.total_length += length
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, {})[slot] = frequency
+            if not self.bulk_loading:
+                key = (-self.weight(frequency, length, self.reference_length), slot)
+                if term in self.unsorted:
+                    self.ranked.setdefault(term, []).append(key)
+                else:
+                    bisect.insort(self.ranked.setdefault(term, []), key)
+            self._flip(("term", term), slot, True)
+        
+        self.docs[slot] = {
+            "terms": list(frequencies),
+            "length": length,
+            "category": doc.get("category"),
+            "status": doc.get("status", OrchardStatus.ACTIVE.value)
+        }
+        self._flip(("category", self.docs[slot]["category"]), slot, True)
+        self._flip(("status", self.docs[slot]["status"]), slot, True)
+    
+    def remove(self, orchard_id: str):
+        slot = self.slots.pop(orchard_id, None)
+        if slot is None:
+            return
+        doc = self.docs.pop(slot)
+        self.total_length -= doc["length"]
+        for term in doc["terms"]:
+            frequency = self.postings[term].pop(slot)
+            if not self.bulk_loading:
+                key = (-self.weight(frequency, doc["length"], self.reference_length), slot)
+                ranked = self._ranked(term)
+                del ranked[bisect.bisect_left(ranked, key)]
+            self._flip(("term", term), slot, False)
+            if not self.postings[term]:
+                del self.postings[term]
+                self.ranked.pop(term, None)
+                self.unsorted.discard(term)
+                self.bitmaps.invalidate(("term", term))
+        self._flip(("category", doc["category"]), slot, False)
+        self._flip(("status", doc["status"]), slot, False)
+        self.ids[slot] = None
+        self.free_slots.append(slot)
+    
+    def set_status(self, orchard_id: str, status: str):
+        slot = self.slots.get(orchard_id)
+        if slot is not None:
+            self._flip(("status", self.docs[slot]["status"]), slot, False)
+            self.docs[slot]["status"] = status
+            self._flip(("status", status), slot, True)
+    
+    def top(self, terms: List[tuple], wanted: int, category: Optional[str], status: Optional[str]) -> List[tuple]:
+        """Fagin's threshold algorithm over the weight-ordered posting lists"""
+        average_length = self.average_length()
+        if average_length and not (
+            self.reference_length and 1 / self.REWEIGHT_DRIFT <= average_length / self.reference_length <= self.REWEIGHT_DRIFT
+        ):
+            self._reweight()
+        # A document's weight under the current average is at most this factor
+        # times its weight under the reference average
+        slack = max(1.0, average_length / self.reference_length) if self.reference_length else 1.0
+        lists = [(idf, self._ranked(term), self.postings[term]) for term, idf in terms]
+        # weight() inlined: this loop scores every document it reads
+        saturation = self.k1 + 1
+        norm_base = self.k1 * (1 - self.b) if average_length else self.k1
+        norm_per_length = self.k1 * self.b / average_length if average_length else 0.0
+        best: List[tuple] = []
+        seen = set()
+        depth = 0
+        while True:
+            threshold = 0.0
+            exhausted = True
+            for idf, ranked, _ in lists:
+                if depth >= len(ranked):
+                    continue
+                exhausted = False
+                negative_weight, slot = ranked[depth]
+                threshold -= idf * negative_weight * slack
+                if slot in seen:
+                    continue
+                seen.add(slot)
+                doc = self.docs[slot]
+                if (category and doc["category"] != category) or (status and doc["status"] != status):
+                    continue
+                norm = norm_base + norm_per_length * doc["length"]
+                score = 0.0
+                for term_idf, _, frequencies in lists:
+                    frequency = frequencies.get(slot)
+                    if frequency is not None:
+                        score += term_idf * frequency * saturation / (frequency + norm)
+                if len(best) < wanted:
+                    heapq.heappush(best, (score, slot))
+                elif score > best[0][0]:
+                    heapq.heapreplace(best, (score, slot))
+            depth += 1
+            if exhausted or (len(best) == wanted and best[0][0] >= threshold):
+                break
+        return sorted(best, reverse=True)
+    
+    def search(
+        self,
+        query: str,
+        category: Optional[str],
+        status: Optional[str],
+        offset: int,
+        limit: int
+    ) -> Dict[str, Any]:
+        """Rank matching orchards and count facets.
+        
+        Each facet is counted with the other facet's filter applied, so the
+        category counts show what selecting a category would return.
+        """
+        total_docs = len(self.docs)
+        terms = [
+            (term, math.log(1 + (total_docs - len(self.postings[term]) + 0.5) / (len(self.postings[term]) + 0.5)))
+            for term in set(search_terms(query)) if term in self.postings
+        ]
+        
+        matches = 0
+        for term, _ in terms:
+            matches |= self.bitmap(("term", term))
+        in_category = matches & self.bitmap(("category", category)) if category else matches
+        in_status = matches & self.bitmap(("status", status)) if status else matches
+        facets = {
+            "category": {value.value: (in_status & self.bitmap(("category", value.value))).bit_count() for value in GiftCategory},
+            "status": {value.value: (in_category & self.bitmap(("status", value.value))).bit_count() for value in OrchardStatus}
+        }
+        total = (in_category & in_status).bit_count()
+        
+        hits = self.top(terms, offset + limit, category, status)[offset:] if terms and total > offset else []
+        return {
+            "hits": [(score, self.ids[slot]) for score, slot in hits],
+            "total": total,
+            "facets": facets
+        }
+    
+    async def on_orchard_changed(self, event: Dict[str, Any]):
+        if self.changed_during_rebuild is not None:
+            self.changed_during_rebuild.add(event["orchard_id"])
+        await self.refresh(event["orchard_id"])
+    
+    async def on_orchard_deleted(self, event: Dict[str, Any]):
+        if self.changed_during_rebuild is not None:
+            self.changed_during_rebuild.add(event["orchard_id"])
+        self.remove(event["orchard_id"])
+    
+    async def on_orchard_completed(self, event: Dict[str, Any]):
+        if self.changed_during_rebuild is not None:
+            self.changed_during_rebuild.add(event["orchard_id"])
+        self.set_status(event["orchard_id"], OrchardStatus.COMPLETED.value)
+    
+    async def refresh(self, orchard_id: str):
+        doc = await db.orchards.find_one({"id": orchard_id}, self.FIELDS)
+        if doc:
+            self.add(doc)
+        else:
+            self.remove(orchard_id)
+    
+    async def rebuild(self) -> int:
+        """Build a fresh index alongside this one and swap it in.
+        
+        Orchards changed while the collection is being read are re-read into
+        the new index before the swap, so no update is lost.
+        """
+        self.changed_during_rebuild = set()
+        try:
+            rebuilt = OrchardSearchIndex(self.k1, self.b, self.bitmaps.max_size)
+            rebuilt.bulk_loading = True
+            async for doc in db.orchards.find({}, self.FIELDS).batch_size(1000):
+                rebuilt.add(doc)
+                if len(rebuilt.docs) % 500 == 0:
+                    await asyncio.sleep(0)  # Tokenizing is CPU bound; let requests through
+            rebuilt.bulk_loading = False
+            rebuilt._reweight()
+            for term in list(rebuilt.unsorted):
+                rebuilt._ranked(term)
+            while self.changed_during_rebuild:
+                changed, self.changed_during_rebuild = self.changed_during_rebuild, set()
+                for orchard_id in changed:
+                    await rebuilt.refresh(orchard_id)
+        except BaseException:
+            self.changed_during_rebuild = None
+            raise
+        
+        # Nothing awaits from here on, so no event can slip in before the swap
+        bitmaps = self.bitmaps
+        self.__dict__.update(rebuilt.__dict__)
+        bitmaps.clear()
+        self.bitmaps = bitmaps
+        return len(self.docs)
+
+orchard_search_index = OrchardSearchIndex(SEARCH_BM25_K1, SEARCH_BM25_B)
+event_bus.subscribe("orchard.created", orchard_search_index.on_orchard_changed)
+event_bus.subscribe("orchard.updated", orchard_search_index.on_orchard_changed)
+event_bus.subscribe("orchard.deleted", orchard_search_index.on_orchard_deleted)
+event_bus.subscribe("orchard.completed", orchard_search_index.on_orchard_completed)
+
+# ===== GEO =====
+def normalize_place(name: str) -> str:
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return " ".join(ascii_name.lower().replace(".", " ").split())
+
+class Gazetteer:
+    """Offline place-name lookup that turns free-text locations into GeoJSON points"""
+    
+    def __init__(self):
+        self.places: Dict[str, List[tuple]] = {}  # name -> [(population, country, lat, lng)]
+    
+    def add(self, name: str, country: str, lat: float, lng: float, population: int):
+        key = normalize_place(name)
+        if key:
+            self.places.setdefault(key, []).append((population, country.lower(), lat, lng))
+    
+    def load(self, path: Path) -> "Gazetteer":
+        if not path.exists():
+            logging.warning(f"Gazetteer {path} not found; orchards will not be geocoded")
+            return self
+        with open(path, encoding="utf-8", newline="") as handle:
+            if path.suffix == ".csv":
+                for row in csv.DictReader(handle):
+                    self.add(row["name"], row["country"], float(row["latitude"]), float(row["longitude"]),
+                             int(row.get("population") or 0))
+            else:
+                # GeoNames dump: name, asciiname and alternate names all resolve to the place
+                for row in csv.reader(handle, delimiter="\t", quoting=csv.QUOTE_NONE):
+                    lat, lng, population = float(row[4]), float(row[5]), int(row[14] or 0)
+                    for name in {row[1], row[2], *row[3].split(",")}:
+                        self.add(name, row[8], lat, lng, population)
+        return self
+    
+    def lookup(self, location: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Resolve "City" or "City, ..., CC" to the most populous match, preferring the given country code"""
+        if not location:
+            return None
+        parts = [normalize_place(part) for part in location.split(",") if normalize_place(part)]
+        if not parts:
+            return None
+        candidates = self.places.get(" ".join(parts)) or self.places.get(parts[0])
+        if not candidates:
+            return None
+        if len(parts) > 1:
+            candidates = [place for place in candidates if place[1] == parts[-1]] or candidates
+        _, _, lat, lng = max(candidates)
+        return {"type": "Point", "coordinates": [lng, lat]}
+
+gazetteer = Gazetteer().load(GAZETTEER_PATH)
+
+def resolve_near(near: str, current_user: Optional[User]) -> Dict[str, Any]:
+    """Turn `near=` ("lat,lng", a place name, or "me") into a GeoJSON point"""
+    if near == "me":
+        if not current_user:
+            raise HTTPException(status_code=401, detail="Sign in to search near your location")
+        point = gazetteer.lookup(current_user.location)
+        if not point:
+            raise HTTPException(status_code=400, detail="Your profile location could not be placed on the map")
+        return point
+    
+    try:
+        lat, lng = (float(part) for part in near.split(","))
+    except ValueError:
+        point = gazetteer.lookup(near)
+        if not point:
+            raise HTTPException(status_code=400, detail=f"Unknown location '{near}'")
+        return point
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise HTTPException(status_code=400, detail="Coordinates out of range")
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+def encode_near_cursor(point: Dict[str, Any], doc: Dict[str, Any]) -> str:
+    payload = json.dumps({"s": "distance", "p": point["coordinates"], "v": doc["distance"], "id": doc["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_near_cursor(cursor: str, point: Dict[str, Any]) -> Dict[str, Any]:
+    """Keyset position (distance, id) for a nearest-first listing around `point`"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if payload["s"] != "distance" or payload["p"] != point["coordinates"]:
+            raise ValueError("cursor was issued for a different search")
+        return {"distance": float(payload["v"]), "id": payload["id"]}
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+async def geocode_orchards(overwrite: bool = False) -> int:
+    """Backfill `geo` from the location strings of existing orchards"""
+    query = {"location": {"$nin": [None, ""]}}
+    if not overwrite:
+        query["geo"] = None
+    updates, placed = [], 0
+    async for doc in db.orchards.find(query, {"_id": 0, "id": 1, "location": 1}):
+        point = gazetteer.lookup(doc["location"])
+        if point:
+            updates.append(UpdateOne({"id": doc["id"]}, {"$set": {"geo": point}}))
+            placed += 1
+        if len(updates) >= 500:
+            await db.orchards.bulk_write(updates, ordered=False)
+            updates = []
+    if updates:
+        await db.orchards.bulk_write(updates, ordered=False)
+    return placed
+
+# ===== API ENDPOINTS =====
+
+# Root endpoint
+@api_router.get("/")
+async def root():
+    """Root endpoint for API health check"""
+    return APIResponse(
+        success=True,
+        data={"message": "Welcome to Sow2Grow Farm Mall API"},
+        message="API is running successfully"
+    )
+
+# Authentication endpoints
+@api_router.post("/auth/register", response_model=APIResponse)
+async def register_user(request: UserCreateRequest):
+    """Register a new user"""
+    try:
+        # Check if user already exists
+        existing_user = await db.users.find_one({"email": request.email})
+        if existing_user:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        
+        # Create new user
+        user = User(
+            email=request.email,
+            password_hash=await hash_password_async(request.password),
+            first_name=request.first_name,
+            last_name=request.last_name,
+            location=request.location,
+            phone=request.phone
+        )
         
         # Insert user into database
         await db.users.insert_one(user.dict())
@@ -418,9 +3509,21 @@ async def login_user(request: UserLoginRequest):
         user = User(**user_doc)
         
         # Verify password
-        if not verify_password(request.password, user.password_hash):
+        if not await verify_password_async(request.password, user.password_hash):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
+        # Transparently upgrade hashes made with a different bcrypt cost
+        if password_needs_rehash(user.password_hash):
+            try:
+                new_hash = await hash_password_async(request.password)
+                await db.users.update_one(
+                    {"id": user.id, "password_hash": user.password_hash},
+                    {"$set": {"password_hash": new_hash}}
+                )
+                await invalidate_cached(user_cache, user.id)
+            except HTTPException:
+                pass  # Pool saturated; rehash on a later login
+        
         # Create access token
         access_token = create_access_token({"user_id": user.id})
         
@@ -480,15 +3583,16 @@ async def update_current_user_profile(
         
         update_data["updated_at"] = datetime.utcnow()
         
-        # Update in database
-        await db.users.update_one(
+        # Update and read back the new document in one round trip
+        updated_user_doc = await db.users.find_one_and_update(
             {"id": current_user.id},
-            {"$set": update_data}
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
         )
-        
-        # Get updated user
-        updated_user_doc = await db.users.find_one({"id": current_user.id})
+        if not updated_user_doc:
+            raise HTTPException(status_code=404, detail="User not found")
         updated_user = User(**updated_user_doc)
+        await invalidate_cached(user_cache, current_user.id)
         
         user_data = updated_user.dict()
         user_data.pop("password_hash")  # Remove password hash from response
@@ -498,6 +3602,8 @@ async def update_current_user_profile(
             data=user_data,
             message="User profile updated successfully"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Update user profile error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -555,6 +3661,7 @@ async def create_paypal_account(
         
         # Insert into database
         await db.paypal_accounts.insert_one(paypal_account.dict())
+        await requeue_payouts_for_account(paypal_account)
         
         return APIResponse(
             success=True,
@@ -589,17 +3696,17 @@ async def update_paypal_account(
             "is_verified": False  # Reset verification status
         }
         
-        result = await db.paypal_accounts.update_one(
+        updated_account_doc = await db.paypal_accounts.find_one_and_update(
             {"user_id": current_user.id},
-            {"$set": update_data}
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.matched_count == 0:
+        if not updated_account_doc:
             raise HTTPException(status_code=404, detail="PayPal account not found")
         
-        # Get updated account
-        updated_account_doc = await db.paypal_accounts.find_one({"user_id": current_user.id})
         updated_account = PayPalAccount(**updated_account_doc)
+        await requeue_payouts_for_account(updated_account)
         
         return APIResponse(
             success=True,
@@ -656,16 +3763,30 @@ async def verify_paypal_account(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Orchard endpoints
-@api_router.get("/orchards", response_model=APIResponse)
+@api_router.get("/orchards", response_model=PaginatedAPIResponse)
 async def get_orchards(
     category: Optional[GiftCategory] = Query(None),
     status: Optional[OrchardStatus] = Query(None),
     limit: int = Query(50, le=100),
     offset: int = Query(0, ge=0),
+    sort: OrchardSort = Query(OrchardSort.NEWEST),
+    cursor: Optional[str] = Query(None),
+    view: OrchardView = Query(OrchardView.FULL),
+    fields: Optional[str] = Query(None),
+    near: Optional[str] = Query(None, description="'lat,lng', a place name, or 'me'"),
+    radius_km: float = Query(50.0, gt=0, le=1000),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    """Get all orchards with filtering"""
+    """Get all orchards with filtering.
+    
+    Pass the returned `next_cursor` back as `cursor` for keyset pagination;
+    `offset` is still honoured when no cursor is given. `view=card` or a
+    comma-separated `fields=` list returns only those fields. With `near=`,
+    orchards within `radius_km` are returned nearest first with `distance_km`.
+    """
     try:
+        selected_fields = parse_orchard_fields(fields, view)
+        
         # Build filter query
         filter_query = {}
         if category:
@@ -673,29 +3794,133 @@ async def get_orchards(
         if status:
             filter_query["status"] = status
         
-        # Get orchards from database
-        orchards_cursor = db.orchards.find(filter_query).skip(offset).limit(limit)
-        orchards_docs = await orchards_cursor.to_list(length=limit)
+        # Project in the database when only some fields are wanted
+        projection = None
+        if selected_fields is not None:
+            projection = {field: 1 for field in selected_fields + ["total_pockets", "filled_pockets", sort.value]}
+            projection["_id"] = 0
+        
+        if near:
+            # Nearest first within the radius, paged by (distance, id)
+            point = resolve_near(near, current_user)
+            geo_near = {
+                "near": point,
+                "key": "geo",
+                "distanceField": "distance",
+                "maxDistance": radius_km * 1000,
+                "spherical": True,
+                "query": filter_query
+            }
+            pipeline: List[Dict[str, Any]] = [{"$geoNear": geo_near}]
+            if cursor:
+                last = decode_near_cursor(cursor, point)
+                geo_near["minDistance"] = last["distance"]
+                pipeline.append({"$match": {"$or": [
+                    {"distance": {"$gt": last["distance"]}},
+                    {"distance": last["distance"], "id": {"$gt": last["id"]}}
+                ]}})
+            pipeline.append({"$sort": {"distance": ASCENDING, "id": ASCENDING}})
+            if not cursor and offset:
+                pipeline.append({"$skip": offset})
+            pipeline.append({"$limit": limit})
+            if projection:
+                pipeline.append({"$project": {**projection, "distance": 1}})
+            orchards_docs = await db.orchards.aggregate(pipeline).to_list(length=limit)
+        else:
+            if cursor:
+                filter_query.update(decode_cursor(cursor, sort))
+            
+            # Get orchards from database in a stable order
+            orchards_cursor = db.orchards.find(filter_query, projection).sort(
+                [(sort.value, DESCENDING), ("id", DESCENDING)]
+            )
+            if not cursor:
+                orchards_cursor = orchards_cursor.skip(offset)
+            orchards_docs = await orchards_cursor.limit(limit).to_list(length=limit)
+        
+        next_cursor = None
+        if orchards_docs and len(orchards_docs) == limit:
+            next_cursor = encode_near_cursor(point, orchards_docs[-1]) if near else encode_cursor(sort, orchards_docs[-1])
         
         orchards = []
         for doc in orchards_docs:
-            orchard = Orchard(**doc)
-            
-            # Calculate completion rate
-            if orchard.total_pockets > 0:
-                orchard.completion_rate = (orchard.filled_pockets / orchard.total_pockets) * 100
-            
-            orchards.append(orchard.dict())
+            if selected_fields is not None:
+                data = serialize_orchard_slim(doc, selected_fields)
+            elif FAST_JSON_RESPONSES:
+                data = encode_orchard(doc)
+            else:
+                orchard = Orchard(**doc)
+                
+                # Calculate completion rate
+                if orchard.total_pockets > 0:
+                    orchard.completion_rate = (orchard.filled_pockets / orchard.total_pockets) * 100
+                
+                data = orchard.dict()
+            if near:
+                data["distance_km"] = round(doc["distance"] / 1000, 3)
+            orchards.append(data)
         
-        return APIResponse(
+        if FAST_JSON_RESPONSES:
+            return fast_api_response(orchards, "Orchards retrieved successfully", next_cursor=next_cursor)
+        
+        return PaginatedAPIResponse(
             success=True,
             data=orchards,
-            message="Orchards retrieved successfully"
+            message="Orchards retrieved successfully",
+            next_cursor=next_cursor
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Get orchards error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@api_router.get("/orchards/search", response_model=APIResponse)
+async def search_orchards(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[GiftCategory] = Query(None),
+    status: Optional[OrchardStatus] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000)
+):
+    """Full-text search over orchards with category and status facet counts"""
+    try:
+        result = orchard_search_index.search(
+            q,
+            category.value if category else None,
+            status.value if status else None,
+            offset,
+            limit
+        )
+        
+        # Hydrate the page as orchard cards, in rank order
+        orchard_ids = [orchard_id for _, orchard_id in result["hits"]]
+        cards = {
+            doc["id"]: serialize_orchard_slim(doc, ORCHARD_CARD_FIELDS)
+            async for doc in db.orchards.find(
+                {"id": {"$in": orchard_ids}}, {"_id": 0, **{field: 1 for field in ORCHARD_CARD_FIELDS}}
+            )
+        }
+        orchards = [
+            {**cards[orchard_id], "score": round(score, 4)}
+            for score, orchard_id in result["hits"] if orchard_id in cards
+        ]
+        
+        return APIResponse(
+            success=True,
+            data={
+                "orchards": orchards,
+                "total": result["total"],
+                "facets": result["facets"],
+                "offset": offset,
+                "limit": limit
+            },
+            message="Search completed successfully"
+        )
+    except Exception as e:
+        logging.error(f"Search orchards error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @api_router.post("/orchards", response_model=APIResponse)
 async def create_orchard(
     request: OrchardCreateRequest,
@@ -716,6 +3941,7 @@ async def create_orchard(
             pocket_price=request.pocket_price,
             total_pockets=total_pockets,
             location=request.location,
+            geo=gazetteer.lookup(request.location),
             timeline=request.timeline,
             why_needed=request.why_needed,
             community_impact=request.community_impact,
@@ -725,7 +3951,9 @@ async def create_orchard(
         )
         
         # Insert into database
-        await db.orchards.insert_one(orchard.dict())
+        await db.orchards.insert_one({**orchard.dict(), "pocket_bitmap": empty_pocket_bitmap(total_pockets)})
+        event_bus.emit("orchard.created", orchard_id=orchard.id, category=orchard.category.value,
+                       seed_value=orchard.seed_value, at=orchard.created_at)
         
         return APIResponse(
             success=True,
@@ -738,41 +3966,64 @@ async def create_orchard(
 
 @api_router.get("/orchards/{orchard_id}", response_model=APIResponse)
 async def get_orchard(
+    http_request: Request,
+    response: Response,
     orchard_id: str = PathParam(...),
+    include_pockets: bool = Query(False, description="Also return every pocket document; occupancy alone is in pocket_bitmap"),
+    if_none_match: Optional[str] = Header(None),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Get orchard by ID"""
     try:
-        # Get orchard from database
-        orchard_doc = await db.orchards.find_one({"id": orchard_id})
+        cache_key = f"{orchard_id}:pockets" if include_pockets else orchard_id
+        entry = await orchard_detail_cache.get(cache_key)
         
-        if not orchard_doc:
-            raise HTTPException(status_code=404, detail="Orchard not found")
-        
-        orchard = Orchard(**orchard_doc)
-        
-        # Calculate completion rate
-        if orchard.total_pockets > 0:
-            orchard.completion_rate = (orchard.filled_pockets / orchard.total_pockets) * 100
-        
-        # Increment view count
-        await db.orchards.update_one(
-            {"id": orchard_id},
-            {"$inc": {"views": 1}}
-        )
+        if entry is None:
+            generation = orchard_detail_cache.generation
+            # Get orchard from database
+            orchard_doc = await db.orchards.find_one({"id": orchard_id})
+            
+            if not orchard_doc:
+                raise HTTPException(status_code=404, detail="Orchard not found")
+            
+            if FAST_JSON_RESPONSES:
+                orchard_data = encode_orchard(orchard_doc)
+            else:
+                orchard = Orchard(**orchard_doc)
+                
+                # Calculate completion rate
+                if orchard.total_pockets > 0:
+                    orchard.completion_rate = (orchard.filled_pockets / orchard.total_pockets) * 100
+                
+                orchard_data = orchard.dict()
+            
+            # Pocket grid comes from the occupancy bitmap rather than every pocket document
+            bitmap = await ensure_pocket_bitmap(orchard_doc)
+            orchard_data["pocket_bitmap"] = encode_pocket_bitmap(bitmap, orchard_data["total_pockets"])
+            
+            if include_pockets:
+                pockets_cursor = db.pockets.find({"orchard_id": orchard_id})
+                pockets_docs = await pockets_cursor.to_list(length=None)
+                pocket_encode = POCKET_ENCODER.encode if FAST_JSON_RESPONSES else (lambda doc: Pocket(**doc).dict())
+                orchard_data["pockets"] = [pocket_encode(doc) for doc in pockets_docs]
+            
+            entry = await orchard_detail_cache.set(cache_key, orchard_data, generation)
         
-        # Get pockets for this orchard
-        pockets_cursor = db.pockets.find({"orchard_id": orchard_id})
-        pockets_docs = await pockets_cursor.to_list(length=None)
+        # Buffer the view; it reaches the database on the next flush
+        viewer_key = current_user.id if current_user else (http_request.client.host if http_request.client else None)
+        if view_counter.record(orchard_id, viewer_key):
+            event_bus.emit("orchard.viewed", orchard_id=orchard_id, category=entry["data"]["category"],
+                           status=entry["data"]["status"], viewer_key=viewer_key)
         
-        pockets = []
-        for doc in pockets_docs:
-            pocket = Pocket(**doc)
-            pockets.append(pocket.dict())
+        if etag_matches(if_none_match, entry["etag"]):
+            return Response(status_code=304, headers={"ETag": entry["etag"]})
         
-        orchard_data = orchard.dict()
-        orchard_data["pockets"] = pockets
+        # Views still buffered in this worker are not in the cached payload yet
+        orchard_data = {**entry["data"], "views": entry["data"].get("views", 0) + view_counter.pending_for(orchard_id)}
+        if FAST_JSON_RESPONSES:
+            return fast_api_response(orchard_data, "Orchard retrieved successfully", headers={"ETag": entry["etag"]})
         
+        response.headers["ETag"] = entry["etag"]
         return APIResponse(
             success=True,
             data=orchard_data,
@@ -792,12 +4043,6 @@ async def update_orchard(
 ):
     """Update orchard"""
     try:
-        # Check if orchard exists and belongs to user
-        orchard_doc = await db.orchards.find_one({"id": orchard_id, "user_id": current_user.id})
-        
-        if not orchard_doc:
-            raise HTTPException(status_code=404, detail="Orchard not found or access denied")
-        
         # Build update data
         update_data = {}
         if request.title is not None:
@@ -808,6 +4053,7 @@ async def update_orchard(
             update_data["category"] = request.category
         if request.location is not None:
             update_data["location"] = request.location
+            update_data["geo"] = gazetteer.lookup(request.location)
         if request.timeline is not None:
             update_data["timeline"] = request.timeline
         if request.why_needed is not None:
@@ -823,15 +4069,20 @@ async def update_orchard(
         
         update_data["updated_at"] = datetime.utcnow()
         
-        # Update in database
-        await db.orchards.update_one(
-            {"id": orchard_id},
-            {"$set": update_data}
+        # Ownership is part of the filter, so a missing or foreign orchard matches nothing
+        updated_orchard_doc = await db.orchards.find_one_and_update(
+            {"id": orchard_id, "user_id": current_user.id},
+            {"$set": update_data},
+            projection={"pocket_bitmap": 0},
+            return_document=ReturnDocument.AFTER
         )
         
-        # Get updated orchard
-        updated_orchard_doc = await db.orchards.find_one({"id": orchard_id})
+        if not updated_orchard_doc:
+            raise HTTPException(status_code=404, detail="Orchard not found or access denied")
+        
         updated_orchard = Orchard(**updated_orchard_doc)
+        await orchard_detail_cache.invalidate(orchard_id)
+        event_bus.emit("orchard.updated", orchard_id=orchard_id)
         
         return APIResponse(
             success=True,
@@ -862,6 +4113,9 @@ async def delete_orchard(
         
         # Delete associated pockets
         await db.pockets.delete_many({"orchard_id": orchard_id})
+        await orchard_detail_cache.invalidate(orchard_id)
+        event_bus.emit("orchard.deleted", orchard_id=orchard_id, category=orchard_doc["category"],
+                       status=orchard_doc["status"])
         
         return APIResponse(
             success=True,
@@ -874,6 +4128,25 @@ async def delete_orchard(
         logging.error(f"Delete orchard error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@api_router.get("/leaderboards/{kind}", response_model=APIResponse)
+async def get_leaderboard(
+    kind: LeaderboardKind = PathParam(...),
+    category: Optional[GiftCategory] = Query(None),
+    limit: int = Query(10, ge=1, le=LEADERBOARD_SIZE)
+):
+    """Get the trending, nearly complete or most viewed orchards, optionally per category"""
+    try:
+        board = orchard_leaderboards.top(kind, category.value if category else None, limit)
+        
+        return APIResponse(
+            success=True,
+            data={"orchards": board, "refreshed_at": orchard_leaderboards.refreshed_at},
+            message="Leaderboard retrieved successfully"
+        )
+    except Exception as e:
+        logging.error(f"Get leaderboard error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 # Pocket selection and bestowing endpoints
 @api_router.post("/orchards/{orchard_id}/bestow", response_model=APIResponse)
 async def bestow_into_orchard(
@@ -894,63 +4167,170 @@ async def bestow_into_orchard(
         if orchard.status != OrchardStatus.ACTIVE:
             raise HTTPException(status_code=400, detail="Orchard is not active")
         
-        # Check if pockets are available
-        existing_pockets = await db.pockets.find({"orchard_id": orchard_id}).to_list(length=None)
-        taken_pocket_numbers = [p["pocket_number"] for p in existing_pockets]
+        bitmap = await ensure_pocket_bitmap(orchard_doc)
         
-        unavailable_pockets = [pn for pn in request.pocket_numbers if pn in taken_pocket_numbers]
-        if unavailable_pockets:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Pockets {unavailable_pockets} are already taken"
-            )
+        if request.pocket_numbers:
+            # Validate requested pocket numbers
+            selection_error = pocket_selection_error(orchard, request.pocket_numbers)
+            if selection_error:
+                raise HTTPException(status_code=400, detail=selection_error)
+            
+            # Reject from the bitmap before touching the pockets collection
+            unavailable_pockets = taken_pockets(bitmap, request.pocket_numbers)
+            if not unavailable_pockets:
+                pockets, unavailable_pockets = await reserve_pockets(orchard, request.pocket_numbers, current_user)
+            if unavailable_pockets:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Pockets {unavailable_pockets} are already taken"
+                )
+        elif request.quantity:
+            # Pick the next free pockets, retrying around concurrent claims
+            pockets = []
+            for _ in range(POCKET_SELECTION_ATTEMPTS):
+                pocket_numbers = next_free_pockets(bitmap, orchard.total_pockets, request.quantity)
+                if len(pocket_numbers) < request.quantity:
+                    raise HTTPException(status_code=400, detail="Not enough pockets available")
+                pockets, conflicts = await reserve_pockets(orchard, pocket_numbers, current_user)
+                if pockets:
+                    break
+                for word, mask in pocket_bitmap_masks(conflicts).items():
+                    bitmap[word] |= mask
+            if not pockets:
+                raise HTTPException(status_code=409, detail="Pockets were taken concurrently, please retry")
+        else:
+            raise HTTPException(status_code=400, detail="Select pocket numbers or a quantity")
         
-        # Create pockets
-        pockets = []
-        for pocket_number in request.pocket_numbers:
-            pocket = Pocket(
-                orchard_id=orchard_id,
-                pocket_number=pocket_number,
-                user_id=current_user.id,
-                amount=orchard.pocket_price,
-                bestower_name=f"{current_user.first_name} {current_user.last_name[0]}."
-            )
-            pockets.append(pocket.dict())
+        pocket_numbers = [p["pocket_number"] for p in pockets]
+        try:
+            await mark_pockets_taken(orchard_id, pocket_numbers)
+            # Update orchard counters from the stored values, not the earlier read
+            updated_orchard_doc = await increment_filled_pockets(orchard_id, len(pockets))
+        except Exception:
+            await release_pockets(orchard_id, pockets)
+            raise
+        if not updated_orchard_doc:
+            # Deleted since it was read; its pockets must not outlive it
+            await release_pockets(orchard_id, pockets)
+            raise HTTPException(status_code=404, detail="Orchard not found")
+        completion_rate = updated_orchard_doc["completion_rate"]
+        await orchard_detail_cache.invalidate(orchard_id)
+        
+        total_amount = len(pockets) * orchard.pocket_price
+        event_bus.emit("pockets.bestowed", orchard_id=orchard_id, category=orchard.category.value,
+                       user_id=current_user.id, pockets=len(pockets), amount=total_amount,
+                       at=pockets[0]["created_at"])
+        
+        return APIResponse(
+            success=True,
+            data={
+                "pockets_selected": len(pockets),
+                "pocket_numbers": pocket_numbers,
+                "total_amount": total_amount,
+                "completion_rate": completion_rate
+            },
+            message="Pockets selected successfully"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Bestow into orchard error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@api_router.post("/bestowals/basket", response_model=APIResponse)
+async def bestow_basket(
+    request: BasketBestowRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Bestow into several orchards with one batched validation and one commit"""
+    try:
+        orchard_ids = [item.orchard_id for item in request.items]
+        if len(set(orchard_ids)) != len(orchard_ids):
+            raise HTTPException(status_code=400, detail="Each orchard may appear only once in a basket")
         
-        # Insert pockets
-        await db.pockets.insert_many(pockets)
+        # Validate every item against a single batched read
+        orchard_docs = {doc["id"]: doc async for doc in db.orchards.find({"id": {"$in": orchard_ids}})}
+        bitmaps = await ensure_pocket_bitmaps(list(orchard_docs.values()))
+        results = {}
+        selections = []
+        for item in request.items:
+            orchard_doc = orchard_docs.get(item.orchard_id)
+            error = None
+            if not orchard_doc:
+                error = "Orchard not found"
+            else:
+                orchard = Orchard(**orchard_doc)
+                if orchard.status != OrchardStatus.ACTIVE:
+                    error = "Orchard is not active"
+                elif not item.pocket_numbers:
+                    error = "Select pocket numbers"
+                else:
+                    error = pocket_selection_error(orchard, item.pocket_numbers)
+                    if not error:
+                        unavailable_pockets = taken_pockets(bitmaps[item.orchard_id], item.pocket_numbers)
+                        if unavailable_pockets:
+                            error = f"Pockets {unavailable_pockets} are already taken"
+            if error:
+                results[item.orchard_id] = {"orchard_id": item.orchard_id, "success": False, "error": error}
+            else:
+                selections.append((orchard, item.pocket_numbers))
         
-        # Update orchard filled_pockets count
-        new_filled_count = orchard.filled_pockets + len(request.pocket_numbers)
-        completion_rate = (new_filled_count / orchard.total_pockets) * 100
+        if request.atomic and results:
+            raise HTTPException(
+                status_code=400,
+                detail="; ".join(f"{r['orchard_id']}: {r['error']}" for r in results.values())
+            )
         
-        await db.orchards.update_one(
-            {"id": orchard_id},
-            {
-                "$set": {
-                    "filled_pockets": new_filled_count,
-                    "completion_rate": completion_rate,
-                    "updated_at": datetime.utcnow()
-                },
-                "$inc": {"supporters": 1}
+        committed, conflicts = await commit_basket(selections, current_user, request.atomic) if selections else ({}, {})
+        for orchard_id, pocket_numbers in conflicts.items():
+            results[orchard_id] = {
+                "orchard_id": orchard_id,
+                "success": False,
+                "error": f"Pockets {pocket_numbers} are already taken"
             }
-        )
+        if request.atomic and conflicts:
+            raise HTTPException(
+                status_code=400,
+                detail="; ".join(f"{r['orchard_id']}: {r['error']}" for r in results.values())
+            )
         
-        total_amount = len(request.pocket_numbers) * orchard.pocket_price
+        # Fresh completion rates for every committed orchard in one read
+        completion_rates = {
+            doc["id"]: doc["completion_rate"]
+            async for doc in db.orchards.find({"id": {"$in": list(committed)}}, {"id": 1, "completion_rate": 1})
+        } if committed else {}
         
+        orchards_by_id = {orchard.id: orchard for orchard, _ in selections}
+        for orchard_id, pockets in committed.items():
+            orchard = orchards_by_id[orchard_id]
+            total_amount = len(pockets) * orchard.pocket_price
+            results[orchard_id] = {
+                "orchard_id": orchard_id,
+                "success": True,
+                "pockets_selected": len(pockets),
+                "pocket_numbers": [p["pocket_number"] for p in pockets],
+                "total_amount": total_amount,
+                "completion_rate": completion_rates.get(orchard_id)
+            }
+            await orchard_detail_cache.invalidate(orchard_id)
+            event_bus.emit("pockets.bestowed", orchard_id=orchard_id, category=orchard.category.value,
+                           user_id=current_user.id, pockets=len(pockets), amount=total_amount,
+                           at=pockets[0]["created_at"])
+        
+        ordered_results = [results[orchard_id] for orchard_id in orchard_ids]
         return APIResponse(
             success=True,
             data={
-                "pockets_selected": len(request.pocket_numbers),
-                "total_amount": total_amount,
-                "completion_rate": completion_rate
+                "results": ordered_results,
+                "pockets_selected": sum(r.get("pockets_selected", 0) for r in ordered_results),
+                "total_amount": sum(r.get("total_amount", 0) for r in ordered_results)
             },
-            message="Pockets selected successfully"
+            message="Basket processed successfully"
         )
     except HTTPException:
         raise
     except Exception as e:
-        logging.error(f"Bestow into orchard error: {e}")
+        logging.error(f"Basket bestow error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @api_router.post("/orchards/{orchard_id}/complete", response_model=APIResponse)
@@ -975,22 +4355,46 @@ async def complete_orchard(
         if orchard.filled_pockets < orchard.total_pockets:
             raise HTTPException(status_code=400, detail="Orchard is not fully funded")
         
-        # Process payout (simplified)
-        await db.orchards.update_one(
-            {"id": orchard_id},
-            {
-                "$set": {
+        if orchard.payout_status:
+            raise HTTPException(status_code=400, detail="Payout already initiated")
+        
+        # The job's unique orchard_id makes this the one completion; the orchard
+        # is only marked once its payout job exists
+        job = await enqueue_payout(orchard)
+        if job is None:
+            raise HTTPException(status_code=400, detail="Payout already initiated")
+        completed_at = datetime.utcnow()
+        try:
+            result = await db.orchards.update_one(
+                {"id": orchard_id, "payout_status": None},
+                {"$set": {
                     "status": OrchardStatus.COMPLETED,
-                    "payout_processed": True,
-                    "updated_at": datetime.utcnow()
-                }
-            }
-        )
+                    "payout_status": PayoutJobStatus.PENDING.value,
+                    "updated_at": completed_at
+                }}
+            )
+            if result.modified_count == 0:
+                # A worker already picked the job up and recorded its outcome
+                await db.orchards.update_one(
+                    {"id": orchard_id},
+                    {"$set": {"status": OrchardStatus.COMPLETED, "updated_at": completed_at}}
+                )
+        except Exception:
+            await db.payout_jobs.delete_one({"id": job.id, "status": PayoutJobStatus.PENDING.value})
+            raise
+        
+        await orchard_detail_cache.invalidate(orchard_id)
+        event_bus.emit("orchard.completed", orchard_id=orchard_id, category=orchard.category.value, at=completed_at,
+                       completion_days=(completed_at - orchard.created_at).total_seconds() / 86400)
         
         return APIResponse(
             success=True,
-            data={"payout_processed": True},
-            message="Orchard completed and payout initiated"
+            data={
+                "payout_processed": False,
+                "payout_status": PayoutJobStatus.PENDING.value,
+                "payout_job_id": job.id
+            },
+            message="Orchard completed and payout queued"
         )
     except HTTPException:
         raise
@@ -1002,41 +4406,57 @@ async def complete_orchard(
 @api_router.post("/payments/card", response_model=APIResponse)
 async def process_card_payment(
     request: PaymentCreateRequest,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
     """Process card payment"""
     try:
-        # Simulate card processing (in production, use Stripe/Square)
-        payment_id = f"card_{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}"
+        def card_response(payment_id: str) -> APIResponse:
+            return APIResponse(
+                success=True,
+                data={
+                    "payment_id": payment_id,
+                    "status": "completed",
+                    "amount": request.amount,
+                    "currency": request.currency,
+                    "method": "card"
+                },
+                message="Card payment processed successfully"
+            )
         
-        # Create payment record
-        payment = Payment(
-            user_id=current_user.id,
-            orchard_id=request.orchard_id,
-            payment_type=request.payment_type,
-            amount=request.amount,
-            currency=request.currency,
-            method=request.method,
-            status=PaymentStatus.COMPLETED,
-            payment_id=payment_id,
-            description=request.description,
-            metadata=request.metadata
-        )
+        async def recover(scoped_key: str) -> Optional[APIResponse]:
+            payment_doc = await db.payments.find_one({"idempotency_key": scoped_key}, {"_id": 0, "payment_id": 1})
+            return card_response(payment_doc["payment_id"]) if payment_doc else None
         
-        # Insert payment
-        await db.payments.insert_one(payment.dict())
+        async def process(scoped_key: Optional[str]) -> APIResponse:
+            # Simulate card processing (in production, use Stripe/Square)
+            payment_id = f"card_{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}"
+            
+            # Create payment record
+            payment = Payment(
+                user_id=current_user.id,
+                orchard_id=request.orchard_id,
+                payment_type=request.payment_type,
+                amount=request.amount,
+                currency=request.currency,
+                method=request.method,
+                status=PaymentStatus.COMPLETED,
+                payment_id=payment_id,
+                idempotency_key=scoped_key,
+                description=request.description,
+                metadata=request.metadata
+            )
+            
+            # Insert payment
+            await db.payments.insert_one(payment.dict())
+            event_bus.emit("payment.completed", orchard_id=payment.orchard_id, amount=payment.amount,
+                           payment_type=payment.payment_type, at=payment.updated_at)
+            
+            return card_response(payment_id)
         
-        return APIResponse(
-            success=True,
-            data={
-                "payment_id": payment_id,
-                "status": "completed",
-                "amount": request.amount,
-                "currency": request.currency,
-                "method": "card"
-            },
-            message="Card payment processed successfully"
-        )
+        return await run_idempotent(idempotency_key, f"payments/card:{current_user.id}", request.dict(), process, recover)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Card payment error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -1044,40 +4464,54 @@ async def process_card_payment(
 @api_router.post("/payments/paypal-create", response_model=APIResponse)
 async def create_paypal_order(
     request: PaymentCreateRequest,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
     """Create PayPal order"""
     try:
-        # Create PayPal order (simplified)
-        order_id = f"paypal_order_{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}"
+        def order_response(order_id: str) -> APIResponse:
+            return APIResponse(
+                success=True,
+                data={
+                    "order_id": order_id,
+                    "approval_url": f"https://paypal.com/checkoutnow?token={order_id}",
+                    "amount": request.amount,
+                    "currency": request.currency
+                },
+                message="PayPal order created successfully"
+            )
         
-        # Create payment record
-        payment = Payment(
-            user_id=current_user.id,
-            orchard_id=request.orchard_id,
-            payment_type=request.payment_type,
-            amount=request.amount,
-            currency=request.currency,
-            method=request.method,
-            status=PaymentStatus.PENDING,
-            order_id=order_id,
-            description=request.description,
-            metadata=request.metadata
-        )
+        async def recover(scoped_key: str) -> Optional[APIResponse]:
+            payment_doc = await db.payments.find_one({"idempotency_key": scoped_key}, {"_id": 0, "order_id": 1})
+            return order_response(payment_doc["order_id"]) if payment_doc else None
         
-        # Insert payment
-        await db.payments.insert_one(payment.dict())
+        async def process(scoped_key: Optional[str]) -> APIResponse:
+            # Create PayPal order (simplified)
+            order_id = f"paypal_order_{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}"
+            
+            # Create payment record
+            payment = Payment(
+                user_id=current_user.id,
+                orchard_id=request.orchard_id,
+                payment_type=request.payment_type,
+                amount=request.amount,
+                currency=request.currency,
+                method=request.method,
+                status=PaymentStatus.PENDING,
+                order_id=order_id,
+                idempotency_key=scoped_key,
+                description=request.description,
+                metadata=request.metadata
+            )
+            
+            # Insert payment
+            await db.payments.insert_one(payment.dict())
+            
+            return order_response(order_id)
         
-        return APIResponse(
-            success=True,
-            data={
-                "order_id": order_id,
-                "approval_url": f"https://paypal.com/checkoutnow?token={order_id}",
-                "amount": request.amount,
-                "currency": request.currency
-            },
-            message="PayPal order created successfully"
-        )
+        return await run_idempotent(idempotency_key, f"payments/paypal-create:{current_user.id}", request.dict(), process, recover)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"PayPal create order error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -1085,38 +4519,57 @@ async def create_paypal_order(
 @api_router.post("/payments/paypal-capture", response_model=APIResponse)
 async def capture_paypal_order(
     order_id: str,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
     """Capture PayPal order"""
     try:
-        # Find payment by order_id
-        payment_doc = await db.payments.find_one({"order_id": order_id, "user_id": current_user.id})
-        if not payment_doc:
-            raise HTTPException(status_code=404, detail="Payment not found")
+        def capture_response(payment_id: str) -> APIResponse:
+            return APIResponse(
+                success=True,
+                data={
+                    "payment_id": payment_id,
+                    "status": "completed",
+                    "order_id": order_id
+                },
+                message="PayPal payment captured successfully"
+            )
         
-        # Update payment status
-        payment_id = f"paypal_capture_{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}"
+        async def recover(scoped_key: str) -> Optional[APIResponse]:
+            # A capture already written by the crashed attempt is not captured again
+            payment_doc = await db.payments.find_one(
+                {"order_id": order_id, "user_id": current_user.id, "status": PaymentStatus.COMPLETED},
+                {"_id": 0, "payment_id": 1}
+            )
+            return capture_response(payment_doc["payment_id"]) if payment_doc else None
         
-        await db.payments.update_one(
-            {"order_id": order_id},
-            {
-                "$set": {
-                    "status": PaymentStatus.COMPLETED,
-                    "payment_id": payment_id,
-                    "updated_at": datetime.utcnow()
+        async def process(scoped_key: Optional[str]) -> APIResponse:
+            # Find payment by order_id
+            payment_doc = await db.payments.find_one({"order_id": order_id, "user_id": current_user.id})
+            if not payment_doc:
+                raise HTTPException(status_code=404, detail="Payment not found")
+            
+            # Update payment status
+            payment_id = f"paypal_capture_{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:8]}"
+            captured_at = datetime.utcnow()
+            
+            await db.payments.update_one(
+                {"order_id": order_id},
+                {
+                    "$set": {
+                        "status": PaymentStatus.COMPLETED,
+                        "payment_id": payment_id,
+                        "updated_at": captured_at
+                    }
                 }
-            }
-        )
+            )
+            if payment_doc.get("status") != PaymentStatus.COMPLETED:
+                event_bus.emit("payment.completed", orchard_id=payment_doc.get("orchard_id"), amount=payment_doc["amount"],
+                               payment_type=payment_doc["payment_type"], at=captured_at)
+            
+            return capture_response(payment_id)
         
-        return APIResponse(
-            success=True,
-            data={
-                "payment_id": payment_id,
-                "status": "completed",
-                "order_id": order_id
-            },
-            message="PayPal payment captured successfully"
-        )
+        return await run_idempotent(idempotency_key, f"payments/paypal-capture:{current_user.id}", {"order_id": order_id}, process, recover)
     except HTTPException:
         raise
     except Exception as e:
@@ -1138,7 +4591,7 @@ async def get_category_analytics(
         if current_user.role != UserRole.ADMIN:
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        # Generate mock analytics data based on type
+        # Read precomputed daily rollups based on type
         if analytics_type == "performance":
             data = await generate_performance_analytics(category)
         elif analytics_type == "insights":
@@ -1147,6 +4600,8 @@ async def get_category_analytics(
             data = await generate_comparison_analytics()
         elif analytics_type == "trending":
             data = await generate_trending_analytics()
+        elif analytics_type == "daily":
+            data = await generate_daily_analytics(category, start_date, end_date)
         elif analytics_type == "specific":
             if not category:
                 raise HTTPException(status_code=400, detail="Category required for specific analytics")
@@ -1166,19 +4621,27 @@ async def get_category_analytics(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @api_router.post("/analytics/categories", response_model=APIResponse)
-async def update_analytics(current_user: User = Depends(get_current_user)):
+async def update_analytics(
+    rebuild: bool = Query(False),
+    current_user: User = Depends(get_current_user)
+):
     """Update analytics (admin only)"""
     try:
         # Check if user has admin role
         if current_user.role != UserRole.ADMIN:
             raise HTTPException(status_code=403, detail="Admin access required")
         
-        # Update analytics (simplified)
-        await update_daily_analytics()
+        # Roll up raw data into daily analytics rows and write buffered counters
+        days = await update_daily_analytics(rebuild=rebuild)
+        if rebuild:
+            await rebuild_analytics_counters()
+            await rebuild_orchard_supporters()
+        else:
+            await analytics_aggregator.flush()
         
         return APIResponse(
             success=True,
-            data={"message": "Analytics updated successfully"},
+            data={"message": "Analytics updated successfully", "days_rolled_up": days},
             message="Analytics updated successfully"
         )
     except HTTPException:
@@ -1188,105 +4651,779 @@ async def update_analytics(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # Analytics helper functions
-async def generate_performance_analytics(category: Optional[GiftCategory] = None):
-    """Generate performance analytics"""
-    # Mock data for demonstration
+# Daily rollups live in the `analytics` collection, one row per (date, category)
+# plus an overall row with category=None. Raw collections are only read by the
+# aggregation pipelines in compute_daily_rollup; every reader below works on rollups,
+# except the daily report, which reads the live event counters in `analytics_daily`.
+ANALYTICS_TREND_DAYS = 30
+
+def start_of_day(value: datetime) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+def parse_analytics_date(value: Optional[str], default: datetime) -> datetime:
+    """Parse an ISO date query parameter"""
+    if not value:
+        return default
+    try:
+        return start_of_day(datetime.fromisoformat(value))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+
+def percent_change(current: float, previous: float) -> float:
+    if not previous:
+        return 100.0 if current else 0.0
+    return round((current - previous) / previous * 100, 1)
+
+def faceted_group(group: Dict[str, Any], category_path: str) -> Dict[str, Any]:
+    """Run the same $group per category and across all categories in one pass"""
+    return {"$facet": {
+        "by_category": [{"$group": {"_id": category_path, **group}}],
+        "overall": [{"$group": {"_id": None, **group}}]
+    }}
+
+def orchard_category_lookup() -> List[Dict[str, Any]]:
     return [
-        {
-            "category": "The Gift of Technology",
-            "lifetime_orchards": 156,
-            "lifetime_bestowed": 2450000,
-            "current_orchards": 23,
-            "current_bestowed": 345000,
-            "orchards_trend": 15.2,
-            "bestowed_trend": 28.5,
-            "popularity_rank": 1,
-            "success_rank": 2,
-            "growth_rank": 1
-        },
-        {
-            "category": "The Gift of Vehicles",
-            "lifetime_orchards": 89,
-            "lifetime_bestowed": 1890000,
-            "current_orchards": 12,
-            "current_bestowed": 280000,
-            "orchards_trend": -5.1,
-            "bestowed_trend": 12.3,
-            "popularity_rank": 2,
-            "success_rank": 1,
-            "growth_rank": 4
-        }
+        {"$lookup": {"from": "orchards", "localField": "orchard_id", "foreignField": "id", "as": "orchard"}},
+        {"$unwind": "$orchard"}
     ]
 
+async def compute_daily_rollup(day: datetime) -> Dict[Optional[str], Dict[str, Any]]:
+    """Aggregate one day's figures per category server-side"""
+    day_end = day + timedelta(days=1)
+    rows: Dict[Optional[str], Dict[str, Any]] = {}
+    
+    def merge(facets: List[Dict[str, Any]]):
+        for facet in facets:
+            for group in facet["by_category"] + facet["overall"]:
+                rows.setdefault(group.pop("_id"), {}).update(group)
+    
+    # Orchard snapshot as of the end of the day (status counts reflect the current state)
+    merge(await db.orchards.aggregate([
+        {"$match": {"created_at": {"$lt": day_end}}},
+        faceted_group({
+            "total_orchards": {"$sum": 1},
+            "new_orchards": {"$sum": {"$cond": [{"$gte": ["$created_at", day]}, 1, 0]}},
+            "completed_orchards": {"$sum": {"$cond": [{"$eq": ["$status", OrchardStatus.COMPLETED.value]}, 1, 0]}},
+            "active_orchards": {"$sum": {"$cond": [{"$eq": ["$status", OrchardStatus.ACTIVE.value]}, 1, 0]}},
+            "total_seed_value": {"$sum": "$seed_value"},
+            "total_views": {"$sum": "$views"},
+            "completion_rate": {"$avg": "$completion_rate"},
+            "average_completion_days": {"$avg": {"$cond": [
+                {"$eq": ["$status", OrchardStatus.COMPLETED.value]},
+                {"$divide": [{"$subtract": ["$updated_at", "$created_at"]}, 86400000]},
+                None
+            ]}}
+        }, "$category")
+    ]).to_list(length=None))
+    
+    # Pockets bestowed during the day
+    merge(await db.pockets.aggregate([
+        {"$match": {"created_at": {"$gte": day, "$lt": day_end}}},
+        *orchard_category_lookup(),
+        faceted_group({
+            "total_bestowed": {"$sum": "$amount"},
+            "bestowers": {"$addToSet": "$user_id"}
+        }, "$orchard.category"),
+        {"$project": {
+            "by_category": {"$map": {"input": "$by_category", "in": {
+                "_id": "$$this._id", "total_bestowed": "$$this.total_bestowed",
+                "unique_bestowers": {"$size": "$$this.bestowers"}
+            }}},
+            "overall": {"$map": {"input": "$overall", "in": {
+                "_id": "$$this._id", "total_bestowed": "$$this.total_bestowed",
+                "unique_bestowers": {"$size": "$$this.bestowers"}
+            }}}
+        }}
+    ]).to_list(length=None))
+    
+    # Completed bestowal payments during the day
+    merge(await db.payments.aggregate([
+        {"$match": {
+            "created_at": {"$gte": day, "$lt": day_end},
+            "status": PaymentStatus.COMPLETED.value,
+            "payment_type": "orchard_bestowal"
+        }},
+        *orchard_category_lookup(),
+        faceted_group({
+            "total_bestowals": {"$sum": 1},
+            "total_paid": {"$sum": "$amount"}
+        }, "$orchard.category")
+    ]).to_list(length=None))
+    
+    for row in rows.values():
+        if row.get("total_orchards"):
+            row["success_rate"] = row["completed_orchards"] / row["total_orchards"] * 100
+        row["completion_rate"] = row.get("completion_rate") or 0.0
+    return rows
+
+async def write_daily_rollup(day: datetime, rows: Dict[Optional[str], Dict[str, Any]]):
+    """Upsert one day's rollup rows into the analytics collection"""
+    operations = []
+    for category, figures in rows.items():
+        analytics = Analytics(date=day, category=category, **figures).dict()
+        set_on_insert = {"id": analytics.pop("id"), "created_at": analytics.pop("created_at")}
+        operations.append(UpdateOne(
+            {"date": day, "category": analytics.pop("category")},
+            {"$set": analytics, "$setOnInsert": set_on_insert},
+            upsert=True
+        ))
+    if operations:
+        await db.analytics.bulk_write(operations, ordered=False)
+
+async def load_rollups(category: Optional[GiftCategory], start: datetime, end: datetime, overall: bool = False) -> List[Dict[str, Any]]:
+    """Read rollup rows for a date range, oldest first"""
+    filter_query: Dict[str, Any] = {"date": {"$gte": start, "$lt": end}}
+    if overall:
+        filter_query["category"] = None
+    elif category:
+        filter_query["category"] = category
+    else:
+        filter_query["category"] = {"$ne": None}
+    return await db.analytics.find(filter_query, {"_id": 0}).sort("date", ASCENDING).to_list(length=None)
+
+async def generate_performance_analytics(category: Optional[GiftCategory] = None):
+    """Generate performance analytics"""
+    today = start_of_day(datetime.utcnow())
+    current_start = today - timedelta(days=ANALYTICS_TREND_DAYS - 1)
+    previous_start = current_start - timedelta(days=ANALYTICS_TREND_DAYS)
+    
+    match: Dict[str, Any] = {"category": category} if category else {"category": {"$ne": None}}
+    in_current = {"$gte": ["$date", current_start]}
+    in_previous = {"$and": [{"$gte": ["$date", previous_start]}, {"$lt": ["$date", current_start]}]}
+    groups = await db.analytics.aggregate([
+        {"$match": match},
+        {"$sort": {"date": 1}},
+        {"$group": {
+            "_id": "$category",
+            "lifetime_orchards": {"$last": "$total_orchards"},
+            "current_orchards": {"$last": "$active_orchards"},
+            "lifetime_bestowed": {"$sum": "$total_bestowed"},
+            "current_bestowed": {"$sum": {"$cond": [in_current, "$total_bestowed", 0]}},
+            "previous_bestowed": {"$sum": {"$cond": [in_previous, "$total_bestowed", 0]}},
+            "current_new": {"$sum": {"$cond": [in_current, "$new_orchards", 0]}},
+            "previous_new": {"$sum": {"$cond": [in_previous, "$new_orchards", 0]}},
+            "total_views": {"$last": "$total_views"},
+            "success_rate": {"$last": "$success_rate"}
+        }}
+    ]).to_list(length=None)
+    
+    performance = [{
+        "category": group["_id"],
+        "lifetime_orchards": group["lifetime_orchards"],
+        "lifetime_bestowed": group["lifetime_bestowed"],
+        "current_orchards": group["current_orchards"],
+        "current_bestowed": group["current_bestowed"],
+        "orchards_trend": percent_change(group["current_new"], group["previous_new"]),
+        "bestowed_trend": percent_change(group["current_bestowed"], group["previous_bestowed"]),
+        "total_views": group["total_views"],
+        "success_rate": group["success_rate"]
+    } for group in groups]
+    
+    for rank_field, key in (("popularity_rank", "total_views"), ("success_rank", "success_rate"), ("growth_rank", "bestowed_trend")):
+        for rank, row in enumerate(sorted(performance, key=lambda r: r[key] or 0, reverse=True), start=1):
+            row[rank_field] = rank
+    
+    return sorted(performance, key=lambda r: r["popularity_rank"])
+
 async def generate_insights_analytics(category: Optional[GiftCategory] = None):
     """Generate insights analytics"""
+    performance = await generate_performance_analytics(category)
+    if not performance:
+        return {"peak_performance": None, "growth_opportunity": None, "market_demand": None}
+    
+    by_success = min(performance, key=lambda r: r["success_rank"])
+    by_growth = min(performance, key=lambda r: r["growth_rank"])
+    by_views = min(performance, key=lambda r: r["popularity_rank"])
     return {
-        "peak_performance": "Technology and Property categories show highest success rates",
-        "growth_opportunity": "Wellness and Energy categories have 40%+ growth potential",
-        "market_demand": "Vehicle and Property orchards receive 3x more views"
+        "peak_performance": f"{by_success['category']} shows the highest success rate ({by_success['success_rate']:.1f}%)",
+        "growth_opportunity": f"{by_growth['category']} bestowals changed {by_growth['bestowed_trend']:+.1f}% over {ANALYTICS_TREND_DAYS} days",
+        "market_demand": f"{by_views['category']} orchards receive the most views ({by_views['total_views']})"
     }
 
 async def generate_comparison_analytics():
     """Generate comparison analytics"""
+    performance = await generate_performance_analytics()
+    
+    def top(key: str, reverse: bool = True) -> List[str]:
+        return [r["category"] for r in sorted(performance, key=lambda r: r[key] or 0, reverse=reverse)[:3]]
+    
     return {
-        "top_categories": ["Technology", "Vehicles", "Property"],
-        "growth_leaders": ["Property", "Technology", "Energy"],
-        "underperforming": ["DIY", "Custom Made"]
+        "top_categories": top("lifetime_bestowed"),
+        "growth_leaders": top("bestowed_trend"),
+        "underperforming": top("success_rate", reverse=False)
     }
 
 async def generate_trending_analytics():
     """Generate trending analytics"""
+    performance = await generate_performance_analytics()
+    trending = sorted(performance, key=lambda r: r["bestowed_trend"], reverse=True)[:5]
     return [
-        {"category": "The Gift of Property", "trend": 45.2, "current_value": 520000},
-        {"category": "The Gift of Technology", "trend": 28.5, "current_value": 345000},
-        {"category": "The Gift of Energy", "trend": 18.7, "current_value": 125000}
+        {"category": r["category"], "trend": r["bestowed_trend"], "current_value": r["current_bestowed"]}
+        for r in trending
     ]
 
 async def generate_specific_analytics(category: GiftCategory, start_date: Optional[str], end_date: Optional[str]):
     """Generate specific category analytics"""
+    today = start_of_day(datetime.utcnow())
+    start = parse_analytics_date(start_date, datetime.min)
+    end = parse_analytics_date(end_date, today) + timedelta(days=1)
+    rows = await load_rollups(category, start, end)
+    latest = rows[-1] if rows else {}
+    
     return {
         "category": category,
-        "total_orchards": 45,
-        "completed_orchards": 23,
-        "total_bestowed": 750000,
-        "average_completion_time": 32,
-        "success_rate": 85.2
+        "total_orchards": latest.get("total_orchards", 0),
+        "completed_orchards": latest.get("completed_orchards", 0),
+        "total_bestowed": sum(row["total_bestowed"] for row in rows),
+        "average_completion_time": latest.get("average_completion_days"),
+        "success_rate": latest.get("success_rate", 0.0)
     }
 
 async def generate_all_analytics(start_date: Optional[str], end_date: Optional[str]):
     """Generate all analytics"""
+    today = start_of_day(datetime.utcnow())
+    end = parse_analytics_date(end_date, today) + timedelta(days=1)
+    start = parse_analytics_date(start_date, end - timedelta(days=ANALYTICS_TREND_DAYS))
+    rows = await load_rollups(None, start, end, overall=True)
+    previous_rows = await load_rollups(None, start - (end - start), start, overall=True)
+    latest = rows[-1] if rows else {}
+    
+    return {
+        "total_orchards": latest.get("total_orchards", 0),
+        "active_orchards": latest.get("active_orchards", 0),
+        "completed_orchards": latest.get("completed_orchards", 0),
+        "total_bestowed": sum(row["total_bestowed"] for row in rows),
+        "total_users": await db.users.estimated_document_count(),
+        "growth_rate": percent_change(
+            sum(row["new_orchards"] for row in rows),
+            sum(row["new_orchards"] for row in previous_rows)
+        )
+    }
+
+async def generate_daily_analytics(category: Optional[GiftCategory], start_date: Optional[str], end_date: Optional[str]):
+    """Read event-driven daily counters; cost is O(days x categories)"""
+    today = start_of_day(datetime.utcnow())
+    end = parse_analytics_date(end_date, today) + timedelta(days=1)
+    start = parse_analytics_date(start_date, end - timedelta(days=ANALYTICS_TREND_DAYS))
+    filter_query = {"date": {"$gte": start, "$lt": end}, "category": category}
+    rows = await db.analytics_daily.find(
+        filter_query,
+        {"_id": 0, "version": 0, "bestowers_sketch": 0, "viewers_sketch": 0}
+    ).sort("date", ASCENDING).to_list(length=None)
+    
+    # Uniques over the whole range come from merging the daily sketches
+    uniques = await unique_counts(db.analytics_daily, filter_query, ["bestowers", "viewers"])
+    
     return {
-        "total_orchards": 567,
-        "active_orchards": 234,
-        "completed_orchards": 333,
-        "total_bestowed": 8500000,
-        "total_users": 1247,
-        "growth_rate": 23.5
+        "category": category,
+        "days": rows,
+        "unique_bestowers": uniques["bestowers"],
+        "unique_viewers": uniques["viewers"]
+    }
+
+async def update_daily_analytics(rebuild: bool = False) -> int:
+    """Roll up every day since the last rollup (inclusive, it may have been partial)"""
+    today = start_of_day(datetime.utcnow())
+    
+    last_rollup = None if rebuild else await db.analytics.find_one({}, {"date": 1}, sort=[("date", -1)])
+    if last_rollup:
+        day = start_of_day(last_rollup["date"])
+    else:
+        first_orchard = await db.orchards.find_one({}, {"created_at": 1}, sort=[("created_at", 1)])
+        day = start_of_day(first_orchard["created_at"]) if first_orchard else today
+    
+    days = 0
+    while day <= today:
+        await write_daily_rollup(day, await compute_daily_rollup(day))
+        day += timedelta(days=1)
+        days += 1
+    return days
+
+class AnalyticsReconciler(PeriodicFlusher):
+    """Periodically rolls up the days since the last rollup and recomputes the event counters.
+    
+    The rollups stay the source of truth; the counters in `analytics_daily` are
+    cheap to keep current but lose events when the queue overflows or a process
+    dies, so each tick also rebuilds them from the raw collections.
+    """
+    
+    async def flush(self):
+        async with self._flush_lock:
+            try:
+                days = await update_daily_analytics()
+                rows = await rebuild_analytics_counters()
+                logging.info(f"Analytics reconciled: {days} days rolled up, {rows} counter rows rebuilt")
+            except Exception as e:
+                logging.error(f"Analytics reconcile error: {e}")
+    
+    async def stop(self):
+        # Nothing is buffered, so shutdown does not wait for a full reconcile
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+analytics_reconciler = AnalyticsReconciler(ANALYTICS_RECONCILE_INTERVAL_SECONDS)
+
+# ===== EXPORTS =====
+# Columns per export; nested values are written as JSON in CSV exports
+EXPORT_FIELDS: Dict[ExportCollection, List[str]] = {
+    ExportCollection.PAYMENTS: list(Payment.model_fields),
+    ExportCollection.POCKETS: list(Pocket.model_fields),
+    ExportCollection.ORCHARDS: list(Orchard.model_fields),
+}
+
+async def build_export_filter(
+    collection: ExportCollection,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    category: Optional[GiftCategory],
+    after: Optional[str]
+) -> Dict[str, Any]:
+    """Date range, category and resume filter; exports are ordered by (created_at, id).
+    
+    Pockets and payments are matched to a category through their orchard in stream_export.
+    """
+    clauses: List[Dict[str, Any]] = []
+    if start_date or end_date:
+        created_at = {}
+        if start_date:
+            created_at["$gte"] = start_date
+        if end_date:
+            created_at["$lt"] = end_date
+        clauses.append({"created_at": created_at})
+    
+    if category and collection == ExportCollection.ORCHARDS:
+        clauses.append({"category": category.value})
+    
+    if after:
+        last = await db[collection.value].find_one({"id": after}, {"_id": 0, "created_at": 1})
+        if not last:
+            raise HTTPException(status_code=400, detail="Unknown resume id")
+        clauses.append({"$or": [
+            {"created_at": {"$gt": last["created_at"]}},
+            {"created_at": last["created_at"], "id": {"$gt": after}}
+        ]})
+    
+    return {"$and": clauses} if clauses else {}
+
+def export_row(doc: Dict[str, Any], fields: List[str]) -> List[Any]:
+    row = []
+    for field in fields:
+        value = doc.get(field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, (dict, list)):
+            value = json.dumps(value, default=json_default)
+        row.append(value)
+    return row
+
+async def stream_export(
+    collection: ExportCollection,
+    query: Dict[str, Any],
+    export_format: ExportFormat,
+    category: Optional[GiftCategory] = None
+):
+    """Yield the export one cursor batch at a time so memory stays flat regardless of collection size.
+    
+    A failure mid-stream is re-raised so the response is cut off without its
+    final chunk and the client sees an error, not a short file.
+    """
+    fields = EXPORT_FIELDS[collection]
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": query},
+        {"$sort": {"created_at": ASCENDING, "id": ASCENDING}}
+    ]
+    if category and collection != ExportCollection.ORCHARDS:
+        pipeline += [
+            {"$lookup": {"from": "orchards", "localField": "orchard_id", "foreignField": "id", "as": "orchard"}},
+            {"$match": {"orchard.category": category.value}}
+        ]
+    pipeline.append({"$project": {"_id": 0, **{field: 1 for field in fields}}})
+    cursor = db[collection.value].aggregate(pipeline, batchSize=EXPORT_BATCH_SIZE)
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == ExportFormat.CSV else None
+    if writer:
+        writer.writerow(fields)
+    rows = 0
+    try:
+        async for doc in cursor:
+            if writer:
+                writer.writerow(export_row(doc, fields))
+            else:
+                buffer.write(json.dumps({field: doc.get(field) for field in fields}, default=json_default))
+                buffer.write("\n")
+            rows += 1
+            if rows % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    except Exception as e:
+        # Headers are already sent; the client resumes from the last complete row's id
+        logging.error(f"Export of {collection.value} failed after {rows} rows: {e}")
+        raise
+    finally:
+        await cursor.close()
+
+@api_router.get("/admin/exports/{collection}")
+async def export_collection(
+    collection: ExportCollection = PathParam(...),
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    start_date: Optional[datetime] = Query(None, description="Inclusive lower bound on created_at"),
+    end_date: Optional[datetime] = Query(None, description="Exclusive upper bound on created_at"),
+    category: Optional[GiftCategory] = Query(None),
+    after: Optional[str] = Query(None, description="Resume after the row with this id"),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream payments, pockets or orchards as NDJSON or CSV (admin only)"""
+    try:
+        if current_user.role != UserRole.ADMIN:
+            raise HTTPException(status_code=403, detail="Admin access required")
+        
+        query = await build_export_filter(collection, start_date, end_date, category, after)
+        media_type = "text/csv" if export_format == ExportFormat.CSV else "application/x-ndjson"
+        filename = f"{collection.value}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.{export_format.value}"
+        
+        return StreamingResponse(
+            stream_export(collection, query, export_format, category),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Export error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# ===== DATABASE INDEXES =====
+# Every filter the API issues on a hot path must be covered by an entry here.
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="users_id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="users_email_unique", unique=True),
+    ],
+    "orchards": [
+        IndexModel([("id", ASCENDING)], name="orchards_id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="orchards_user_id"),
+        IndexModel([("geo", GEOSPHERE), ("category", ASCENDING), ("status", ASCENDING)], name="orchards_geo_category_status"),
+    ] + [
+        # Keyset pagination: one index per sort order, alone and behind each filter
+        IndexModel(
+            prefix + [(sort.value, DESCENDING), ("id", DESCENDING)],
+            name="_".join(["orchards"] + [field for field, _ in prefix] + [sort.value, "id"])
+        )
+        for sort in OrchardSort
+        for prefix in ([], [("category", ASCENDING)], [("status", ASCENDING)])
+    ],
+    "pockets": [
+        IndexModel(
+            [("orchard_id", ASCENDING), ("pocket_number", ASCENDING)],
+            name="pockets_orchard_pocket_unique",
+            unique=True
+        ),
+        IndexModel([("id", ASCENDING)], name="pockets_id_unique", unique=True),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="pockets_created_at_id"),
+    ],
+    "payments": [
+        # Card payments store order_id=None, so only string order ids are indexed
+        IndexModel(
+            [("order_id", ASCENDING)],
+            name="payments_order_id_unique",
+            unique=True,
+            partialFilterExpression={"order_id": {"$type": "string"}}
+        ),
+        IndexModel([("id", ASCENDING)], name="payments_id_unique", unique=True),
+        IndexModel(
+            [("idempotency_key", ASCENDING)],
+            name="payments_idempotency_key_unique",
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$type": "string"}}
+        ),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="payments_created_at_id"),
+    ],
+    "payout_jobs": [
+        IndexModel([("id", ASCENDING)], name="payout_jobs_id_unique", unique=True),
+        IndexModel([("orchard_id", ASCENDING)], name="payout_jobs_orchard_id_unique", unique=True),
+        IndexModel([("provider", ASCENDING), ("status", ASCENDING), ("run_at", ASCENDING)], name="payout_jobs_lease"),
+    ],
+    "idempotency_keys": [
+        IndexModel([("created_at", ASCENDING)], name="idempotency_keys_ttl", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS),
+    ],
+    "analytics_daily": [
+        IndexModel([("date", ASCENDING), ("category", ASCENDING)], name="analytics_daily_date_category_unique", unique=True),
+        IndexModel([("category", ASCENDING), ("date", ASCENDING)], name="analytics_daily_category_date"),
+    ],
+    "orchard_sketches": [
+        IndexModel([("orchard_id", ASCENDING)], name="orchard_sketches_orchard_id_unique", unique=True),
+    ],
+    "analytics": [
+        IndexModel([("date", ASCENDING), ("category", ASCENDING)], name="analytics_date_category_unique", unique=True),
+        IndexModel([("category", ASCENDING), ("date", ASCENDING)], name="analytics_category_date"),
+    ],
+    "paypal_accounts": [
+        IndexModel([("user_id", ASCENDING)], name="paypal_accounts_user_id_unique", unique=True),
+    ],
+}
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Create every registered index, returning the names created per collection"""
+    created = {}
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        created[collection_name] = []
+        for index in indexes:
+            try:
+                names = await db[collection_name].create_indexes([index])
+                created[collection_name].extend(names)
+            except OperationFailure as e:
+                # Pre-existing duplicates or a conflicting definition must not block startup
+                logging.error(f"Index creation error on {collection_name}.{index.document['name']}: {e}")
+    return created
+
+async def check_indexes() -> Dict[str, Dict[str, List[str]]]:
+    """Report registered indexes that are missing and existing indexes with no recorded use"""
+    report = {}
+    for collection_name, indexes in INDEX_REGISTRY.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        expected = [index.document["name"] for index in indexes]
+        
+        unused = []
+        try:
+            async for stats in collection.aggregate([{"$indexStats": {}}]):
+                if stats["name"] != "_id_" and stats.get("accesses", {}).get("ops", 0) == 0:
+                    unused.append(stats["name"])
+        except OperationFailure as e:
+            logging.error(f"Index stats error on {collection_name}: {e}")
+        
+        report[collection_name] = {
+            "missing": [name for name in expected if name not in existing],
+            "unregistered": [name for name in existing if name != "_id_" and name not in expected],
+            "unused": sorted(unused)
+        }
+    return report
+
+@api_router.get("/admin/indexes", response_model=APIResponse)
+async def get_index_report(current_user: User = Depends(get_current_user)):
+    """Report missing and unused database indexes (admin only)"""
+    try:
+        if current_user.role != UserRole.ADMIN:
+            raise HTTPException(status_code=403, detail="Admin access required")
+        
+        report = await check_indexes()
+        
+        return APIResponse(
+            success=True,
+            data=report,
+            message="Index report generated successfully"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Index report error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@api_router.get("/admin/payouts", response_model=APIResponse)
+async def get_payout_queue(
+    status: Optional[PayoutJobStatus] = Query(None),
+    limit: int = Query(50, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Get payout queue depth, worker metrics and jobs (admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    depth = {
+        group["_id"]: group["count"]
+        async for group in db.payout_jobs.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
     }
+    jobs = await db.payout_jobs.find(
+        {"status": status} if status else {}, {"_id": 0}
+    ).sort("updated_at", DESCENDING).limit(limit).to_list(length=limit)
+    
+    return APIResponse(
+        success=True,
+        data={
+            "mode": PAYOUT_MODE,
+            "depth": depth,
+            "worker": payout_worker.metrics.snapshot(),
+            "scheduler": payout_scheduler.counters,
+            "jobs": jobs
+        },
+        message="Payout queue retrieved successfully"
+    )
+
+@api_router.post("/admin/payouts/{job_id}/retry", response_model=APIResponse)
+async def retry_payout_job(
+    job_id: str = PathParam(...),
+    current_user: User = Depends(get_current_user)
+):
+    """Requeue a dead-lettered or held payout job (admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    result = await db.payout_jobs.update_one(
+        {"id": job_id, "status": {"$in": [PayoutJobStatus.DEAD.value, PayoutJobStatus.HELD.value]}},
+        {"$set": {"status": PayoutJobStatus.PENDING.value, "attempts": 0, "run_at": datetime.utcnow()}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="No dead or held payout job found")
+    
+    return APIResponse(
+        success=True,
+        data={"requeued": True},
+        message="Payout job requeued successfully"
+    )
+
+@api_router.post("/admin/leaderboards/rebuild", response_model=APIResponse)
+async def rebuild_leaderboards(current_user: User = Depends(get_current_user)):
+    """Recompute leaderboard scores from the orchards and recent pockets (admin only)"""
+    try:
+        if current_user.role != UserRole.ADMIN:
+            raise HTTPException(status_code=403, detail="Admin access required")
+        
+        tracked = await orchard_leaderboards.rebuild()
+        
+        return APIResponse(
+            success=True,
+            data={"orchards_tracked": tracked},
+            message="Leaderboards rebuilt successfully"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Rebuild leaderboards error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@api_router.post("/admin/search/rebuild", response_model=APIResponse)
+async def rebuild_search_index(current_user: User = Depends(get_current_user)):
+    """Rebuild the orchard search index from the database (admin only)"""
+    try:
+        if current_user.role != UserRole.ADMIN:
+            raise HTTPException(status_code=403, detail="Admin access required")
+        
+        indexed = await orchard_search_index.rebuild()
+        
+        return APIResponse(
+            success=True,
+            data={"orchards_indexed": indexed},
+            message="Search index rebuilt successfully"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Rebuild search index error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
 
-async def update_daily_analytics():
-    """Update daily analytics"""
-    # This would typically aggregate data from orchards, payments, etc.
-    analytics = Analytics(
-        date=datetime.utcnow(),
-        total_orchards=567,
-        new_orchards=12,
-        completed_orchards=333,
-        active_orchards=234,
-        total_seed_value=8500000,
-        total_bestowed=7200000,
-        completion_rate=85.2,
-        total_bestowals=2341,
-        unique_bestowers=891,
-        total_views=15678,
-        success_rate=84.7
+@api_router.get("/admin/profiler", response_model=APIResponse)
+async def get_profiler_report(current_user: User = Depends(get_current_user)):
+    """Per-endpoint Mongo round trips, query shapes and N+1 findings (admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if not MONGO_PROFILER:
+        raise HTTPException(status_code=404, detail="Profiler is off; set MONGO_PROFILER=on")
+    
+    return APIResponse(
+        success=True,
+        data=mongo_profiler.report(),
+        message="Profiler report generated successfully"
+    )
+
+@api_router.delete("/admin/profiler", response_model=APIResponse)
+async def reset_profiler_report(current_user: User = Depends(get_current_user)):
+    """Start a fresh profiling window (admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    mongo_profiler.reset()
+    
+    return APIResponse(
+        success=True,
+        data={"reset": True},
+        message="Profiler report reset successfully"
     )
+
+@api_router.get("/admin/caches", response_model=APIResponse)
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    """Get in-process cache hit/miss counters (admin only)"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Admin access required")
     
-    await db.analytics.insert_one(analytics.dict())
+    return APIResponse(
+        success=True,
+        data={name: cache.stats() for name, cache in CACHE_REGISTRY.items()},
+        message="Cache stats retrieved successfully"
+    )
 
 # Include the router in the main app
 app.include_router(api_router)
 
+class RequestMetricsMiddleware:
+    """ASGI middleware recording latency, status codes and in-flight requests per route"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        timing = RequestTiming()
+        token = current_request_timing.set(timing)
+        method = scope["method"]
+        status = {"code": 500, "finished": None}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["finished"] = time.perf_counter()
+            await send(message)
+        
+        http_requests_in_flight.inc((method,))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.inc((method,), -1)
+            current_request_timing.reset(token)
+            finished = status["finished"] or time.perf_counter()
+            http_requests_total.inc((method, timing.route, str(status["code"])))
+            http_request_duration.observe((method, timing.route), finished - timing.started)
+            http_request_db_duration.observe((timing.route,), timing.db_seconds)
+            http_request_db_commands.observe((timing.route,), timing.db_commands)
+            
+            if timing.operations is not None and timing.route != "unmatched":
+                mongo_profiler.record(f"{method} {timing.route}", timing.operations, timing.db_seconds)
+            
+            breakdown = timing.breakdown(finished)
+            if breakdown["total"] >= SLOW_REQUEST_MS and timing.route.startswith(SLOW_REQUEST_ROUTE_PREFIXES):
+                logging.warning(
+                    f"Slow request {method} {timing.route} {status['code']} total={breakdown['total']:.1f}ms "
+                    f"db={breakdown['db']:.1f}ms ({timing.db_commands} commands) handler={breakdown['handler']:.1f}ms "
+                    f"dependencies={breakdown['dependencies']:.1f}ms serialization={breakdown['serialization']:.1f}ms"
+                )
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus scrape endpoint"""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    body = "\n".join(metric.render() for metric in METRICS_REGISTRY) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/healthz", include_in_schema=False)
+async def liveness():
+    """Liveness probe; never touches Mongo, so an outage makes workers unready rather than restarted"""
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readiness():
+    """Readiness probe: 503 when Mongo does not answer a ping in time"""
+    ready, report = await db_lifecycle.readiness()
+    return JSONResponse({"status": "ready" if ready else "unavailable", **report}, status_code=200 if ready else 503)
+
+app.add_middleware(RequestMetricsMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -1303,11 +5440,75 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def warm_up_db_pool():
+    """Check Mongo connectivity and open the minimum pool before serving"""
+    warmed = await db_lifecycle.warm_up()
+    if db_lifecycle.warm_up_error:
+        logger.error(f"MongoDB warm-up failed ({warmed} connections ready): {db_lifecycle.warm_up_error}")
+    else:
+        logger.info(f"MongoDB pool warmed with {warmed} connections (max {MONGO_MAX_POOL_SIZE} per worker)")
+
+@app.on_event("startup")
+async def startup_db_indexes():
+    """Create or check database indexes on startup"""
+    if DB_INDEX_MODE == "create":
+        created = await ensure_indexes()
+        logger.info(f"Database indexes ensured: {created}")
+    elif DB_INDEX_MODE == "check":
+        report = await check_indexes()
+        for collection_name, result in report.items():
+            if result["missing"] or result["unused"]:
+                logger.warning(f"Index check for {collection_name}: {result}")
+
+@app.on_event("startup")
+async def start_view_counter():
+    """Start the periodic orchard view flush"""
+    view_counter.start()
+
+@app.on_event("startup")
+async def start_event_consumers():
+    """Start the event bus, the analytics counter flush and the analytics reconcile"""
+    event_bus.start()
+    analytics_aggregator.start()
+    analytics_reconciler.start()
+    orchard_sketch_counter.start()
+    mongo_profiler.start()
+    try:
+        await orchard_leaderboards.rebuild()
+    except Exception as e:
+        logging.error(f"Leaderboard rebuild on startup failed: {e}")
+    # Indexing a large collection takes a while; serve requests meanwhile
+    async def build_search_index():
+        try:
+            indexed = await orchard_search_index.rebuild()
+            logging.info(f"Search index built with {indexed} orchards")
+        except Exception as e:
+            logging.error(f"Search index rebuild on startup failed: {e}")
+    app.state.search_index_build = asyncio.get_running_loop().create_task(build_search_index())
+    orchard_leaderboards.start()
+    if PAYOUT_WORKER_IN_APP:
+        if PAYOUT_MODE == "batch":
+            payout_scheduler.start()
+        else:
+            payout_worker.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close database connection on shutdown"""
+    await payout_worker.stop()
+    if PAYOUT_WORKER_IN_APP and PAYOUT_MODE == "batch":
+        await payout_scheduler.stop()
+    await view_counter.stop()
+    await event_bus.stop()
+    await analytics_aggregator.stop()
+    await analytics_reconciler.stop()
+    await orchard_sketch_counter.stop()
+    await orchard_leaderboards.stop()
+    await mongo_profiler.stop()
     client.close()
+    password_executor.shutdown(wait=False)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8001)
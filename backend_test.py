@@ -4,12 +4,22 @@ Comprehensive Backend API Testing for Sow2Grow Farm Mall Platform
 Tests all API endpoints including authentication, orchards, payments, and analytics
 """
 
+import asyncio
 import requests
 import sys
 import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, Any, Optional
 
+def percentile(samples, q: float) -> float:
+    """Nearest-rank percentile, as the server reports for its own latencies"""
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
 class Sow2GrowAPITester:
     def __init__(self, base_url: str = "https://56fc527f-024c-4d38-890d-1f6b72c7876c.preview.emergentagent.com/api"):
         self.base_url = base_url
@@ -239,6 +249,50 @@ class Sow2GrowAPITester:
                      f"- ID match: {'✓' if orchard_valid else '✗'}")
         return success
 
+    def test_orchard_view_count(self):
+        """Test that buffered views show up in the orchard detail before they are flushed"""
+        if not self.created_orchard_id:
+            self.log_test("Orchard View Count", False, "- No orchard ID available")
+            return False
+
+        views = []
+        for _ in range(3):
+            success, response = self.make_request('GET', f'/orchards/{self.created_orchard_id}')
+            if not success:
+                break
+            views.append(response.get('data', {}).get('views', 0))
+
+        counted = len(views) == 3 and views[1] > views[0] and views[2] > views[1]
+        self.log_test("Orchard View Count", counted, f"- Views: {views}")
+        return counted
+
+    def test_orchard_etag(self):
+        """Test conditional GETs on the orchard detail and that an update changes the ETag"""
+        if not self.created_orchard_id:
+            self.log_test("Orchard ETag", False, "- No orchard ID available")
+            return False
+
+        url = f"{self.base_url}/orchards/{self.created_orchard_id}"
+        etag = requests.get(url, timeout=10).headers.get('ETag')
+        if not etag:
+            self.log_test("Orchard ETag", False, "- No ETag header")
+            return False
+
+        strong = etag[2:] if etag.startswith('W/') else etag
+        not_modified = all(
+            requests.get(url, headers={'If-None-Match': value}, timeout=10).status_code == 304
+            for value in (etag, strong, f'"stale", {etag}', '*')
+        )
+
+        self.make_request('PATCH', f'/orchards/{self.created_orchard_id}',
+                          {"description": "Updated by the ETag test"}, use_auth=True)
+        after_update = requests.get(url, headers={'If-None-Match': etag}, timeout=10)
+        refreshed = after_update.status_code == 200 and after_update.headers.get('ETag') != etag
+
+        self.log_test("Orchard ETag", not_modified and refreshed,
+                     f"- 304 on match: {'✓' if not_modified else '✗'}, new ETag after update: {'✓' if refreshed else '✗'}")
+        return not_modified and refreshed
+
     def test_bestow_into_orchard(self):
         """Test bestowing into orchard (selecting pockets)"""
         if not self.created_orchard_id:
@@ -263,6 +317,38 @@ class Sow2GrowAPITester:
                      f"- Pockets selected: {response.get('data', {}).get('pockets_selected', 0)}")
         return success
 
+    def test_complete_orchard_payout(self):
+        """Test that completing a funded orchard queues exactly one payout job"""
+        orchard_data = {
+            "title": "Test Payout Orchard",
+            "description": "A fully funded orchard for the payout queue test",
+            "category": "The Gift of Technology",
+            "seed_value": 300.0,
+            "pocket_price": 150.0,
+            "why_needed": "To test the payout queue",
+            "community_impact": "Will help test the platform"
+        }
+        success, response = self.make_request('POST', '/orchards', orchard_data, use_auth=True)
+        orchard_id = response.get('data', {}).get('id') if success else None
+        if not orchard_id:
+            self.log_test("Complete Orchard Payout", False, "- Could not create orchard")
+            return False
+
+        self.make_request('POST', f'/orchards/{orchard_id}/bestow',
+                          {"orchard_id": orchard_id, "quantity": 2}, use_auth=True)
+        complete_success, complete_response = self.make_request('POST', f'/orchards/{orchard_id}/complete',
+                                                                use_auth=True)
+        data = complete_response.get('data', {})
+        queued = complete_success and data.get('payout_status') == "pending" and bool(data.get('payout_job_id'))
+
+        # A second completion must not queue another payout
+        repeat_rejected, _ = self.make_request('POST', f'/orchards/{orchard_id}/complete',
+                                               expected_status=400, use_auth=True)
+
+        self.log_test("Complete Orchard Payout", queued and repeat_rejected,
+                     f"- Job queued: {'✓' if queued else '✗'}, Repeat rejected: {'✓' if repeat_rejected else '✗'}")
+        return queued and repeat_rejected
+
     def test_payment_operations(self):
         """Test payment operations"""
         # Test card payment
@@ -316,6 +402,18 @@ class Sow2GrowAPITester:
                      f"- Non-admin blocked: {'✓' if admin_check_success else '✗'}")
         return admin_check_success
 
+    def test_export_endpoints(self):
+        """Test export endpoints (requires admin role)"""
+        blocked = all(
+            self.make_request('GET', f'/admin/exports/{collection}?format=csv', use_auth=True, expected_status=403)[0]
+            for collection in ("payments", "pockets", "orchards")
+        )
+        unknown_rejected, _ = self.make_request('GET', '/admin/exports/users', use_auth=True, expected_status=422)
+
+        self.log_test("Export Access Control", blocked and unknown_rejected,
+                     f"- Non-admin blocked: {'✓' if blocked else '✗'}, Unknown collection rejected: {'✓' if unknown_rejected else '✗'}")
+        return blocked and unknown_rejected
+
     def run_all_tests(self):
         """Run all API tests"""
         print("\n🚀 Starting comprehensive API testing...\n")
@@ -331,9 +429,13 @@ class Sow2GrowAPITester:
             ("Create Orchard", self.test_create_orchard),
             ("Get Orchards List", self.test_get_orchards),
             ("Get Specific Orchard", self.test_get_specific_orchard),
+            ("Orchard View Count", self.test_orchard_view_count),
+            ("Orchard ETag", self.test_orchard_etag),
             ("Bestow Into Orchard", self.test_bestow_into_orchard),
+            ("Complete Orchard Payout", self.test_complete_orchard_payout),
             ("Payment Operations", self.test_payment_operations),
             ("Analytics Access Control", self.test_analytics_endpoints),
+            ("Export Access Control", self.test_export_endpoints),
         ]
         
         for test_name, test_func in tests:
@@ -357,8 +459,425 @@ class Sow2GrowAPITester:
             print("⚠️  Some tests failed. Check the details above.")
             return 1
 
+class Sow2GrowAPIBenchmark(Sow2GrowAPITester):
+    """Load benchmarks run with `python backend_test.py --bench`"""
+
+    def create_bench_orchard(self, seed_value: float, pocket_price: float = 150.0, **fields) -> Optional[str]:
+        """Create an orchard owned by the benchmark user; `fields` override the defaults"""
+        orchard_data = {
+            "title": "Benchmark Orchard",
+            "description": "Orchard created by the load benchmark",
+            "category": "The Gift of Technology",
+            "seed_value": seed_value,
+            "pocket_price": pocket_price,
+            "why_needed": "Load testing",
+            "community_impact": "Load testing",
+            **fields
+        }
+        success, response = self.make_request('POST', '/orchards', orchard_data, use_auth=True)
+        return response.get('data', {}).get('id') if success else None
+
+    def bench_concurrent_bestowals(self, total_pockets: int = 100, requests_count: int = 300, workers: int = 50):
+        """Fire concurrent bestowals at one orchard and verify no pocket is sold twice"""
+        orchard_id = self.create_bench_orchard(seed_value=total_pockets * 150.0)
+        if not orchard_id:
+            self.log_test("Concurrent Bestowals", False, "- Could not create orchard")
+            return False
+
+        def bestow(_):
+            pocket_numbers = random.sample(range(1, total_pockets + 1), random.randint(1, 3))
+            started = time.perf_counter()
+            success, _ = self.make_request('POST', f'/orchards/{orchard_id}/bestow',
+                                           {"orchard_id": orchard_id, "pocket_numbers": pocket_numbers},
+                                           use_auth=True)
+            return success, len(pocket_numbers), time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(bestow, range(requests_count)))
+        elapsed = time.perf_counter() - started
+
+        sold = sum(count for success, count, _ in results if success)
+        latencies = [latency for _, _, latency in results]
+        success, response = self.make_request('GET', f'/orchards/{orchard_id}?include_pockets=true')
+        orchard = response.get('data', {})
+        pocket_numbers = [p['pocket_number'] for p in orchard.get('pockets', [])]
+
+        no_oversell = (
+            success
+            and len(pocket_numbers) == len(set(pocket_numbers))
+            and orchard.get('filled_pockets') == sold == len(pocket_numbers)
+            and sold <= total_pockets
+        )
+        self.log_test("Concurrent Bestowals", no_oversell,
+                     f"- {requests_count} requests in {elapsed:.2f}s, sold {sold}/{total_pockets}, "
+                     f"filled_pockets={orchard.get('filled_pockets')}, "
+                     f"p50={percentile(latencies, 0.5) * 1000:.0f}ms, "
+                     f"p99={percentile(latencies, 0.99) * 1000:.0f}ms")
+        return no_oversell
+
+    def bench_login_storm(self, logins: int = 200, workers: int = 50, probes: int = 100):
+        """Measure latency of an unrelated endpoint while a burst of logins is hashed"""
+        def probe_latencies():
+            latencies = []
+            for _ in range(probes):
+                started = time.perf_counter()
+                self.make_request('GET', '/')
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        baseline = probe_latencies()
+
+        def login(_):
+            url = f"{self.base_url}/auth/login"
+            response = requests.post(url, json={"email": self.test_user_email, "password": self.test_password},
+                                     timeout=30)
+            return response.status_code
+
+        with ThreadPoolExecutor(max_workers=workers + 1) as pool:
+            storm = pool.map(login, range(logins))
+            during = pool.submit(probe_latencies).result()
+            statuses = list(storm)
+
+        def pct(latencies, q):
+            return percentile(latencies, q) * 1000
+
+        shed = sum(1 for status in statuses if status in (429, 503))
+        ok = sum(1 for status in statuses if status == 200)
+        success = ok + shed == logins
+        self.log_test("Login Storm Event Loop Latency", success,
+                     f"- GET / p50/p99 idle {pct(baseline, 0.5):.0f}/{pct(baseline, 0.99):.0f}ms, "
+                     f"during storm {pct(during, 0.5):.0f}/{pct(during, 0.99):.0f}ms; "
+                     f"logins ok={ok}, shed={shed}")
+        return success
+
+    def timed_get(self, endpoint: str, repeats: int = 20) -> tuple:
+        """Median latency in ms of a GET plus the last response"""
+        latencies = []
+        response = {}
+        for _ in range(repeats):
+            started = time.perf_counter()
+            _, response = self.make_request('GET', endpoint)
+            latencies.append(time.perf_counter() - started)
+        return percentile(latencies, 0.5) * 1000, response
+
+    def bench_orchard_pagination(self, page_size: int = 10, deep_page: int = 500, workers: int = 50):
+        """Compare page 1 vs a deep page for offset and cursor pagination"""
+        needed = page_size * deep_page
+        _, response = self.make_request('GET', f'/orchards?limit=100&offset={needed - 1}')
+        if not response.get('data'):
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(lambda _: self.create_bench_orchard(seed_value=1500.0), range(needed)))
+
+        offset_first, _ = self.timed_get(f'/orchards?limit={page_size}')
+        offset_deep, _ = self.timed_get(f'/orchards?limit={page_size}&offset={page_size * (deep_page - 1)}')
+
+        cursor_first, response = self.timed_get(f'/orchards?limit={page_size}')
+        cursor = response.get('next_cursor')
+        for _ in range(deep_page - 2):
+            _, response = self.make_request('GET', f'/orchards?limit={page_size}&cursor={cursor}')
+            cursor = response.get('next_cursor')
+        cursor_deep, response = self.timed_get(f'/orchards?limit={page_size}&cursor={cursor}')
+
+        success = cursor is not None and len(response.get('data', [])) == page_size
+        self.log_test("Orchard Pagination", success,
+                     f"- offset page 1 {offset_first:.1f}ms, page {deep_page} {offset_deep:.1f}ms; "
+                     f"cursor page 1 {cursor_first:.1f}ms, page {deep_page} {cursor_deep:.1f}ms")
+        return success
+
+    def bench_idempotent_payments(self, parallel: int = 50):
+        """Fire identical Idempotency-Keys in parallel and verify a single payment is made"""
+        idempotency_key = f"bench-{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        payment_data = {
+            "payment_type": "free_will_gifting",
+            "amount": 25.0,
+            "currency": "USD",
+            "method": "card",
+            "description": "Idempotency benchmark"
+        }
+
+        def pay(_):
+            response = requests.post(f"{self.base_url}/payments/card", json=payment_data, timeout=30, headers={
+                'Authorization': f'Bearer {self.access_token}',
+                'Idempotency-Key': idempotency_key
+            })
+            payment_id = response.json().get('data', {}).get('payment_id') if response.status_code == 200 else None
+            return response.status_code, payment_id
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            results = list(pool.map(pay, range(parallel)))
+        elapsed = time.perf_counter() - started
+
+        payment_ids = {payment_id for status, payment_id in results if status == 200}
+        in_progress = sum(1 for status, _ in results if status == 409)
+        success = len(payment_ids) == 1 and all(status in (200, 409) for status, _ in results)
+
+        # A later retry must replay the same payment
+        status, replayed_id = pay(None)
+        success = success and status == 200 and replayed_id in payment_ids
+        self.log_test("Idempotent Payments", success,
+                     f"- {parallel} parallel requests in {elapsed:.2f}s, distinct payments={len(payment_ids)}, "
+                     f"in-progress rejections={in_progress}, replay {'✓' if replayed_id in payment_ids else '✗'}")
+        return success
+
+    def bench_leaderboards(self, limit: int = 10):
+        """Compare materialized leaderboards with sorting the orchard listing per request"""
+        category = "The Gift of Technology"
+        sorted_views, _ = self.timed_get(f'/orchards?sort=views&category={category}&view=card&limit={limit}')
+        board_views, views_response = self.timed_get(f'/leaderboards/most_viewed?category={category}&limit={limit}')
+        sorted_completion, _ = self.timed_get(f'/orchards?sort=completion_rate&status=active&view=card&limit={limit}')
+        board_completion, _ = self.timed_get(f'/leaderboards/nearly_complete?limit={limit}')
+        board_trending, _ = self.timed_get(f'/leaderboards/trending?limit={limit}')
+
+        success = views_response.get('success', False)
+        self.log_test("Leaderboards", success,
+                     f"- most viewed: sort {sorted_views:.1f}ms vs board {board_views:.1f}ms; "
+                     f"nearly complete: sort {sorted_completion:.1f}ms vs board {board_completion:.1f}ms; "
+                     f"trending board {board_trending:.1f}ms")
+        return success
+
+    def bench_search(self, orchards: int = 100000, repeats: int = 200, target_ms: float = 50.0,
+                     workers: int = 50, seed: int = 11):
+        """p95 latency of ranked, faceted orchard search over a large catalogue.
+
+        Seeds up to `orchards` benchmark orchards (reusing any from earlier runs).
+        Their titles and descriptions vary in length and draw words from a
+        Zipf-weighted vocabulary, as real listings do, so the queries match
+        anything from a few thousand to most of the catalogue. Fails if p95 is not
+        under `target_ms`.
+        """
+        words = ("water solar school community garden seeds farm equipment tractor pump irrigation greenhouse "
+                 "harvest market kitchen tools family children village women youth training food bakery poultry "
+                 "chickens goats cattle dairy fence borehole tank well roof classroom books laptops internet clinic "
+                 "medicine bicycle truck van trailer storage cold room fridge freezer sewing machine fabric workshop "
+                 "welding carpentry timber bricks cement panels battery inverter lights energy wind fish pond nets "
+                 "boat honey bees orchard trees fruit mango avocado maize beans vegetables compost fertilizer soil "
+                 "tiller plough mill grain flour oven").split()
+        rng = random.Random(seed)
+        rng.shuffle(words)
+        frequency = [1 / rank for rank in range(1, len(words) + 1)]
+        categories = ["The Gift of Technology", "The Gift of Tools", "The Gift of Energy",
+                      "The Gift of Nourishment", "The Gift of Vehicles"]
+        _, response = self.make_request('GET', '/orchards/search?q=benchmark&limit=1')
+        existing = response.get('data', {}).get('total', 0)
+        if existing < orchards:
+            specs = [(" ".join(rng.choices(words, frequency, k=rng.randint(2, 5))),
+                      " ".join(rng.choices(words, frequency, k=rng.randint(8, 40))),
+                      rng.choice(categories))
+                     for _ in range(orchards - existing)]
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(lambda spec: self.create_bench_orchard(
+                    seed_value=1500.0, title=f"Benchmark {spec[0]}",
+                    description=f"Benchmark orchard for {spec[1]}", category=spec[2]
+                ), specs))
+            # The index is updated from orchard events, off the request path
+            for _ in range(60):
+                _, response = self.make_request('GET', '/orchards/search?q=benchmark&limit=1')
+                if response.get('data', {}).get('total', 0) >= orchards:
+                    break
+                time.sleep(1)
+        indexed = response.get('data', {}).get('total', 0)
+
+        queries = ["water", "solar school", "community garden seeds", "farm equipment",
+                   "greenhouse&category=The Gift of Energy", "harvest market&status=active"]
+        latencies = []
+        data = {}
+        for i in range(repeats):
+            started = time.perf_counter()
+            _, response = self.make_request('GET', f'/orchards/search?q={queries[i % len(queries)]}&limit=20')
+            latencies.append(time.perf_counter() - started)
+            data = response.get('data', {})
+        p95 = percentile(latencies, 0.95) * 1000
+
+        success = 'facets' in data and indexed >= orchards and p95 < target_ms
+        self.log_test("Orchard Search", success,
+                     f"- {indexed} benchmark orchards indexed; p50 {percentile(latencies, 0.5) * 1000:.1f}ms, "
+                     f"p95 {p95:.1f}ms (target < {target_ms:.0f}ms), last query matched {data.get('total', 0)} orchards")
+        return success
+
+    def bench_write_endpoints(self, repeats: int = 30):
+        """Median latency of the profile, PayPal and orchard update endpoints.
+
+        Run against builds before and after a change to compare them.
+        """
+        paypal_data = {
+            "email": "bench.paypal@example.com",
+            "account_type": "personal",
+            "country": "US",
+            "currency": "USD"
+        }
+        self.make_request('POST', '/users/paypal-account', paypal_data, use_auth=True)
+        orchard_id = self.create_bench_orchard(seed_value=1500.0)
+
+        writes = [
+            ("profile", 'PATCH', '/users/me', lambda i: {"location": f"Bench City {i}"}),
+            ("paypal", 'PUT', '/users/paypal-account', lambda i: {**paypal_data, "first_name": f"Bench{i}"}),
+            ("orchard", 'PATCH', f'/orchards/{orchard_id}', lambda i: {"title": f"Benchmark Orchard {i}"}),
+        ]
+        results = []
+        success = orchard_id is not None
+        for name, method, endpoint, payload in writes:
+            latencies = []
+            for i in range(repeats):
+                started = time.perf_counter()
+                ok, response = self.make_request(method, endpoint, payload(i), use_auth=True)
+                latencies.append(time.perf_counter() - started)
+                success = success and ok and response.get('success', False)
+            results.append(f"{name} {percentile(latencies, 0.5) * 1000:.1f}ms")
+
+        # The returned document must reflect the write that produced it
+        _, response = self.make_request('PATCH', f'/orchards/{orchard_id}', {"title": "Read Your Write"}, use_auth=True)
+        success = success and response.get('data', {}).get('title') == "Read Your Write"
+        self.log_test("Write Endpoints", success, f"- median {', '.join(results)}")
+        return success
+
+    def bench_response_serialization(self, page_size: int = 100, pockets: int = 2000, repeats: int = 30):
+        """Median latency and size of a full listing page and of a large orchard detail with its pockets.
+
+        Run against the server with FAST_JSON_RESPONSES on and off to compare.
+        """
+        _, response = self.make_request('GET', f'/orchards?limit={page_size}')
+        missing = page_size - len(response.get('data', []))
+        if missing > 0:
+            with ThreadPoolExecutor(max_workers=20) as pool:
+                list(pool.map(lambda _: self.create_bench_orchard(seed_value=1500.0), range(missing)))
+
+        orchard_id = self.create_bench_orchard(seed_value=pockets * 150.0)
+        if not orchard_id:
+            self.log_test("Response Serialization", False, "- Could not create orchard")
+            return False
+        for filled in range(0, pockets, 500):
+            self.make_request('POST', f'/orchards/{orchard_id}/bestow',
+                              {"orchard_id": orchard_id, "quantity": min(500, pockets - filled)}, use_auth=True)
+
+        listing_ms, listing = self.timed_get(f'/orchards?limit={page_size}', repeats)
+        detail_ms, detail = self.timed_get(f'/orchards/{orchard_id}?include_pockets=true', repeats)
+        listing_bytes = len(json.dumps(listing))
+        detail_bytes = len(json.dumps(detail))
+
+        success = (len(listing.get('data', [])) == page_size
+                   and len(detail.get('data', {}).get('pockets', [])) == pockets)
+        self.log_test("Response Serialization", success,
+                     f"- GET /orchards?limit={page_size} {listing_ms:.1f}ms ({listing_bytes // 1024} KB), "
+                     f"detail with {pockets} pockets {detail_ms:.1f}ms ({detail_bytes // 1024} KB)")
+        return success
+
+    def bench_payout_batching(self, growers: int = 2000, days: int = 30, max_items: int = 15000, seed: int = 7):
+        """PayPal API calls and fees for per-orchard payouts vs daily per-grower batches.
+
+        Runs in-process against mongomock: seeds the growers' PayPal accounts, queues
+        each day's completed orchards, and drives the real PayoutWorker (one payout
+        per orchard) or PayoutBatchScheduler (one tick per day) against a
+        PayPalPayoutStub. Settled jobs are cleared at the end of each day to keep
+        mongomock's collection scans short.
+        """
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            self.log_test("Payout Batching", False, "- needs mongomock-motor (pip install mongomock-motor)")
+            return False
+        sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+        import server
+
+        rng = random.Random(seed)
+        accounts = [
+            server.PayPalAccount(user_id=f"grower-{i}", email=f"grower{i}@example.com",
+                                 auto_payouts=rng.random() < 0.9,
+                                 minimum_payout=rng.choice([50.0, 100.0, 250.0, 500.0])).dict()
+            for i in range(growers)
+        ]
+        # Each grower completes a few orchards over the period
+        completions = [
+            (rng.randrange(days), account["user_id"], round(rng.uniform(10.0, 400.0), 2))
+            for account in accounts for _ in range(rng.randint(1, 6))
+        ]
+
+        async def simulate(mode):
+            db = AsyncMongoMockClient()[f"bench_payouts_{mode}"]
+            stub = server.PayPalPayoutStub(latency_seconds=0)
+            worker = server.PayoutWorker({"paypal": stub}, {"paypal": 1})
+            scheduler = server.PayoutBatchScheduler("paypal", server.PAYOUT_BATCH_INTERVAL_SECONDS, max_items)
+            server.db, server.PAYOUT_PROVIDERS["paypal"] = db, stub
+            await db.paypal_accounts.insert_many([dict(account) for account in accounts])
+
+            paid = 0.0
+            settled = [server.PayoutJobStatus.SUCCEEDED.value]
+            if mode == "single":
+                # Accounts never change here, so a job the worker holds stays held
+                settled.append(server.PayoutJobStatus.HELD.value)
+            for day in range(days):
+                jobs = [
+                    server.PayoutJob(orchard_id=f"orchard-{n}", user_id=user_id, amount=amount).dict()
+                    for n, (completed_on, user_id, amount) in enumerate(completions) if completed_on == day
+                ]
+                if jobs:
+                    await db.payout_jobs.insert_many(jobs)
+                if mode == "batch":
+                    await scheduler.flush()
+                else:
+                    while (job_doc := await worker.lease("paypal")) is not None:
+                        await worker.run_job(server.PayoutJob(**job_doc))
+                async for job in db.payout_jobs.find({"status": server.PayoutJobStatus.SUCCEEDED.value}):
+                    paid += job["amount"]
+                await db.payout_jobs.delete_many({"status": {"$in": settled}})
+            held = [job["amount"] async for job in db.payout_jobs.find({"status": server.PayoutJobStatus.HELD.value})]
+            return {"calls": stub.calls, "items": stub.items, "fees": stub.fees, "paid": paid, "held": sum(held)}
+
+        async def run():
+            original = server.db, server.PAYOUT_PROVIDERS["paypal"]
+            try:
+                return await simulate("single"), await simulate("batch")
+            finally:
+                server.db, server.PAYOUT_PROVIDERS["paypal"] = original
+
+        started = time.perf_counter()
+        single, batched = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+
+        # Fewer API calls, and less in fees per dollar paid out
+        success = (batched["calls"] < single["calls"] and batched["paid"] > 0
+                   and batched["fees"] / batched["paid"] < single["fees"] / single["paid"])
+        self.log_test("Payout Batching", success,
+                     f"- {growers} growers, {len(completions)} orchards over {days} days in {elapsed:.1f}s; "
+                     f"per orchard {single['calls']} calls, {single['items']} items, ${single['fees']:.2f} fees "
+                     f"on ${single['paid']:.2f} paid; batched {batched['calls']} calls, {batched['items']} items, "
+                     f"${batched['fees']:.2f} fees on ${batched['paid']:.2f} paid, ${batched['held']:.2f} still held")
+        return success
+
+    def run_all_benchmarks(self):
+        """Run all load benchmarks"""
+        print("\n🏋️  Starting load benchmarks...\n")
+        if not self.test_user_registration():
+            return 1
+
+        benchmarks = [
+            ("Concurrent Bestowals", self.bench_concurrent_bestowals),
+            ("Login Storm", self.bench_login_storm),
+            ("Orchard Pagination", self.bench_orchard_pagination),
+            ("Idempotent Payments", self.bench_idempotent_payments),
+            ("Leaderboards", self.bench_leaderboards),
+            ("Orchard Search", self.bench_search),
+            ("Write Endpoints", self.bench_write_endpoints),
+            ("Response Serialization", self.bench_response_serialization),
+            ("Payout Batching", self.bench_payout_batching),
+        ]
+
+        for bench_name, bench_func in benchmarks:
+            try:
+                bench_func()
+            except Exception as e:
+                self.log_test(bench_name, False, f"- Exception: {str(e)}")
+            print()
+
+        print("=" * 60)
+        print(f"📊 BENCHMARKS: {self.tests_passed}/{self.tests_run} checks passed")
+        return 0 if self.tests_passed == self.tests_run else 1
+
 def main():
     """Main function to run the API tests"""
+    if "--bench" in sys.argv:
+        return Sow2GrowAPIBenchmark().run_all_benchmarks()
     tester = Sow2GrowAPITester()
     return tester.run_all_tests()
 
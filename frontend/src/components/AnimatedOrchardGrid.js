@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react"
+import React, { useState, useEffect, useMemo } from "react"
 import { cn, getGrowthStage, getGrowthStageColor } from "../lib/utils"
 import { Sprout, Sparkles, Heart, Star } from "lucide-react"
 
@@ -67,7 +67,7 @@ export function AnimatedOrchardGrid({
   // Sparkling effect for mature pockets
   useEffect(() => {
     const maturePockets = takenPockets.filter(pocket => 
-      getGrowthStage(pocket.daysGrowing) === "mature"
+      pocket.daysGrowing !== undefined && getGrowthStage(pocket.daysGrowing) === "mature"
     )
     
     if (maturePockets.length > 0) {
@@ -88,8 +88,13 @@ export function AnimatedOrchardGrid({
     }
   }, [takenPockets])
   
+  const takenByNumber = useMemo(
+    () => new Map(takenPockets.map(pocket => [pocket.number, pocket])),
+    [takenPockets]
+  )
+  
   const getPocketStatus = (pocketNumber) => {
-    const takenPocket = takenPockets.find(p => p.number === pocketNumber)
+    const takenPocket = takenByNumber.get(pocketNumber)
     const isSelected = selectedPockets.includes(pocketNumber)
     const isAnimating = animatingPockets.has(pocketNumber)
     const isSparkling = sparklingPockets.has(pocketNumber)
@@ -100,7 +105,8 @@ export function AnimatedOrchardGrid({
       isAnimating,
       isSparkling,
       takenPocket,
-      growthStage: takenPocket ? getGrowthStage(takenPocket.daysGrowing) : null,
+      // Pockets known only from the occupancy bitmap have no growth details
+      growthStage: takenPocket && takenPocket.daysGrowing !== undefined ? getGrowthStage(takenPocket.daysGrowing) : null,
     }
   }
   
@@ -166,7 +172,9 @@ export function AnimatedOrchardGrid({
   }
   
   const getPocketTooltip = (pocketNumber, status) => {
-    if (status.isTaken) {
+    if (status.isTaken && !status.growthStage) {
+      return `Pocket ${pocketNumber} - Taken`
+    } else if (status.isTaken) {
       return `Pocket ${pocketNumber} - ${status.takenPocket.bestower} - ${status.takenPocket.daysGrowing} days growing (${status.growthStage})`
     } else if (status.isSelected) {
       return `Pocket ${pocketNumber} - Selected (R${pocketPrice})`
@@ -22,8 +22,9 @@ export function useApi() {
       return response.data
     },
     
-    getOrchard: async (id) => {
+    getOrchard: async (id, { includePockets = false } = {}) => {
       const response = await axios.get(`${API}/orchards/${id}`, {
+        params: { include_pockets: includePockets },
         headers: createAuthHeaders()
       })
       return response.data
@@ -60,6 +61,16 @@ export function useApi() {
       return response.data
     },
     
+    bestowBasket: async (items, atomic = false) => {
+      const response = await axios.post(`${API}/bestowals/basket`, {
+        items,
+        atomic
+      }, {
+        headers: createAuthHeaders()
+      })
+      return response.data
+    },
+    
     completeOrchard: async (id) => {
       const response = await axios.post(`${API}/orchards/${id}/complete`, {}, {
         headers: createAuthHeaders()
@@ -77,6 +77,31 @@ export function generatePocketGrid(totalPockets, pocketsPerRow = 10) {
   return grid
 }
 
+// Decode the base64 `pocket_bitmap` from the orchard detail response into a
+// Set of taken pocket numbers (pocket n is bit (n - 1) % 8 of byte (n - 1) / 8)
+export function decodePocketBitmap(encoded, totalPockets) {
+  const taken = new Set()
+  if (!encoded) return taken
+  const bytes = atob(encoded)
+  for (let pocket = 1; pocket <= totalPockets; pocket++) {
+    const index = pocket - 1
+    if (bytes.charCodeAt(index >> 3) & (1 << (index & 7))) {
+      taken.add(pocket)
+    }
+  }
+  return taken
+}
+
+// Taken pockets for the orchard grid: occupancy from `pocket_bitmap`, with the
+// bestower and growth details of any pockets loaded separately
+export function takenPocketsFromBitmap(orchard, detailedPockets = []) {
+  if (!orchard.pocket_bitmap) return detailedPockets
+  const details = new Map(detailedPockets.map(pocket => [pocket.number, pocket]))
+  return [...decodePocketBitmap(orchard.pocket_bitmap, orchard.total_pockets)].map(
+    number => details.get(number) || { number }
+  )
+}
+
 export function validateEmail(email) {
   const emailRegex = /^[^\s@]+@[^\s@]+\.[^\s@]+$/
   return emailRegex.test(email)
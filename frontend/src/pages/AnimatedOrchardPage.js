@@ -7,6 +7,7 @@ import { Button } from "../components/ui/button"
 import { Card, CardContent, CardHeader, CardTitle } from "../components/ui/card"
 import { Badge } from "../components/ui/badge"
 import { AnimatedOrchardGrid } from "../components/AnimatedOrchardGrid"
+import { takenPocketsFromBitmap } from "../lib/utils"
 import { 
   ArrowLeft, 
   Sprout, 
@@ -94,10 +95,11 @@ export default function AnimatedOrchardPage() {
       setLoading(true)
       try {
         // In production: const result = await api.getOrchard(id)
+        // and setTakenPockets(takenPocketsFromBitmap(result.data))
         // For now, simulate API call
         setTimeout(() => {
           setOrchard(mockOrchard)
-          setTakenPockets(mockTakenPockets)
+          setTakenPockets(takenPocketsFromBitmap(mockOrchard, mockTakenPockets))
           setLoading(false)
         }, 1000)
       } catch (error) {
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# server.py is a top-level module in backend/ and reads its settings from backend/.env
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+from server import (
+    AnalyticsReconciler,
+    GiftCategory,
+    Orchard,
+    OrchardStatus,
+    generate_performance_analytics,
+    generate_specific_analytics,
+    start_of_day,
+)
+
+
+def run(monkeypatch, scenario):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def with_database():
+        db = mongomock_motor.AsyncMongoMockClient()["analytics_rollup_test"]
+        monkeypatch.setattr(server, "db", db)
+        monkeypatch.setattr(server, "analytics_aggregator", server.AnalyticsAggregator(60))
+        for name in ("analytics", "analytics_daily"):
+            await db[name].create_indexes(server.INDEX_REGISTRY[name])
+        return await scenario(db)
+
+    return asyncio.run(with_database())
+
+
+def orchard(category: GiftCategory, created_at: datetime, status: OrchardStatus = OrchardStatus.ACTIVE) -> dict:
+    doc = Orchard(
+        user_id="grower-1", title="Tractor", description="A tractor", category=category, seed_value=1500.0,
+        pocket_price=150.0, total_pockets=10, why_needed="Planting", community_impact="Food",
+        status=status, created_at=created_at, updated_at=created_at + timedelta(days=4)
+    ).dict()
+    return {**doc, "category": category.value, "status": status.value}
+
+
+async def seed(db) -> datetime:
+    today = start_of_day(datetime.utcnow())
+    earlier = today - timedelta(days=6)
+    vehicle = orchard(GiftCategory.VEHICLES, earlier, OrchardStatus.COMPLETED)
+    tools = orchard(GiftCategory.TOOLS, earlier + timedelta(hours=3))
+    await db.orchards.insert_many([vehicle, tools])
+    await db.pockets.insert_many([
+        {"id": f"p{n}", "orchard_id": vehicle["id"], "pocket_number": n, "user_id": f"u{n % 2}",
+         "amount": 150.0, "created_at": earlier + timedelta(hours=1)}
+        for n in range(1, 5)
+    ])
+    return earlier
+
+
+def test_reconcile_rolls_up_every_day_into_the_analytics_collection(monkeypatch):
+    async def scenario(db):
+        earlier = await seed(db)
+        await AnalyticsReconciler(60).flush()
+        day_row = await db.analytics.find_one({"date": earlier, "category": GiftCategory.VEHICLES.value})
+        overall = await db.analytics.find_one({"date": earlier, "category": None})
+        days = await db.analytics.distinct("date", {"category": None})
+        specific = await generate_specific_analytics(GiftCategory.VEHICLES.value, None, None)
+        return day_row, overall, len(days), specific
+
+    day_row, overall, days, specific = run(monkeypatch, scenario)
+    assert days == 7
+    assert day_row["new_orchards"] == 1
+    assert day_row["total_bestowed"] == 600.0
+    assert day_row["unique_bestowers"] == 2
+    assert overall["total_orchards"] == 2
+    assert specific["completed_orchards"] == 1
+    assert specific["total_bestowed"] == 600.0
+    assert specific["average_completion_time"] == 4
+
+
+def test_reports_read_rollups_not_counters(monkeypatch):
+    async def scenario(db):
+        await seed(db)
+        await AnalyticsReconciler(60).flush()
+        # Counters that drifted, e.g. from events lost in a crash, do not move the reports
+        await db.analytics_daily.update_many({}, {"$inc": {"total_bestowed": 1000, "new_orchards": 5}})
+        return await generate_performance_analytics()
+
+    performance = run(monkeypatch, scenario)
+    by_category = {row["category"]: row for row in performance}
+    assert by_category[GiftCategory.VEHICLES.value]["lifetime_bestowed"] == 600.0
+    assert by_category[GiftCategory.TOOLS.value]["lifetime_orchards"] == 1
+
+
+def test_reconcile_repairs_drifted_counters(monkeypatch):
+    async def scenario(db):
+        earlier = await seed(db)
+        await db.analytics_daily.insert_one({"date": earlier, "category": GiftCategory.VEHICLES.value, "new_orchards": 9, "total_bestowed": 1.0})
+        await AnalyticsReconciler(60).flush()
+        return await db.analytics_daily.find_one({"date": earlier, "category": GiftCategory.VEHICLES.value})
+
+    row = run(monkeypatch, scenario)
+    assert row["new_orchards"] == 1
+    assert row["total_bestowed"] == 600.0
+    assert row["total_bestowals"] == 2
@@ -0,0 +1,118 @@
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+from server import ExportCollection, ExportFormat, GiftCategory, build_export_filter, stream_export
+
+
+class FailingCursor:
+    """Aggregation cursor that returns `rows` documents and then loses its connection"""
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.rows == 0:
+            raise ConnectionError("connection reset")
+        self.rows -= 1
+        return {"id": f"pocket-{self.rows}", "pocket_number": self.rows}
+
+    async def close(self):
+        self.closed = True
+
+
+class FailingCollection:
+    def __init__(self, cursor: FailingCursor):
+        self.cursor = cursor
+
+    def aggregate(self, pipeline, **kwargs):
+        return self.cursor
+
+
+async def collect(stream) -> str:
+    return "".join([chunk async for chunk in stream])
+
+
+def test_failure_mid_stream_is_raised_without_a_final_chunk(monkeypatch):
+    cursor = FailingCursor(rows=5)
+    monkeypatch.setattr(server, "db", {"pockets": FailingCollection(cursor)})
+    monkeypatch.setattr(server, "EXPORT_BATCH_SIZE", 2)
+    chunks = []
+
+    async def scenario():
+        async for chunk in stream_export(ExportCollection.POCKETS, {}, ExportFormat.NDJSON):
+            chunks.append(chunk)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(scenario())
+
+    # Two full batches went out; the fifth row never does and the cursor is released
+    assert [len(chunk.splitlines()) for chunk in chunks] == [2, 2]
+    assert cursor.closed
+
+
+def run(monkeypatch, scenario):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def with_database():
+        db = mongomock_motor.AsyncMongoMockClient()["export_test"]
+        monkeypatch.setattr(server, "db", db)
+        return await scenario(db)
+
+    return asyncio.run(with_database())
+
+
+async def seed(db):
+    start = datetime(2026, 1, 1)
+    await db.orchards.insert_many([
+        {"id": "art", "category": GiftCategory.ART.value, "created_at": start},
+        {"id": "tech", "category": GiftCategory.TECHNOLOGY.value, "created_at": start},
+    ])
+    await db.pockets.insert_many([
+        {"id": f"p{i}", "orchard_id": "art" if i % 2 else "tech", "pocket_number": i,
+         "created_at": start + timedelta(minutes=i // 2)}
+        for i in range(6)
+    ])
+
+
+def test_category_applies_to_pockets_through_their_orchard(monkeypatch):
+    async def scenario(db):
+        await seed(db)
+        query = await build_export_filter(ExportCollection.POCKETS, None, None, GiftCategory.ART, None)
+        assert query == {}
+        body = await collect(stream_export(ExportCollection.POCKETS, query, ExportFormat.NDJSON, GiftCategory.ART))
+        return [json.loads(line) for line in body.splitlines()]
+
+    rows = run(monkeypatch, scenario)
+    assert [row["id"] for row in rows] == ["p1", "p3", "p5"]
+    assert set(rows[0]) == set(server.EXPORT_FIELDS[ExportCollection.POCKETS])
+
+
+def test_resume_after_continues_past_rows_sharing_a_timestamp(monkeypatch):
+    async def scenario(db):
+        await seed(db)
+        query = await build_export_filter(ExportCollection.POCKETS, None, None, None, "p2")
+        return await collect(stream_export(ExportCollection.POCKETS, query, ExportFormat.CSV))
+
+    rows = list(csv.reader(io.StringIO(run(monkeypatch, scenario))))
+    assert rows[0] == server.EXPORT_FIELDS[ExportCollection.POCKETS]
+    assert [row[0] for row in rows[1:]] == ["p3", "p4", "p5"]
+
+
+def test_unknown_resume_id_is_rejected(monkeypatch):
+    async def scenario(db):
+        await seed(db)
+        with pytest.raises(server.HTTPException) as error:
+            await build_export_filter(ExportCollection.POCKETS, None, None, None, "missing")
+        return error.value.status_code
+
+    assert run(monkeypatch, scenario) == 400
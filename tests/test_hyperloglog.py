@@ -0,0 +1,65 @@
+import pytest
+
+from server import HLL_PRECISION, HyperLogLog
+
+
+def sketch_of(values) -> HyperLogLog:
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def ids(start: int, stop: int):
+    return [f"user-{i}" for i in range(start, stop)]
+
+
+def relative_error(estimate: int, actual: int) -> float:
+    return abs(estimate - actual) / actual
+
+
+def test_precision_gives_sub_percent_standard_error():
+    assert 1.04 / (1 << HLL_PRECISION) ** 0.5 < 0.01
+
+
+def test_small_counts_are_exact():
+    assert sketch_of([]).count() == 0
+    assert sketch_of(ids(0, 1)).count() == 1
+    assert sketch_of(ids(0, 100)).count() == 100
+
+
+@pytest.mark.parametrize("actual", [1000, 10000, 30000, 40000, 50000, 100000, 250000])
+def test_count_within_two_percent(actual):
+    # 40000 sits where the classic estimator switches from linear counting and overshot by 2.5%
+    assert relative_error(sketch_of(ids(0, actual)).count(), actual) < 0.02
+
+
+def test_duplicates_do_not_change_the_estimate():
+    once = sketch_of(ids(0, 5000))
+    repeated = sketch_of(ids(0, 5000) * 3)
+    assert once.to_bytes() == repeated.to_bytes()
+
+
+def test_merge_equals_the_sketch_of_the_union():
+    left = sketch_of(ids(0, 15000))
+    right = sketch_of(ids(10000, 25000))
+    union = sketch_of(ids(0, 25000))
+
+    merged = HyperLogLog(left.to_bytes()).merge(right)
+
+    assert merged.to_bytes() == union.to_bytes()
+    assert relative_error(merged.count(), 25000) < 0.02
+
+
+def test_merge_of_many_daily_sketches_counts_each_member_once():
+    total = HyperLogLog()
+    for day in range(30):
+        total.merge(sketch_of(ids(day * 500, day * 500 + 2000)))
+    # 30 overlapping windows cover ids 0..16500
+    assert relative_error(total.count(), 16500) < 0.02
+
+
+def test_registers_round_trip_through_bytes():
+    sketch = sketch_of(ids(0, 1000))
+    assert len(sketch.to_bytes()) == 1 << HLL_PRECISION
+    assert HyperLogLog(sketch.to_bytes()).count() == sketch.count()
@@ -0,0 +1,107 @@
+import asyncio
+import uuid
+
+from server import InProcessCacheBackend, OrchardDetailCache, TTLCache, etag_matches, invalidation_channel
+
+
+def make_cache(shared=True) -> OrchardDetailCache:
+    # A fresh cache name keeps this cache's channel subscription away from the app's own
+    local = TTLCache(f"orchard_detail_test_{uuid.uuid4().hex[:8]}", 100, 60)
+    invalidation_channel.subscribe(local.name, local.invalidate)
+    return OrchardDetailCache(local, InProcessCacheBackend() if shared else None)
+
+
+def test_etag_matches_exact_weak_and_lists():
+    etag = 'W/"abc"'
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"old", W/"abc"', etag)
+    assert etag_matches(" * ", etag)
+    assert not etag_matches('"abcd"', etag)
+    assert not etag_matches('"old", "older"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
+
+
+def test_etag_is_weak_and_follows_the_payload():
+    cache = make_cache()
+
+    async def scenario():
+        first = await cache.set("o1", {"id": "o1", "views": 1}, cache.generation)
+        again = await cache.set("o1", {"views": 1, "id": "o1"}, cache.generation)
+        changed = await cache.set("o1", {"id": "o1", "views": 2}, cache.generation)
+        return first, again, changed
+
+    first, again, changed = asyncio.run(scenario())
+    assert first["etag"].startswith('W/"')
+    assert first["etag"] == again["etag"]
+    assert first["etag"] != changed["etag"]
+
+
+def test_fill_started_before_an_invalidation_is_not_cached():
+    cache = make_cache()
+
+    async def scenario():
+        generation = cache.generation
+        stale = {"id": "o1", "title": "before update"}
+        # The update lands while the read for `stale` is still in flight
+        await cache.invalidate("o1")
+        entry = await cache.set("o1", stale, generation)
+        return entry, await cache.get("o1"), await cache.shared.get("o1")
+
+    entry, local, shared = asyncio.run(scenario())
+    assert entry["data"]["title"] == "before update"
+    assert local is None
+    assert shared is None
+
+
+def test_fill_after_the_invalidation_is_cached():
+    cache = make_cache()
+
+    async def scenario():
+        await cache.invalidate("o1")
+        await cache.set("o1", {"id": "o1", "title": "after update"}, cache.generation)
+        return await cache.get("o1")
+
+    entry = asyncio.run(scenario())
+    assert entry["data"]["title"] == "after update"
+
+
+def test_invalidation_of_one_orchard_does_not_drop_fills_of_another():
+    cache = make_cache()
+
+    async def scenario():
+        generation = cache.generation
+        await cache.invalidate("o1")
+        await cache.set("o2", {"id": "o2"}, generation)
+        await cache.set("o2:pockets", {"id": "o2", "pockets": []}, generation)
+        return await cache.get("o2"), await cache.get("o2:pockets")
+
+    detail, with_pockets = asyncio.run(scenario())
+    assert detail is not None
+    assert with_pockets is not None
+
+
+def test_invalidate_drops_both_detail_variants():
+    cache = make_cache()
+
+    async def scenario():
+        await cache.set("o1", {"id": "o1"}, cache.generation)
+        await cache.set("o1:pockets", {"id": "o1", "pockets": []}, cache.generation)
+        await cache.invalidate("o1")
+        return [await cache.get(key) for key in cache.keys("o1")]
+
+    assert asyncio.run(scenario()) == [None, None]
+
+
+def test_invalidation_from_another_worker_drops_in_flight_fill():
+    cache = make_cache(shared=False)
+
+    async def scenario():
+        await cache.set("o1", {"id": "o1", "title": "cached"}, cache.generation)
+        generation = cache.generation
+        invalidation_channel.deliver(cache.local.name, "o1")
+        await cache.set("o1", {"id": "o1", "title": "stale read"}, generation)
+        return await cache.get("o1")
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+import server
+from server import OrchardSketchCounter, increment_filled_pockets, rebuild_orchard_supporters
+
+
+def run(monkeypatch, scenario):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def with_database():
+        db = mongomock_motor.AsyncMongoMockClient()["orchard_sketches_test"]
+        monkeypatch.setattr(server, "db", db)
+        await db.orchards.insert_one({"id": "o1", "filled_pockets": 0, "total_pockets": 10, "supporters": 0})
+        return await scenario(db)
+
+    return asyncio.run(with_database())
+
+
+def bestowal(user_id: str):
+    return {"orchard_id": "o1", "user_id": user_id}
+
+
+def test_repeat_bestower_counts_once_across_flushes(monkeypatch):
+    async def scenario(db):
+        counter = OrchardSketchCounter(60)
+        await counter.on_pockets_bestowed(bestowal("ann"))
+        await counter.on_pockets_bestowed(bestowal("ann"))
+        await counter.flush()
+        await counter.on_pockets_bestowed(bestowal("ann"))
+        await counter.on_pockets_bestowed(bestowal("bob"))
+        await counter.flush()
+        return await db.orchards.find_one({"id": "o1"})
+
+    assert run(monkeypatch, scenario)["supporters"] == 2
+
+
+def test_bestowal_counter_update_leaves_supporters_alone(monkeypatch):
+    async def scenario(db):
+        await increment_filled_pockets("o1", 3)
+        return await increment_filled_pockets("o1", 2)
+
+    orchard = run(monkeypatch, scenario)
+    assert orchard["filled_pockets"] == 5
+    assert orchard["completion_rate"] == 50.0
+    assert orchard["supporters"] == 0
+
+
+def test_rebuild_recounts_supporters_from_pockets(monkeypatch):
+    async def scenario(db):
+        await db.orchards.update_one({"id": "o1"}, {"$set": {"supporters": 7}})
+        await db.pockets.insert_many([
+            {"orchard_id": "o1", "pocket_number": n, "user_id": user_id}
+            for n, user_id in enumerate(["ann", "bob", "ann", "ann"], start=1)
+        ])
+        await rebuild_orchard_supporters()
+        return await db.orchards.find_one({"id": "o1"})
+
+    assert run(monkeypatch, scenario)["supporters"] == 2
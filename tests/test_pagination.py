@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from server import OrchardSort, decode_cursor, encode_cursor
+
+
+def test_newest_cursor_round_trips_its_datetime():
+    created_at = datetime(2026, 3, 1, 12, 30, 15, 250000)
+    cursor = encode_cursor(OrchardSort.NEWEST, {"id": "o-9", "created_at": created_at})
+
+    assert decode_cursor(cursor, OrchardSort.NEWEST) == {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": "o-9"}},
+    ]}
+
+
+def test_numeric_sort_cursor_breaks_ties_on_id():
+    cursor = encode_cursor(OrchardSort.VIEWS, {"id": "o-3", "views": 42})
+
+    assert decode_cursor(cursor, OrchardSort.VIEWS) == {"$or": [
+        {"views": {"$lt": 42}},
+        {"views": 42, "id": {"$lt": "o-3"}},
+    ]}
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(OrchardSort.COMPLETION, {"id": "o?/+", "completion_rate": 99.5})
+    assert all(char.isalnum() or char in "-_=" for char in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "e30=", encode_cursor(OrchardSort.VIEWS, {"id": "o-1", "views": 1})])
+def test_invalid_or_foreign_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, OrchardSort.NEWEST)
+    assert error.value.status_code == 400
@@ -0,0 +1,226 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+from server import PayoutJob, PayoutJobStatus, PayoutWorker, PayPalPayoutStub
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def run(monkeypatch, scenario):
+    async def with_database():
+        db = mongomock_motor.AsyncMongoMockClient()["payout_queue_test"]
+        monkeypatch.setattr(server, "db", db)
+        await db.payout_jobs.create_indexes(server.INDEX_REGISTRY["payout_jobs"])
+        return await scenario(db)
+
+    return asyncio.run(with_database())
+
+
+def make_worker(worker_id: str) -> PayoutWorker:
+    worker = PayoutWorker({"paypal": PayPalPayoutStub(latency_seconds=0)}, {"paypal": 1})
+    worker.worker_id = worker_id
+    return worker
+
+
+async def queue_job(db, **fields) -> PayoutJob:
+    job = PayoutJob(orchard_id="orchard-1", user_id="grower-1", amount=300.0, **fields)
+    await db.payout_jobs.insert_one(job.dict())
+    await db.orchards.insert_one({"id": job.orchard_id, "payout_status": PayoutJobStatus.PENDING.value})
+    return job
+
+
+async def expire_lease(db, job_id: str):
+    await db.payout_jobs.update_one(
+        {"id": job_id},
+        {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+
+
+def test_leased_job_is_not_leased_again_until_it_expires(monkeypatch):
+    async def scenario(db):
+        job = await queue_job(db)
+        first, second = make_worker("a"), make_worker("b")
+
+        leased = await first.lease("paypal")
+        assert leased["id"] == job.id
+        assert leased["leased_by"] == "a"
+        assert leased["attempts"] == 1
+        assert await second.lease("paypal") is None
+
+        await expire_lease(db, job.id)
+        released = await second.lease("paypal")
+        assert released["id"] == job.id
+        assert released["leased_by"] == "b"
+        assert released["attempts"] == 2
+
+    run(monkeypatch, scenario)
+
+
+def test_job_waits_for_its_run_at(monkeypatch):
+    async def scenario(db):
+        await queue_job(db, run_at=datetime.utcnow() + timedelta(minutes=5))
+        assert await make_worker("a").lease("paypal") is None
+
+    run(monkeypatch, scenario)
+
+
+def test_finish_after_losing_the_lease_does_not_overwrite_the_new_holder(monkeypatch):
+    async def scenario(db):
+        job = await queue_job(db)
+        first, second = make_worker("a"), make_worker("b")
+
+        stale = PayoutJob(**await first.lease("paypal"))
+        await expire_lease(db, job.id)
+        current = PayoutJob(**await second.lease("paypal"))
+
+        assert not await first.finish(stale, {"status": PayoutJobStatus.SUCCEEDED.value})
+        stored = await db.payout_jobs.find_one({"id": job.id})
+        assert stored["status"] == PayoutJobStatus.LEASED.value
+        assert stored["leased_by"] == "b"
+        orchard = await db.orchards.find_one({"id": job.orchard_id})
+        assert orchard["payout_status"] == PayoutJobStatus.PENDING.value
+
+        assert await second.finish(current, {"status": PayoutJobStatus.SUCCEEDED.value})
+        stored = await db.payout_jobs.find_one({"id": job.id})
+        assert stored["status"] == PayoutJobStatus.SUCCEEDED.value
+        orchard = await db.orchards.find_one({"id": job.orchard_id})
+        assert orchard["payout_status"] == PayoutJobStatus.SUCCEEDED.value
+        assert orchard["payout_processed"] is True
+
+    run(monkeypatch, scenario)
+
+
+def test_finish_by_the_same_worker_after_a_re_lease_is_rejected(monkeypatch):
+    async def scenario(db):
+        job = await queue_job(db)
+        worker = make_worker("a")
+
+        stale = PayoutJob(**await worker.lease("paypal"))
+        await expire_lease(db, job.id)
+        await asyncio.sleep(0.01)
+        await worker.lease("paypal")
+
+        # Same worker id, but the lease it finished under was replaced
+        assert not await worker.finish(stale, {"status": PayoutJobStatus.DEAD.value})
+
+    run(monkeypatch, scenario)
+
+
+def test_enqueue_payout_once_per_orchard(monkeypatch):
+    async def scenario(db):
+        orchard = server.Orchard(
+            user_id="grower-1", title="Tractor", description="A tractor", category=server.GiftCategory.TECHNOLOGY,
+            seed_value=300.0, pocket_price=150.0, total_pockets=2, filled_pockets=2,
+            why_needed="Planting", community_impact="Food"
+        )
+        first = await server.enqueue_payout(orchard)
+        assert first is not None
+        assert first.amount == 300.0
+        assert await server.enqueue_payout(orchard) is None
+        assert await db.payout_jobs.count_documents({"orchard_id": orchard.id}) == 1
+
+    run(monkeypatch, scenario)
+
+
+def test_retried_job_is_paid_once():
+    stub = PayPalPayoutStub(latency_seconds=0)
+    job = PayoutJob(orchard_id="orchard-1", user_id="grower-1", amount=300.0)
+
+    async def scenario():
+        return [await stub.send_payout(job, None) for _ in range(3)]
+
+    references = asyncio.run(scenario())
+    assert len(set(references)) == 1
+    assert stub.calls == 1
+    assert stub.items == 1
+
+
+def paypal_account(user_id: str = "grower-1", **settings) -> server.PayPalAccount:
+    return server.PayPalAccount(user_id=user_id, email=f"{user_id}@example.com", **settings)
+
+
+async def drain(worker: PayoutWorker):
+    while (job_doc := await worker.lease("paypal")) is not None:
+        await worker.run_job(PayoutJob(**job_doc))
+
+
+def test_held_job_runs_once_the_minimum_is_lowered(monkeypatch):
+    async def scenario(db):
+        job = await queue_job(db)
+        account = paypal_account(minimum_payout=500.0)
+        await db.paypal_accounts.insert_one(account.dict())
+        worker = make_worker("a")
+        await drain(worker)
+        held = await db.payout_jobs.find_one({"id": job.id})
+
+        assert await server.requeue_payouts_for_account(account) == 0
+        account.minimum_payout = 250.0
+        await db.paypal_accounts.update_one({"user_id": account.user_id}, {"$set": {"minimum_payout": 250.0}})
+        requeued = await server.requeue_payouts_for_account(account)
+        orchard = await db.orchards.find_one({"id": job.orchard_id})
+        await drain(worker)
+        return held, requeued, orchard, await db.payout_jobs.find_one({"id": job.id})
+
+    held, requeued, orchard, paid = run(monkeypatch, scenario)
+    assert held["status"] == PayoutJobStatus.HELD.value
+    assert requeued == 1
+    assert orchard["payout_status"] == PayoutJobStatus.PENDING.value
+    assert paid["status"] == PayoutJobStatus.SUCCEEDED.value
+
+
+def test_held_job_stays_held_while_auto_payouts_are_off(monkeypatch):
+    async def scenario(db):
+        job = await queue_job(db, status=PayoutJobStatus.HELD)
+        assert await server.requeue_payouts_for_account(paypal_account(auto_payouts=False)) == 0
+        requeued = await server.requeue_payouts_for_account(paypal_account(auto_payouts=True))
+        return requeued, await db.payout_jobs.find_one({"id": job.id})
+
+    requeued, stored = run(monkeypatch, scenario)
+    assert requeued == 1
+    assert stored["status"] == PayoutJobStatus.PENDING.value
+
+
+def test_job_dead_lettered_for_a_missing_account_is_requeued_when_one_is_added(monkeypatch):
+    async def scenario(db):
+        job = await queue_job(db)
+        await drain(make_worker("a"))
+        dead = await db.payout_jobs.find_one({"id": job.id})
+        requeued = await server.requeue_payouts_for_account(paypal_account())
+        return dead, requeued, await db.payout_jobs.find_one({"id": job.id})
+
+    dead, requeued, stored = run(monkeypatch, scenario)
+    assert dead["status"] == PayoutJobStatus.DEAD.value
+    assert dead["last_error"] == server.NO_PAYPAL_ACCOUNT
+    assert requeued == 1
+    assert stored["status"] == PayoutJobStatus.PENDING.value
+
+
+def test_batch_scheduler_dead_letters_growers_without_an_account(monkeypatch):
+    stub = PayPalPayoutStub(latency_seconds=0)
+    monkeypatch.setitem(server.PAYOUT_PROVIDERS, "paypal", stub)
+
+    async def scenario(db):
+        await db.paypal_accounts.insert_one(paypal_account("grower-1").dict())
+        paid = await queue_job(db)
+        orphan = PayoutJob(orchard_id="orchard-2", user_id="grower-2", amount=300.0)
+        await db.payout_jobs.insert_one(orphan.dict())
+        await db.orchards.insert_one({"id": orphan.orchard_id, "payout_status": PayoutJobStatus.PENDING.value})
+
+        scheduler = server.PayoutBatchScheduler("paypal", 3600, 100)
+        await scheduler.flush()
+        await scheduler.flush()
+        stored = {job["user_id"]: job async for job in db.payout_jobs.find({})}
+        orchard = await db.orchards.find_one({"id": orphan.orchard_id})
+        return scheduler.counters, stored, orchard
+
+    counters, stored, orchard = run(monkeypatch, scenario)
+    assert stored["grower-1"]["status"] == PayoutJobStatus.SUCCEEDED.value
+    assert stored["grower-2"]["status"] == PayoutJobStatus.DEAD.value
+    assert stored["grower-2"]["last_error"] == server.NO_PAYPAL_ACCOUNT
+    assert orchard["payout_status"] == PayoutJobStatus.DEAD.value
+    assert counters["dead"] == 1
+    assert counters["jobs_held"] == 0
+    assert stub.calls == 1
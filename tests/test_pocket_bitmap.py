@@ -0,0 +1,56 @@
+import base64
+
+from server import (
+    POCKET_WORD_MASK,
+    empty_pocket_bitmap,
+    encode_pocket_bitmap,
+    next_free_pockets,
+    pocket_bitmap_masks,
+    taken_pockets,
+)
+
+
+def bitmap_with(total_pockets: int, pocket_numbers) -> list:
+    bitmap = empty_pocket_bitmap(total_pockets)
+    for word, mask in pocket_bitmap_masks(pocket_numbers).items():
+        bitmap[word] |= mask
+    return bitmap
+
+
+def test_empty_bitmap_has_one_word_per_32_pockets():
+    assert empty_pocket_bitmap(1) == [0]
+    assert empty_pocket_bitmap(32) == [0]
+    assert empty_pocket_bitmap(33) == [0, 0]
+
+
+def test_masks_group_pockets_by_word():
+    assert pocket_bitmap_masks([1, 2, 32, 33, 64, 65]) == {
+        0: 0b11 | 1 << 31,
+        1: 1 | 1 << 31,
+        2: 1,
+    }
+    assert pocket_bitmap_masks([]) == {}
+
+
+def test_taken_pockets_reports_only_set_bits():
+    bitmap = bitmap_with(100, [1, 33, 100])
+    assert taken_pockets(bitmap, [1, 2, 33, 34, 100]) == [1, 33, 100]
+    # Pockets past the stored words (e.g. a grown orchard) count as free
+    assert taken_pockets(bitmap, [200]) == []
+
+
+def test_next_free_pockets_skips_full_words_and_stops_at_total():
+    bitmap = bitmap_with(70, list(range(1, 33)) + [34])
+    assert bitmap[0] == POCKET_WORD_MASK
+    assert next_free_pockets(bitmap, 70, 3) == [33, 35, 36]
+    assert next_free_pockets(bitmap, 36, 10) == [33, 35, 36]
+
+
+def test_next_free_pockets_on_a_full_orchard():
+    assert next_free_pockets(bitmap_with(40, range(1, 41)), 40, 1) == []
+
+
+def test_encoded_bitmap_uses_one_bit_per_pocket():
+    raw = base64.b64decode(encode_pocket_bitmap(bitmap_with(20, [1, 9, 20]), 20))
+    assert len(raw) == 3
+    assert raw == bytes([0b1, 0b1, 0b1000])
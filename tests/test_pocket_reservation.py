@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import (
+    Orchard,
+    PocketSelectionRequest,
+    User,
+    bestow_into_orchard,
+    empty_pocket_bitmap,
+    pocket_bitmap_masks,
+    reconcile_orchard_pockets,
+)
+
+
+def run(monkeypatch, scenario):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def with_database():
+        db = mongomock_motor.AsyncMongoMockClient()["pocket_reservation_test"]
+        monkeypatch.setattr(server, "db", db)
+        await db.pockets.create_indexes(server.INDEX_REGISTRY["pockets"])
+        orchard = Orchard(
+            user_id="grower-1", title="Tractor", description="A tractor", seed_value=6000.0,
+            pocket_price=150.0, total_pockets=40, why_needed="Planting", community_impact="Food"
+        )
+        await db.orchards.insert_one({**orchard.dict(), "pocket_bitmap": empty_pocket_bitmap(40)})
+        try:
+            await db.orchards.update_one({"id": orchard.id}, {"$bit": {"pocket_bitmap.0": {"or": 0}}})
+        except NotImplementedError:
+            pytest.skip("mongomock without $bit support")
+        return await scenario(db, orchard)
+
+    return asyncio.run(with_database())
+
+
+def bestower() -> User:
+    return User(email="ann@example.com", password_hash="x", first_name="Ann", last_name="Bee")
+
+
+async def bestow(orchard: Orchard, pocket_numbers):
+    request = PocketSelectionRequest(orchard_id=orchard.id, pocket_numbers=pocket_numbers)
+    return await bestow_into_orchard(request, orchard_id=orchard.id, current_user=bestower())
+
+
+async def stored_state(db, orchard: Orchard):
+    doc = await db.orchards.find_one({"id": orchard.id})
+    pockets = sorted(pocket["pocket_number"] for pocket in await db.pockets.find({"orchard_id": orchard.id}).to_list(None))
+    return doc, pockets
+
+
+def test_bestowal_updates_pockets_bitmap_and_counters(monkeypatch):
+    async def scenario(db, orchard):
+        response = await bestow(orchard, [1, 2, 33])
+        return response, *await stored_state(db, orchard)
+
+    response, doc, pockets = run(monkeypatch, scenario)
+    assert response.data["pockets_selected"] == 3
+    assert pockets == [1, 2, 33]
+    assert doc["filled_pockets"] == 3
+    assert doc["pocket_bitmap"] == [0b11, 1]
+
+
+def test_orchard_deleted_before_the_counter_update_releases_the_pockets(monkeypatch):
+    async def vanished(orchard_id, count):
+        return None
+
+    async def scenario(db, orchard):
+        monkeypatch.setattr(server, "increment_filled_pockets", vanished)
+        with pytest.raises(HTTPException) as error:
+            await bestow(orchard, [1, 2, 33])
+        return error.value.status_code, *await stored_state(db, orchard)
+
+    status_code, doc, pockets = run(monkeypatch, scenario)
+    assert status_code == 404
+    assert pockets == []
+    assert doc["pocket_bitmap"] == [0, 0]
+
+
+def test_failed_counter_update_releases_the_pockets(monkeypatch):
+    async def unreachable(orchard_id, count):
+        raise ConnectionError("primary stepped down")
+
+    async def scenario(db, orchard):
+        await bestow(orchard, [5])
+        monkeypatch.setattr(server, "increment_filled_pockets", unreachable)
+        with pytest.raises(HTTPException) as error:
+            await bestow(orchard, [6, 7])
+        return error.value.status_code, *await stored_state(db, orchard)
+
+    status_code, doc, pockets = run(monkeypatch, scenario)
+    assert status_code == 500
+    # The earlier bestowal is untouched
+    assert pockets == [5]
+    assert doc["filled_pockets"] == 1
+    assert doc["pocket_bitmap"] == [1 << 4, 0]
+
+
+def test_reconcile_recomputes_counters_and_bitmap_from_pockets(monkeypatch):
+    async def scenario(db, orchard):
+        await db.pockets.insert_many([
+            {"id": f"p{n}", "orchard_id": orchard.id, "pocket_number": n, "user_id": "u"} for n in (1, 2, 40)
+        ])
+        stale = pocket_bitmap_masks([1, 9])
+        await db.orchards.update_one({"id": orchard.id}, {"$set": {
+            "filled_pockets": 5, "pocket_bitmap": [stale.get(0, 0), stale.get(1, 0)]
+        }})
+        first = await reconcile_orchard_pockets()
+        second = await reconcile_orchard_pockets([orchard.id])
+        doc, _ = await stored_state(db, orchard)
+        return first, second, doc
+
+    first, second, doc = run(monkeypatch, scenario)
+    assert (first, second) == (1, 0)
+    assert doc["filled_pockets"] == 3
+    assert doc["completion_rate"] == 7.5
+    assert doc["pocket_bitmap"] == [0b11, 1 << 7]
@@ -0,0 +1,85 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import server
+from server import MongoCommandListener, query_shape
+
+
+def test_literals_are_replaced_and_keys_kept():
+    assert query_shape({"id": "o-1", "views": {"$gte": 10}}) == {"id": "?", "views": {"$gte": "?"}}
+
+
+def test_same_query_with_other_values_has_the_same_shape():
+    first = {"orchard_id": "a", "pocket_number": {"$in": [1, 2, 3]}}
+    second = {"orchard_id": "b", "pocket_number": {"$in": [7]}}
+    assert query_shape(first) == query_shape(second) == {"orchard_id": "?", "pocket_number": {"$in": "?"}}
+
+
+def test_lists_of_subqueries_keep_their_structure():
+    query = {"$or": [{"status": "active"}, {"views": {"$lt": 5}, "id": {"$lt": "x"}}]}
+    assert query_shape(query) == {"$or": [{"status": "?"}, {"views": {"$lt": "?"}, "id": {"$lt": "?"}}]}
+
+
+def test_scalars_and_empty_filters():
+    assert query_shape("o-1") == "?"
+    assert query_shape({}) == {}
+
+
+def command_event(request_id: int, command_name: str = "find"):
+    return SimpleNamespace(
+        command_name=command_name, connection_id=("localhost", 27017), request_id=request_id,
+        command={command_name: "orchards", "filter": {"id": f"o-{request_id}"}},
+        duration_micros=1000, reply={"cursor": {"firstBatch": [{}]}}
+    )
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setattr(server, "MONGO_PROFILER", True)
+    timing = server.RequestTiming()
+    token = server.current_request_timing.set(timing)
+    yield timing
+    server.current_request_timing.reset(token)
+
+
+def test_unfinished_commands_are_swept_past_the_bound(monkeypatch, profiling):
+    monkeypatch.setattr(server, "PROFILER_MAX_IN_FLIGHT", 3)
+    listener = MongoCommandListener()
+    for request_id in range(5):
+        listener.started(command_event(request_id))
+
+    assert [key[1] for key in listener.in_flight] == [2, 3, 4]
+    assert listener.swept == 2
+
+
+def test_stale_commands_are_swept_by_age(monkeypatch, profiling):
+    listener = MongoCommandListener()
+    listener.started(command_event(1))
+    monkeypatch.setattr(server, "PROFILER_IN_FLIGHT_SECONDS", -1)
+    listener.started(command_event(2))
+
+    assert list(listener.in_flight) == []
+    assert listener.swept == 2
+
+
+def test_concurrent_commands_are_all_recorded(profiling):
+    listener = MongoCommandListener()
+
+    def run_commands(offset: int):
+        server.current_request_timing.set(profiling)
+        for request_id in range(offset, offset + 500):
+            event = command_event(request_id)
+            listener.started(event)
+            listener.succeeded(event)
+
+    threads = [threading.Thread(target=run_commands, args=(offset * 500,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert listener.in_flight == {}
+    assert profiling.db_commands == 4000
+    assert len(profiling.operations) == 4000
@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from server import (
+    FastJSONResponse,
+    Orchard,
+    Pocket,
+    POCKET_ENCODER,
+    api_envelope,
+    encode_orchard,
+)
+
+
+def stdlib_body(content) -> bytes:
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def orchard_doc(**fields):
+    doc = Orchard(
+        user_id="grower-1", title="Tractor fund 🚜", description="Ünïcode, \"quotes\" and \\ slashes\n",
+        seed_value=15000.0, pocket_price=150.0, total_pockets=100, filled_pockets=37,
+        why_needed="Planting", community_impact="Food", features=["a", "b"],
+        created_at=datetime(2026, 3, 1, 12, 30, 15, 250000)
+    ).dict()
+    doc.update(fields)
+    return doc
+
+
+PAYLOADS = {
+    "orchard page": api_envelope([encode_orchard(orchard_doc()) for _ in range(20)], "Orchards retrieved", pagination={"has_more": True, "next_cursor": "eyJzIjoi"}),
+    "pockets": api_envelope([POCKET_ENCODER.encode(Pocket(orchard_id="o", pocket_number=n, user_id="u", amount=150.0, bestower_name="Ann").dict()) for n in range(1, 50)], "ok"),
+    "large float": api_envelope(encode_orchard(orchard_doc(seed_value=1e16, pocket_price=1.5e20)), "ok"),
+    "small floats": api_envelope({"rate": 1e-05, "tiny": 1.5e-07, "edge": 0.0001, "negative": -2.5e-9}, "ok"),
+    "ordinary floats": api_envelope({"values": [0.1, 150.0, -0.0, 12345.678, 9007199254740992.0, 5e-324]}, "ok"),
+    "exponent-looking text": api_envelope({"title": "Seed:1e5, [0.00001", "n": 1}, "ok"),
+    "big int": api_envelope({"total": 2 ** 70}, "ok"),
+    "aware datetime": api_envelope({"at": datetime(2026, 1, 1, tzinfo=timezone.utc), "naive": datetime(2026, 1, 1)}, "ok"),
+    "non-string keys": api_envelope({"counts": {1: "a", 2: None}, "flags": [True, False, None]}, "ok"),
+}
+
+
+@pytest.mark.parametrize("name", PAYLOADS)
+def test_fast_response_matches_stdlib_bytes(name):
+    content = PAYLOADS[name]
+    assert FastJSONResponse(content).body == stdlib_body(content)
+
+
+def test_ordinary_payloads_stay_on_the_orjson_path():
+    content = PAYLOADS["orchard page"]
+    assert FastJSONResponse(content).body == orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
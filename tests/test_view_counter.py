@@ -0,0 +1,99 @@
+import asyncio
+
+import server
+from server import ViewCounter
+
+
+class FailingOrchards:
+    def __init__(self, during_write=None):
+        self.calls = 0
+        self.during_write = during_write
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls += 1
+        if self.during_write:
+            self.during_write()
+        raise RuntimeError("primary stepped down")
+
+
+class BlockingOrchards:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.written = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls += 1
+        await self.release.wait()
+        self.written.extend(operations)
+
+
+class FakeDB:
+    def __init__(self, orchards):
+        self.orchards = orchards
+
+
+def test_failed_flush_requeues_up_to_max_pending(monkeypatch):
+    counter = ViewCounter(60, max_pending=5, dedup_seconds=0)
+    monkeypatch.setattr(server, "db", FakeDB(FailingOrchards()))
+    counter.pending, counter.pending_total = {"a": 4, "b": 3}, 7
+
+    asyncio.run(counter.flush())
+
+    assert counter.pending_total == 5
+    assert sum(counter.pending.values()) == 5
+    assert counter.dropped_total == 2
+    assert counter.flushed_total == 0
+
+
+def test_failed_flush_leaves_room_for_views_recorded_meanwhile(monkeypatch):
+    counter = ViewCounter(60, max_pending=10, dedup_seconds=0)
+
+    def record_during_write():
+        counter.pending["c"] = 4
+        counter.pending_total += 4
+
+    monkeypatch.setattr(server, "db", FakeDB(FailingOrchards(record_during_write)))
+    counter.pending, counter.pending_total = {"a": 5, "b": 3}, 8
+
+    asyncio.run(counter.flush())
+
+    assert counter.pending_total == 10
+    assert counter.pending["c"] == 4
+    assert counter.dropped_total == 2
+
+
+def test_threshold_keeps_a_single_flush_in_flight(monkeypatch):
+    orchards = BlockingOrchards()
+    monkeypatch.setattr(server, "db", FakeDB(orchards))
+    counter = ViewCounter(60, max_pending=2, dedup_seconds=0)
+
+    async def scenario():
+        counter.record("a")
+        counter.record("a")
+        first = counter._flush_task
+        assert first is not None
+        await asyncio.sleep(0)
+        for _ in range(6):
+            counter.record("b")
+        assert counter._flush_task is first
+        orchards.release.set()
+        await first
+        await counter.flush()
+
+    asyncio.run(scenario())
+
+    assert orchards.calls == 2
+    assert counter.flushed_total == 8
+    assert counter.pending_total == 0
+
+
+def test_dedup_window_counts_each_viewer_once():
+    counter = ViewCounter(60, max_pending=100, dedup_seconds=60)
+
+    assert counter.record("a", "viewer-1")
+    assert not counter.record("a", "viewer-1")
+    assert counter.record("a", "viewer-2")
+    assert counter.record("b", "viewer-1")
+    assert counter.pending_for("a") == 2
+    assert counter.deduplicated_total == 1